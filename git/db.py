@@ -1,4 +1,9 @@
 """Module with our own gitdb implementation - it uses the git command"""
+from collections import OrderedDict
+import logging
+import os
+import os.path as osp
+
 from git.util import bin_to_hex, hex_to_bin
 from gitdb.base import OInfo, OStream
 from gitdb.db import GitDB  # @UnusedImport
@@ -9,16 +14,30 @@ from git.exc import GitCommandError
 
 # typing-------------------------------------------------
 
-from typing import TYPE_CHECKING
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, TYPE_CHECKING
 from git.types import PathLike
 
 if TYPE_CHECKING:
     from git.cmd import Git
+    from git.repo import Repo
+    import sqlite3
+
+# (size, tree_binsha, parent_binshas, author_name, author_email, authored_date, author_tz_offset,
+#  committer_name, committer_email, committed_date, committer_tz_offset, encoding, message_offset)
+CommitRecord = Tuple[
+    int, bytes, bytes, Optional[str], Optional[str], int, float, Optional[str], Optional[str], int, float, str, int
+]
 
+# (binsha, mode, name) entries of a parsed tree
+TreeEntries = Tuple[Tuple[bytes, int, str], ...]
+
+T = TypeVar("T")
 
 # --------------------------------------------------------
 
-__all__ = ("GitCmdObjectDB", "GitDB")
+log = logging.getLogger(__name__)
+
+__all__ = ("GitCmdObjectDB", "GitDB", "CommitCache", "TreeCache")
 
 
 class GitCmdObjectDB(LooseObjectDB):
@@ -31,6 +50,9 @@ class GitCmdObjectDB(LooseObjectDB):
         have packs and the other implementations
     """
 
+    # if set, parsed trees are kept in memory, see TreeCache
+    tree_cache: Optional["TreeCache"] = None
+
     def __init__(self, root_path: PathLike, git: "Git") -> None:
         """Initialize this instance with the root and a git command"""
         super(GitCmdObjectDB, self).__init__(root_path)
@@ -61,3 +83,269 @@ class GitCmdObjectDB(LooseObjectDB):
         # END handle exceptions
 
     # } END interface
+
+
+class CommitCache(object):
+
+    """A persistent cache of parsed commit headers, mapping commit binshas to their
+    size, tree, parents, author, committer, dates, encoding and the offset of the
+    message within the raw object.
+
+    Commits are immutable, hence entries never need to be invalidated. If set as
+    ``Repo.commit_cache``, commits will be read from the cache instead of the object
+    database whenever possible, and added to it once they were parsed.
+
+    The cache is a sqlite database, which keeps writes atomic even if the process dies.
+    A cache which cannot be read is discarded and recreated. Once it holds more than
+    ``max_entries`` commits, the oldest entries are evicted.
+
+    :note: not threadsafe, use one instance per thread. Its connection can only be used by
+        the thread which opened it, until it is closed again"""
+
+    __slots__ = ("path", "max_entries", "_conn", "_pending")
+
+    # increment whenever the table layout or the meaning of its values changes
+    schema_version = 1
+
+    default_max_entries = 1000000
+    default_file_name = "gitpython-commit-cache.sqlite"
+
+    # amount of new records which are kept in memory before being written
+    flush_threshold = 1000
+
+    _columns = (
+        "size, tree, parents, author_name, author_email, authored_date, author_tz_offset,"
+        " committer_name, committer_email, committed_date, committer_tz_offset, encoding, message_offset"
+    )
+
+    def __init__(self, path: PathLike, max_entries: int = default_max_entries) -> None:
+        """Initialize this instance. The database is opened and created on first use.
+
+        :param path: path to the database file
+        :param max_entries: maximum amount of commits to keep"""
+        self.path = path
+        self.max_entries = max_entries
+        self._conn: Optional["sqlite3.Connection"] = None
+        self._pending: Dict[bytes, CommitRecord] = {}
+
+    @classmethod
+    def for_repo(cls, repo: "Repo", max_entries: int = default_max_entries) -> "CommitCache":
+        """:return: CommitCache stored in the common git directory of the given repository"""
+        return cls(osp.join(repo.common_dir, cls.default_file_name), max_entries)
+
+    def __reduce__(self) -> Tuple[type, Tuple[PathLike, int]]:
+        return (type(self), (self.path, self.max_entries))
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._run(lambda conn: conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0], 0)
+
+    # { Utilities
+
+    def _connect(self) -> "sqlite3.Connection":
+        import sqlite3
+
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.schema_version:
+                conn.execute("DROP TABLE IF EXISTS commits")
+                conn.execute(
+                    "CREATE TABLE commits (binsha BLOB PRIMARY KEY, size INTEGER, tree BLOB, parents BLOB,"
+                    " author_name TEXT, author_email TEXT, authored_date INTEGER, author_tz_offset INTEGER,"
+                    " committer_name TEXT, committer_email TEXT, committed_date INTEGER,"
+                    " committer_tz_offset INTEGER, encoding TEXT, message_offset INTEGER)"
+                )
+                conn.execute("PRAGMA user_version = %i" % self.schema_version)
+                conn.commit()
+            # END create schema
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    def _connection(self) -> "sqlite3.Connection":
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _discard(self) -> None:
+        """Remove the database file after it turned out to be unreadable"""
+        log.warning("Discarding unreadable commit cache at %s", self.path, exc_info=True)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            try:
+                os.remove(str(self.path) + suffix)
+            except OSError:
+                pass
+        # END for each database file
+
+    def _run(self, fn: Callable[["sqlite3.Connection"], T], default: T) -> T:
+        """:return: result of calling fn with our connection, or default if the database is not usable right now.
+        A corrupted database is discarded and recreated once."""
+        import sqlite3
+
+        for attempt in (0, 1):
+            try:
+                return fn(self._connection())
+            except sqlite3.OperationalError:
+                # like a database locked by another process for too long - it's just a cache
+                log.warning("Failed to access commit cache at %s", self.path, exc_info=True)
+                return default
+            except sqlite3.ProgrammingError:
+                # misuse, like sharing the connection among threads, says nothing about the database
+                raise
+            except sqlite3.DatabaseError:
+                if attempt:
+                    raise
+                self._discard()
+        # END for each attempt
+        return default
+
+    # } END utilities
+
+    # { Interface
+
+    def get(self, binsha: bytes) -> Optional[CommitRecord]:
+        """:return: record of the commit with the given binsha, or None if it is not cached"""
+        record = self._pending.get(binsha)
+        if record is not None:
+            return record
+        query = "SELECT %s FROM commits WHERE binsha = ?" % self._columns
+        row = self._run(lambda conn: conn.execute(query, (binsha,)).fetchone(), None)
+        return tuple(row) if row else None  # type: ignore[return-value]
+
+    def get_many(self, binshas: Iterable[bytes]) -> Dict[bytes, CommitRecord]:
+        """:return: dict mapping those of the given binshas which are cached to their record"""
+        found: Dict[bytes, CommitRecord] = {}
+        missing = []
+        for binsha in binshas:
+            record = self._pending.get(binsha)
+            if record is None:
+                missing.append(binsha)
+            else:
+                found[binsha] = record
+        # END for each binsha
+
+        # stay well below sqlite's limit of host parameters per statement
+        for i in range(0, len(missing), 500):
+            chunk = missing[i : i + 500]
+            query = "SELECT binsha, %s FROM commits WHERE binsha IN (%s)" % (self._columns, ",".join("?" * len(chunk)))
+            rows: List[tuple] = self._run(lambda conn: conn.execute(query, chunk).fetchall(), [])
+            for row in rows:
+                found[row[0]] = tuple(row[1:])  # type: ignore[assignment]
+        # END for each chunk
+        return found
+
+    def put(self, binsha: bytes, record: CommitRecord) -> None:
+        """Add the record of the commit with the given binsha. It will be written with the next flush,
+        which happens automatically once enough records were added."""
+        self._pending[binsha] = record
+        if len(self._pending) >= self.flush_threshold:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending records in a single transaction, and evict the oldest ones if the cache
+        grew too large"""
+        if not self._pending:
+            return
+        rows = [(binsha,) + tuple(record) for binsha, record in self._pending.items()]
+        self._pending.clear()
+
+        def write(conn: "sqlite3.Connection") -> None:
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO commits VALUES (%s)" % ",".join("?" * len(rows[0])), rows)
+                excess = conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM commits WHERE rowid IN (SELECT rowid FROM commits ORDER BY rowid LIMIT ?)",
+                        (excess,),
+                    )
+            # END transaction
+
+        self._run(write, None)
+
+    def close(self) -> None:
+        """Flush pending records and close the database. It will be reopened on demand."""
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # } END interface
+
+
+class TreeCache(object):
+
+    """An in-memory cache of parsed tree objects, mapping tree binshas to their entries.
+
+    Consecutive commits share most of their trees, hence walking the trees of many commits
+    would otherwise read and parse the same trees over and over. Trees are immutable, so
+    entries never need to be invalidated. If set as ``Repo.tree_cache``, trees, tree
+    traversals and tree merges look up parsed trees here first.
+
+    The cache holds about ``max_bytes`` of memory at most, as estimated from the size of
+    the trees and their number of entries. The least recently used trees are evicted first.
+
+    :note: not threadsafe, use one instance per thread"""
+
+    __slots__ = ("max_bytes", "_trees", "_nbytes")
+
+    default_max_bytes = 64 * 1024 * 1024
+
+    # estimated memory in bytes taken by the tuple, sha and name objects of an entry
+    _entry_overhead = 200
+
+    def __init__(self, max_bytes: int = default_max_bytes) -> None:
+        """:param max_bytes: approximate amount of memory the cached trees may take"""
+        self.max_bytes = max_bytes
+        self._trees: "OrderedDict[bytes, Tuple[TreeEntries, int]]" = OrderedDict()
+        self._nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def __contains__(self, binsha: bytes) -> bool:
+        return binsha in self._trees
+
+    # { Interface
+
+    @property
+    def nbytes(self) -> int:
+        """:return: estimated amount of memory taken by the cached trees"""
+        return self._nbytes
+
+    def get(self, binsha: bytes) -> Optional[TreeEntries]:
+        """:return: entries of the tree with the given binsha, or None if it is not cached"""
+        item = self._trees.get(binsha)
+        if item is None:
+            return None
+        self._trees.move_to_end(binsha)
+        return item[0]
+
+    def put(self, binsha: bytes, entries: Iterable[Tuple[bytes, int, str]], size: int) -> TreeEntries:
+        """Add the entries of the tree with the given binsha, and evict the least recently
+        used trees if the cache grew too large.
+
+        :param size: size of the raw tree object in bytes
+        :return: the entries as stored in the cache"""
+        stored = tuple(entries)
+        nbytes = size + len(stored) * self._entry_overhead
+        previous = self._trees.pop(binsha, None)
+        if previous is not None:
+            self._nbytes -= previous[1]
+        # END handle replacement
+        self._trees[binsha] = (stored, nbytes)
+        self._nbytes += nbytes
+        while self._nbytes > self.max_bytes and len(self._trees) > 1:
+            self._nbytes -= self._trees.popitem(last=False)[1][1]
+        # END while over budget
+        return stored
+
+    def clear(self) -> None:
+        """Remove all trees"""
+        self._trees.clear()
+        self._nbytes = 0
+
+    # } END interface
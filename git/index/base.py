@@ -4,6 +4,8 @@
 # This module is part of GitPython and is released under
 # the BSD License: https://opensource.org/license/bsd-3-clause/
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import ExitStack
 import datetime
 import glob
@@ -34,6 +36,7 @@ from git.util import (
     to_native_path_linux,
     unbare_repo,
     to_bin_sha,
+    bin_to_hex,
 )
 from gitdb.base import IStream
 from gitdb.db import MemoryDB
@@ -45,16 +48,36 @@ from .fun import (
     entry_key,
     write_cache,
     read_cache,
+    read_cache_tree,
+    read_extensions,
+    read_fsmonitor,
+    read_untracked_cache,
+    split_index_changes,
     aggressive_tree_merge,
+    entries_from_tree,
+    has_path_conflicts,
+    write_cache_tree,
+    write_extension,
+    write_fsmonitor,
+    write_link,
+    write_untracked_cache,
     write_tree_from_cache,
     stat_mode_to_index_mode,
     S_IFGITLINK,
     run_commit_hook,
 )
+from .status import index_status, query_fsmonitor_hook, unmerged_status, untracked_files, working_tree_status
 from .typ import (
     BaseIndexEntry,
+    CacheTree,
+    FsmonitorData,
     IndexEntry,
+    IndexEntryMapping,
+    LazyIndexEntries,
+    PackedIndexEntries,
+    SplitIndex,
     StageType,
+    StatusEntry,
 )
 from .util import TemporaryFileSwap, post_clear_cache, default_index, git_working_dir
 
@@ -64,17 +87,21 @@ from typing import (
     Any,
     BinaryIO,
     Callable,
+    Deque,
     Dict,
     IO,
     Iterable,
     Iterator,
     List,
+    MutableMapping,
     NoReturn,
+    Optional,
     Sequence,
     TYPE_CHECKING,
     Tuple,
     Type,
     Union,
+    cast,
 )
 
 from git.types import Commit_ish, PathLike
@@ -117,20 +144,26 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
     Make sure you use index.write() once you are done manipulating the index directly
     before operating on it using the git command"""
 
-    __slots__ = ("repo", "version", "entries", "_extension_data", "_file_path")
-    _VERSION = 2  # latest version we support
+    __slots__ = ("repo", "version", "entries", "_extension_data", "_file_path", "_compact")
+    _VERSION = 2  # version of new indices, versions up to 4 are supported
     S_IFGITLINK = S_IFGITLINK  # a submodule
 
-    def __init__(self, repo: "Repo", file_path: Union[PathLike, None] = None) -> None:
+    def __init__(self, repo: "Repo", file_path: Union[PathLike, None] = None, compact: bool = False) -> None:
         """Initialize this Index instance, optionally from the given ``file_path``.
         If no file_path is given, we will be created from the current index file.
 
         If a stream is not given, the stream will be initialized from the current
-        repository's index on demand."""
+        repository's index on demand.
+
+        :param compact: if True, the entries are kept in PackedIndexEntries, which
+            store them as sorted binary records instead of one object per entry. This
+            saves most of the memory of large indices and allows to write them without
+            unpacking, at the cost of slower insertion of new paths."""
         self.repo = repo
         self.version = self._VERSION
         self._extension_data = b""
         self._file_path: PathLike = file_path or self._index_path()
+        self._compact = compact
 
     def _set_cache_(self, attr: str) -> None:
         if attr == "entries":
@@ -138,7 +171,9 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
                 fd = os.open(self._file_path, os.O_RDONLY)
             except OSError:
                 # in new repositories, there may be no index, which means we are empty
-                self.entries: Dict[Tuple[PathLike, StageType], IndexEntry] = {}
+                self.entries: MutableMapping[Tuple[PathLike, StageType], IndexEntry] = (
+                    PackedIndexEntries() if self._compact else {}
+                )
                 return None
             # END exception handling
 
@@ -175,19 +210,119 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
 
     def _deserialize(self, stream: IO) -> "IndexFile":
         """Initialize this instance with index values read from the given stream"""
-        self.version, self.entries, self._extension_data, _conten_sha = read_cache(stream)
+        self.version, self.entries, extension_data, _conten_sha = read_cache(
+            stream, self._read_shared_index, compact=self._compact
+        )
+        # extensions describing the entries are kept up to date along with them, others are kept as they are
+        entries = self.entries
+        other_extensions = []
+        for signature, data in read_extensions(extension_data):
+            if signature == b"TREE" and isinstance(entries, IndexEntryMapping):
+                entries.cache_tree = read_cache_tree(data)
+            elif signature == b"UNTR" and isinstance(entries, IndexEntryMapping):
+                entries.untracked_cache = read_untracked_cache(data)
+            elif signature == b"FSMN" and isinstance(entries, IndexEntryMapping):
+                entries.fsmonitor = read_fsmonitor(data, [key[0] for key in entries])
+            elif signature in (b"EOIE", b"IEOT"):
+                # offsets into the file we read, which don't apply to the one we write
+                continue
+            else:
+                other_extensions.append(write_extension(signature, data))
+        # END for each extension
+        self._extension_data = b"".join(other_extensions)
         return self
 
+    def _shared_index_path(self, sha: bytes) -> str:
+        return osp.join(self.repo.git_dir, "sharedindex.%s" % bin_to_hex(sha).decode("ascii"))
+
+    def _read_shared_index(self, sha: bytes) -> IO[bytes]:
+        with open(self._shared_index_path(sha), "rb") as fp:
+            return BytesIO(fp.read())
+        # END read shared index
+
+    def _write_shared_index(self, entries: Sequence[IndexEntry]) -> SplitIndex:
+        """Write the given entries as shared index of split indices, if it doesn't exist yet
+        :return: SplitIndex referring to it"""
+        stream = BytesIO()
+        write_cache(entries, stream, version=max(self.version, 2))
+        data = stream.getvalue()
+        split_index = SplitIndex(data[-20:], cast(LazyIndexEntries, read_cache(BytesIO(data))[1]))
+        path = self._shared_index_path(split_index.base_sha)
+        if not osp.exists(path):
+            lfd = LockedFD(path)
+            fd = lfd.open(write=True)
+            os.write(fd, data)
+            lfd.commit()
+        # END write shared index
+        return split_index
+
     def _entries_sorted(self) -> List[IndexEntry]:
         """:return: list of entries, in a sorted fashion, first by path, then by stage"""
+        if isinstance(self.entries, IndexEntryMapping) and self.entries.is_sorted:
+            return list(self.entries.values())
         return sorted(self.entries.values(), key=lambda e: (e.path, e.stage))
 
     def _serialize(self, stream: IO, ignore_extension_data: bool = False) -> "IndexFile":
-        entries = self._entries_sorted()
-        extension_data = self._extension_data  # type: Union[None, bytes]
+        link_data = b""
+        split_index: Optional[SplitIndex] = getattr(self.entries, "split_index", None)
+        reader = self.repo.config_reader()
+        # like git, keep the index split or unsplit unless core.splitIndex says otherwise
+        split = reader.get_value("core", "splitIndex", split_index is not None) is True
+        written_entries: Union[Sequence[IndexEntry], PackedIndexEntries]
+        entries: Sequence[IndexEntry] = ()
+        if isinstance(self.entries, PackedIndexEntries) and not split:
+            # packed records are written as they are, without unpacking entries
+            written_entries = self.entries
+        else:
+            entries = self._entries_sorted()
+            written_entries = entries
+        # END handle packed entries
+        if split:
+            max_change = int(reader.get_value("splitIndex", "maxPercentChange", 20))
+            changes = None
+            if split_index is not None:
+                changes = split_index_changes(entries, split_index.base)
+                if (len(changes[0]) + len(changes[1])) * 100 > max_change * len(entries):
+                    changes = None
+                else:
+                    # keep the shared index from expiring while it is used
+                    try:
+                        os.utime(self._shared_index_path(split_index.base_sha))
+                    except OSError:
+                        pass
+                    # END handle missing shared index
+            # END compare to shared index
+            if changes is None:
+                split_index = self._write_shared_index(entries)
+                if isinstance(self.entries, IndexEntryMapping):
+                    self.entries.split_index = split_index
+                changes = ([], [], [])
+            # END write new shared index
+            split_index = cast(SplitIndex, split_index)
+            written_entries = changes[0]
+            link_data = write_extension(
+                b"link", write_link(split_index.base_sha, changes[1], changes[2], len(split_index.base))
+            )
+        # END handle split index
+
+        extensions = []
+        cache_tree = getattr(self.entries, "cache_tree", None)
+        if cache_tree is not None:
+            extensions.append(write_extension(b"TREE", write_cache_tree(cache_tree)))
+        extensions.append(self._extension_data)
+        untracked_cache = getattr(self.entries, "untracked_cache", None)
+        if untracked_cache is not None:
+            extensions.append(write_extension(b"UNTR", write_untracked_cache(untracked_cache)))
+        fsmonitor = getattr(self.entries, "fsmonitor", None)
+        if fsmonitor is not None:
+            # packed entries are sorted, and their paths are read without unpacking them
+            paths = [e.path for e in entries] if entries else [key[0] for key in self.entries]
+            extensions.append(write_extension(b"FSMN", write_fsmonitor(fsmonitor, paths)))
+        extension_data = b"".join(extensions)
         if ignore_extension_data:
-            extension_data = None
-        write_cache(entries, stream, extension_data)
+            extension_data = b""
+        # keep the version the index was read with, version 1 is written as version 2
+        write_cache(written_entries, stream, link_data + extension_data, version=max(self.version, 2))
         return self
 
     # } END serializable interface
@@ -208,13 +343,14 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         :param ignore_extension_data:
             If True, the TREE type extension data read in the index will not
             be written to disk. NOTE that no extension data is actually written.
-            Use this if you have altered the index and
-            would like to use git-write-tree afterwards to create a tree
-            representing your written changes.
-            If this data is present in the written index, git-write-tree
-            will instead write the stored/cached tree.
-            Alternatively, use IndexFile.write_tree() to handle this case
-            automatically
+            The cache-tree stored in the TREE extension is invalidated for all
+            entries which are changed through index.entries, hence git-write-tree
+            will create a tree representing your written changes either way.
+
+        :note: If core.splitIndex is set, or if the index was read from a split index and
+            core.splitIndex isn't disabled, only the entries which differ from the shared
+            index are written. A new shared index is written once more than
+            splitIndex.maxPercentChange percent of the entries differ from it.
 
         :return: self  # does it? or returns None?"""
         # make sure we have our entries read before getting a write lock
@@ -288,22 +424,34 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         :return:
             New IndexFile instance. Its path will be undefined.
             If you intend to write such a merged Index, supply an alternate file_path
-            to its 'write' method."""
+            to its 'write' method. Its entries are PackedIndexEntries."""
         tree_sha_bytes: List[bytes] = [to_bin_sha(str(t)) for t in tree_sha]
-        base_entries = aggressive_tree_merge(repo.odb, tree_sha_bytes)
-
-        inst = cls(repo)
-        # convert to entries dict
-        entries: Dict[Tuple[PathLike, int], IndexEntry] = dict(
-            zip(
-                ((e.path, e.stage) for e in base_entries),
-                (IndexEntry.from_base(e) for e in base_entries),
-            )
-        )
-
-        inst.entries = entries
+        inst = cls(repo, compact=True)
+        inst.entries = cls._merged_entries(repo, tree_sha_bytes)
         return inst
 
+    @staticmethod
+    def _tree_binsha(repo: "Repo", treeish: Treeish) -> bytes:
+        """:return: binary sha of the tree the given treeish refers to"""
+        if isinstance(treeish, Tree):
+            return treeish.binsha
+        if isinstance(treeish, Commit):
+            return treeish.tree.binsha
+        if isinstance(treeish, bytes):
+            treeish = treeish.decode("ascii")
+        return repo.rev_parse("%s^{tree}" % treeish).binsha
+
+    @classmethod
+    def _merged_entries(cls, repo: "Repo", tree_shas: Sequence[bytes]) -> PackedIndexEntries:
+        """:return: entries of the aggressive merge of the given binary tree shas. Entries
+        read from a single tree come with a cache-tree, like git-read-tree creates it"""
+        if len(tree_shas) in (1, 2):
+            # the last tree wins, as there is no index to merge with
+            base_entries, cache_tree = entries_from_tree(repo.odb, tree_shas[-1])
+            return PackedIndexEntries(map(IndexEntry.from_base, base_entries), cache_tree)
+        # END handle single tree
+        return PackedIndexEntries(map(IndexEntry.from_base, aggressive_tree_merge(repo.odb, tree_shas)))
+
     @classmethod
     def from_tree(cls, repo: "Repo", *treeish: Treeish, **kwargs: Any) -> "IndexFile":
         """Merge the given treeish revisions into a new index which is returned.
@@ -324,7 +472,8 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
             tree 3 is the 'other' one
 
         :param kwargs:
-            Additional arguments passed to git-read-tree
+            Additional arguments passed to git-read-tree. If given, git-read-tree
+            performs the merge.
 
         :return:
             New IndexFile instance. It will point to a temporary index location which
@@ -332,6 +481,12 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
             an alternate file_path to its 'write' method.
 
         :note:
+            The trees are merged in-process, without touching the index or any files,
+            into PackedIndexEntries. Like git-read-tree, a single tree comes with a
+            cache-tree, so writing its tree again is free.
+            git-read-tree is used instead if kwargs are given, or if a three-way merge
+            results in file/directory conflicts, as git resolves those.
+
             In the three-way merge case, --aggressive will be specified to automatically
             resolve more cases in a commonly correct manner. Specify trivial=True as kwarg
             to override that.
@@ -342,6 +497,17 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         if len(treeish) == 0 or len(treeish) > 3:
             raise ValueError("Please specify between 1 and 3 treeish, got %i" % len(treeish))
 
+        if not kwargs:
+            tree_shas = [cls._tree_binsha(repo, t) for t in treeish]
+            entries = cls._merged_entries(repo, tree_shas)
+            if len(tree_shas) < 3 or not has_path_conflicts(entries.values()):
+                # like the index written by git, ours never exists
+                index = cls(repo, tempfile.mktemp(dir=repo.git_dir), compact=True)
+                index.entries = entries
+                return index
+            # END handle conflicts
+        # END merge in-process
+
         arg_list: List[Union[Treeish, str]] = []
         # ignore that working tree and index possibly are out of date
         if len(treeish) > 1:
@@ -573,7 +739,16 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         # If we are a new index, the entries access will load our data accordingly
         mdb = MemoryDB()
         entries = self._entries_sorted()
-        binsha, tree_items = write_tree_from_cache(entries, mdb, slice(0, len(entries)))
+        # trees of directories without changes are reused from the cache-tree, which is created if missing
+        cache_tree = None
+        if isinstance(self.entries, IndexEntryMapping):
+            if self.entries.cache_tree is None:
+                self.entries.cache_tree = CacheTree()
+            cache_tree = self.entries.cache_tree
+            if cache_tree.entry_count == len(entries):
+                return Tree(self.repo, cache_tree.binsha, path="")
+        # END handle cache tree
+        binsha, tree_items = write_tree_from_cache(entries, mdb, slice(0, len(entries)), cache_tree=cache_tree)
 
         # copy changed trees only
         mdb.stream_copy(mdb.sha_iter(), self.repo.odb)
@@ -651,6 +826,45 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
             )
         )
 
+    def _store_paths(
+        self, filepaths: Iterable[PathLike], fprogress: Callable, workers: Optional[int] = 1
+    ) -> List[BaseIndexEntry]:
+        """Store the files at the given paths in the database, like ``_store_path`` does.
+
+        Unless workers is 1, files are hashed and compressed by a pool of threads, as zlib and
+        hashlib release the GIL while doing so. Only a few files per thread are in flight at
+        a time. fprogress is called from the calling thread once a file was stored, in the
+        same order as if all files were stored one after another.
+        Needs the git_working_dir decorator active ! This must be assured in the calling code
+
+        :param workers: amount of threads, or None to use one per CPU
+        :return: list of base index entries in the order of filepaths"""
+        if workers == 1:
+            return [self._store_path(filepath, fprogress) for filepath in filepaths]
+        # END handle sequential storage
+
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        no_progress: Callable = lambda *args: None
+        entries_stored: List[BaseIndexEntry] = []
+        pending: Deque[Tuple[PathLike, "Future[BaseIndexEntry]"]] = deque()
+
+        def collect() -> None:
+            filepath, future = pending.popleft()
+            entries_stored.append(future.result())
+            fprogress(filepath, False, filepath)
+            fprogress(filepath, True, filepath)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for filepath in filepaths:
+                if len(pending) >= 2 * workers:
+                    collect()
+                pending.append((filepath, pool.submit(self._store_path, filepath, no_progress)))
+            # END for each filepath
+            while pending:
+                collect()
+        # END with pool
+        return entries_stored
+
     @unbare_repo
     @git_working_dir
     def _entries_for_paths(
@@ -659,6 +873,7 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         path_rewriter: Union[Callable, None],
         fprogress: Callable,
         entries: List[BaseIndexEntry],
+        workers: Optional[int] = 1,
     ) -> List[BaseIndexEntry]:
         entries_added: List[BaseIndexEntry] = []
         if path_rewriter:
@@ -686,9 +901,7 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
 
         # HANDLE PATHS
         assert len(entries_added) == 0
-        for filepath in self._iter_expand_paths(paths):
-            entries_added.append(self._store_path(filepath, fprogress))
-        # END for each filepath
+        entries_added.extend(self._store_paths(self._iter_expand_paths(paths), fprogress, workers))
         # END path handling
         return entries_added
 
@@ -700,6 +913,7 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         path_rewriter: Union[Callable[..., PathLike], None] = None,
         write: bool = True,
         write_extension_data: bool = False,
+        workers: Optional[int] = 1,
     ) -> List[BaseIndexEntry]:
         """Add files from the working tree, specific blobs or BaseIndexEntries
         to the index.
@@ -781,16 +995,20 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
             the changes only exist in memory and are not available to git commands.
 
         :param write_extension_data:
-            If True, extension data will be written back to the index. This can lead to issues in case
-            it is containing the 'TREE' extension, which will cause the `git commit` command to write an
-            old tree, instead of a new one representing the now changed index.
-            This doesn't matter if you use `IndexFile.commit()`, which ignores the `TREE` extension altogether.
-            You should set it to True if you intend to use `IndexFile.commit()` exclusively while maintaining
-            support for third-party extensions. Besides that, you can usually safely ignore the built-in
+            If True, extension data will be written back to the index. The 'TREE' extension is kept up to
+            date with the added entries, which allows `IndexFile.write_tree()` and `git commit` to reuse the
+            trees of unchanged directories. Third-party extensions are written as they were read.
+            Besides that, you can usually safely ignore the built-in
             extensions when using GitPython on repositories that are not handled manually at all.
             All current built-in extensions are listed here:
             http://opensource.apple.com/source/Git/Git-26/src/git-htmldocs/technical/index-format.txt
 
+        :param workers:
+            Amount of threads hashing and compressing the files to be written into the object
+            database, or None to use one per CPU. If 1, all files are stored one after another
+            in the calling thread. The resulting entries and the order of the calls to
+            ``fprogress`` are the same either way.
+
         :return:
             List(BaseIndexEntries) representing the entries just actually added.
 
@@ -808,7 +1026,7 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         # That way, we are OK on a bare repository as well.
         # If there are no paths, the rewriter has nothing to do either
         if paths:
-            entries_added.extend(self._entries_for_paths(paths, path_rewriter, fprogress, entries))
+            entries_added.extend(self._entries_for_paths(paths, path_rewriter, fprogress, entries, workers))
 
         # HANDLE ENTRIES
         if entries:
@@ -826,9 +1044,11 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
 
                 @git_working_dir
                 def handle_null_entries(self: "IndexFile") -> None:
-                    for ei in null_entries_indices:
+                    new_entries = self._store_paths(
+                        [entries[ei].path for ei in null_entries_indices], fprogress, workers
+                    )
+                    for ei, new_entry in zip(null_entries_indices, new_entries):
                         null_entry = entries[ei]
-                        new_entry = self._store_path(null_entry.path, fprogress)
 
                         # update null entry
                         entries[ei] = BaseIndexEntry(
@@ -1320,6 +1540,8 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
         new_inst = type(self).from_tree(self.repo, commit)
         if not paths:
             self.entries = new_inst.entries
+            if self._compact and not isinstance(self.entries, PackedIndexEntries):
+                self.entries = PackedIndexEntries(new_inst.entries.values())
         else:
             nie = new_inst.entries
             for path in paths:
@@ -1349,6 +1571,171 @@ class IndexFile(LazyMixin, git_diff.Diffable, Serializable):
 
         return self
 
+    def _fsmonitor_hook(self) -> Optional[Callable[[str], Tuple[str, Optional[List[str]]]]]:
+        """:return: function querying the fsmonitor hook configured with core.fsmonitor, or None
+        if there is none. Git's builtin monitor, enabled with a boolean, isn't supported"""
+        hook = self.repo.config_reader().get_value("core", "fsmonitor", "")
+        if not isinstance(hook, str) or not hook or hook.lower() in ("true", "false", "yes", "no", "on", "off"):
+            return None
+        hook = osp.join(cast(PathLike, self.repo.working_tree_dir), osp.expanduser(hook))
+        return lambda token: query_fsmonitor_hook(hook, cast(PathLike, self.repo.working_tree_dir), token)
+
+    def _excludes_file(self) -> str:
+        """:return: path of the global exclude file, which may not exist"""
+        path = self.repo.config_reader().get_value("core", "excludesfile", "")
+        if path:
+            return osp.expanduser(str(path))
+        config_home = os.environ.get("XDG_CONFIG_HOME") or osp.join(osp.expanduser("~"), ".config")
+        return osp.join(config_home, "git", "ignore")
+
+    @unbare_repo
+    def status(
+        self,
+        paths: Union[PathLike, Sequence[PathLike], None] = None,
+        workers: Optional[int] = None,
+        untracked: bool = False,
+        fsmonitor: Union[bool, Callable[[str], Tuple[str, Optional[Sequence[str]]]]] = False,
+    ) -> List[StatusEntry]:
+        """Compute the status of the paths in this index without running git, like
+        ``git status --porcelain --untracked-files=no --no-renames`` does.
+
+        Files are compared to their entries using the stat data stored in the index, which
+        is done by a pool of threads. Only files which might have changed without this
+        showing in their stat data are hashed, whose entries are then updated with the
+        current stat data in memory. Write the index to keep them.
+
+        :param paths: if set, only the given paths and the paths below the given directories
+            are checked
+        :param workers: amount of threads checking the files, see working_tree_status
+        :param untracked: if True, untracked files which are not ignored are listed as well,
+            with a status of '??' like ``--untracked-files=all`` does. Directories cached in
+            the untracked cache of the index are only read again if they changed
+        :param fsmonitor: if True, the hook configured in core.fsmonitor is used to learn which
+            paths changed since the token stored in the index, so that only these, and the
+            paths known to have changed before, are checked. Alternatively a function
+            taking the token and returning a tuple(new_token, changed_paths) may be given,
+            with changed_paths being None if everything must be checked. The new token is
+            kept in the fsmonitor extension of the index if all paths were checked
+        :return: list of StatusEntry instances of all changed paths, sorted by path, followed
+            by the ones of untracked paths like git-status shows them
+        :note: Content filters like core.autocrlf are not applied, and submodules are only
+            compared by the commit they have checked out"""
+        prefixes = None
+        if paths is not None:
+            if isinstance(paths, (str, os.PathLike)):
+                paths = [paths]
+            prefixes = [str(self._to_relative_path(p)).rstrip("/") for p in paths]
+            prefixes = ["" if p == "." else p for p in prefixes]
+        # END handle paths
+
+        def included(path: str) -> bool:
+            return prefixes is None or any(not p or path == p or path.startswith(p + "/") for p in prefixes)
+
+        entries = []
+        stages: Dict[str, List[int]] = {}
+        for entry in self._entries_sorted():
+            if entry.stage:
+                stages.setdefault(str(entry.path), []).append(entry.stage)
+            else:
+                entries.append(entry)
+        # END for each entry
+
+        try:
+            head_tree_sha: Optional[bytes] = self.repo.head.commit.tree.binsha
+        except ValueError:
+            # there is no commit yet
+            head_tree_sha = None
+        # END handle unborn head
+        staged = index_status(self.repo.odb, head_tree_sha, entries, getattr(self.entries, "cache_tree", None))
+
+        monitor = self._fsmonitor_hook() if fsmonitor is True else fsmonitor or None
+        fsmonitor_data: Optional[FsmonitorData] = getattr(self.entries, "fsmonitor", None)
+        changed_paths: Optional[Sequence[str]] = None
+        if monitor is not None:
+            token = fsmonitor_data.token if fsmonitor_data is not None and fsmonitor_data.version == 2 else ""
+            new_token, changed_paths = monitor(str(token))
+            if fsmonitor_data is None:
+                # without the paths which were dirty already, everything must be checked
+                changed_paths = None
+        # END query fsmonitor
+
+        checked = [e for e in entries if included(str(e.path))]
+        changed_dirs = None
+        if changed_paths is not None:
+            fsmonitor_data = cast(FsmonitorData, fsmonitor_data)
+            changed_set = {p.rstrip("/") for p in changed_paths}
+            changed_dirs = {p.rpartition("/")[0] for p in changed_set}
+            changed_dirs.update(p.rstrip("/") for p in changed_paths if p.endswith("/"))
+
+            def maybe_changed(path: str) -> bool:
+                if path in fsmonitor_data.dirty:
+                    return True
+                while path:
+                    if path in changed_set:
+                        return True
+                    path = path.rpartition("/")[0]
+                # END for each leading directory
+                return False
+
+            checked = [e for e in checked if maybe_changed(str(e.path))]
+        # END filter unchanged paths
+
+        try:
+            index_mtime_ns: Optional[int] = os.stat(self._file_path).st_mtime_ns
+        except OSError:
+            index_mtime_ns = None
+        # END handle missing index
+        filemode = self.repo.config_reader().get_value("core", "filemode", True)
+        changed, refreshed = working_tree_status(
+            checked,
+            cast(PathLike, self.repo.working_tree_dir),
+            index_mtime_ns,
+            bool(filemode),
+            workers,
+        )
+        for entry in refreshed:
+            self.entries[(entry.path, 0)] = entry
+        # END for each refreshed entry
+
+        status = [
+            StatusEntry(path, code[0], code[1]) for path, code in unmerged_status(stages).items() if included(path)
+        ]
+        for path in set(staged).union(changed):
+            if path not in stages and included(path):
+                status.append(StatusEntry(path, staged.get(path, " "), changed.get(path, " ")))
+        # END for each changed path
+
+        status.sort()
+
+        untracked_cache = getattr(self.entries, "untracked_cache", None)
+        if untracked:
+            info_exclude = osp.join(self.repo.common_dir, "info", "exclude")
+            for path in untracked_files(
+                cast(PathLike, self.repo.working_tree_dir),
+                self.entries.values(),
+                info_exclude,
+                self._excludes_file(),
+                untracked_cache,
+                index_mtime_ns,
+                changed_dirs,
+            ):
+                if included(path):
+                    status.append(StatusEntry(path, "?", "?"))
+            # END for each untracked path
+        # END handle untracked files
+
+        if monitor is not None and prefixes is None and isinstance(self.entries, IndexEntryMapping):
+            if untracked_cache is not None and changed_paths is not None:
+                # the directories which changed since the old token can't be trusted later on
+                for path in changed_paths:
+                    untracked_cache.invalidate(path)
+            # END invalidate changed directories
+            # unless it was verified, the untracked cache may be outdated relative to the new token
+            if changed_paths is not None or untracked or untracked_cache is None:
+                self.entries.fsmonitor = FsmonitorData(2, new_token, set(changed).union(stages))
+        # END update fsmonitor token
+        return status
+
     # @ default_index, breaks typing for some reason, copied into function
     def diff(
         self,  # type: ignore[override]
@@ -2,6 +2,7 @@
 # more versatile
 # NOTE: Autodoc hates it if this is a docstring
 
+from array import array
 from io import BytesIO
 from pathlib import Path
 import os
@@ -14,6 +15,7 @@ from stat import (
     S_IFREG,
     S_IXUSR,
 )
+from struct import Struct
 import subprocess
 
 from git.cmd import PROC_CREATIONFLAGS, handle_process_output
@@ -27,6 +29,7 @@ from git.compat import (
 )
 from git.exc import UnmergedEntriesError, HookExecutionError
 from git.objects.fun import (
+    tree_entries_from_odb,
     tree_to_stream,
     traverse_tree_recursive,
     traverse_trees_recursive,
@@ -37,12 +40,45 @@ from gitdb.typ import str_tree_type
 
 import os.path as osp
 
-from .typ import BaseIndexEntry, IndexEntry, CE_NAMEMASK, CE_STAGESHIFT
-from .util import pack, unpack
+from .typ import (
+    BaseIndexEntry,
+    CacheTree,
+    FsmonitorData,
+    IndexEntry,
+    IndexEntryMapping,
+    LazyIndexEntries,
+    PackedIndexEntries,
+    SplitIndex,
+    UntrackedCache,
+    UntrackedCacheDir,
+    CE_EXTENDED,
+    CE_EXTENDED_FLAGS,
+    CE_EXTENDED_SHIFT,
+    CE_HEADER,
+    CE_NAMEMASK,
+    CE_STAGEMASK,
+    CE_STAGESHIFT,
+)
+from .util import pack, unpack, _decode_varint, _encode_varint
 
 # typing -----------------------------------------------------------------------------
 
-from typing import Dict, IO, List, Sequence, TYPE_CHECKING, Tuple, Type, Union, cast
+from typing import (
+    Callable,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    TYPE_CHECKING,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 from git.types import PathLike
 
@@ -58,11 +94,26 @@ if TYPE_CHECKING:
 
 S_IFGITLINK = S_IFLNK | S_IFDIR  # a submodule
 CE_NAMEMASK_INV = ~CE_NAMEMASK
+_flags_struct = Struct(">H")
+_index_header = Struct(">4sLL")
 
 __all__ = (
     "write_cache",
     "read_cache",
     "write_tree_from_cache",
+    "read_extensions",
+    "write_extension",
+    "read_cache_tree",
+    "write_cache_tree",
+    "read_untracked_cache",
+    "write_untracked_cache",
+    "read_fsmonitor",
+    "write_fsmonitor",
+    "read_link",
+    "write_link",
+    "split_index_changes",
+    "entries_from_tree",
+    "has_path_conflicts",
     "entry_key",
     "stat_mode_to_index_mode",
     "S_IFGITLINK",
@@ -137,14 +188,16 @@ def stat_mode_to_index_mode(mode: int) -> int:
 
 
 def write_cache(
-    entries: Sequence[Union[BaseIndexEntry, "IndexEntry"]],
+    entries: Union[Sequence[Union[BaseIndexEntry, "IndexEntry"]], PackedIndexEntries],
     stream: IO[bytes],
     extension_data: Union[None, bytes] = None,
     ShaStreamCls: Type[IndexFileSHA1Writer] = IndexFileSHA1Writer,
+    version: int = 2,
 ) -> None:
     """Write the cache represented by entries to a stream
 
-    :param entries: **sorted** list of entries
+    :param entries: **sorted** list of entries, or PackedIndexEntries, which are written
+        without unpacking them
     :param stream: stream to wrap into the AdapterStreamCls - it is used for
         final output.
 
@@ -152,52 +205,97 @@ def write_cache(
         while writing to it, before the data is passed on to the wrapped stream
 
     :param extension_data: any kind of data to write as a trailer, it must begin
-        a 4 byte identifier, followed by its size ( 4 bytes )"""
-    # wrap the stream into a compatible writer
+        a 4 byte identifier, followed by its size ( 4 bytes )
+
+    :param version: index format version to write, 2, 3 or 4. Version 4 compresses
+        paths against the path of the previous entry. Version 2 is upgraded to 3 if
+        entries have extended flags, like git does"""
+    if version not in (2, 3, 4):
+        raise ValueError("Cannot write index version %i" % version)
+    packed = isinstance(entries, PackedIndexEntries)
+    if packed:
+        extended = cast(PackedIndexEntries, entries).has_extended_flags()
+    else:
+        extended = any(e.flags & CE_EXTENDED_FLAGS for e in cast(Sequence[BaseIndexEntry], entries))
+    if version == 2 and extended:
+        version = 3
+    # END upgrade version
+
+    # the index is packed into a single preallocated buffer, which is hashed and written at once
+    extension_data = extension_data or b""
+    if packed:
+        # the records are kept in the on-disk layout already
+        body = cast(PackedIndexEntries, entries).to_index_data(version)
+        data = bytearray(12 + len(body) + len(extension_data))
+        data[12 : 12 + len(body)] = body
+        pos = 12 + len(body)
+    else:
+        data, pos = _pack_entries(cast(Sequence[IndexEntry], entries), version, 12, len(extension_data))
+    # END handle packed entries
+    _index_header.pack_into(data, 0, b"DIRC", version, len(entries))
+    data[pos:] = extension_data
+
+    # wrap the stream into a compatible writer, which writes the sha over the content
     stream_sha = ShaStreamCls(stream)
+    # the buffer is written as it is, without copying it into bytes
+    stream_sha.write(cast(bytes, data))
+    stream_sha.write_sha()
 
-    tell = stream_sha.tell
-    write = stream_sha.write
 
-    # header
-    version = 2
-    write(b"DIRC")
-    write(pack(">LL", version, len(entries)))
+def _pack_entries(
+    entries: Sequence["IndexEntry"], version: int, offset: int = 0, reserve: int = 0
+) -> Tuple[bytearray, int]:
+    """Pack the given sorted entries into a new buffer, as stored in an index of the given version
 
-    # body
+    :param offset: amount of bytes to leave free in front of the entries
+    :param reserve: amount of bytes to leave free behind the entries
+    :return: tuple(buffer, offset of the end of the entries)"""
+    # the size of the buffer is known once all paths are encoded
+    path_lengths: List[int] = []
+    paths: List[bytes] = []
+    size = offset + reserve
+    previous_path = b""
     for entry in entries:
-        beginoffset = tell()
-        write(entry.ctime_bytes)  # ctime
-        write(entry.mtime_bytes)  # mtime
-        path_str = str(entry.path)
-        path: bytes = force_bytes(path_str, encoding=defenc)
-        plen = len(path) & CE_NAMEMASK  # path length
-        assert plen == len(path), "Path %s too long to fit into index" % entry.path
-        flags = plen | (entry.flags & CE_NAMEMASK_INV)  # clear possible previous values
-        write(
-            pack(
-                ">LLLLLL20sH",
-                entry.dev,
-                entry.inode,
-                entry.mode,
-                entry.uid,
-                entry.gid,
-                entry.size,
-                entry.binsha,
-                flags,
-            )
-        )
-        write(path)
-        real_size = (tell() - beginoffset + 8) & ~7
-        write(b"\0" * ((beginoffset + real_size) - tell()))
+        path = force_bytes(str(entry.path), encoding=defenc)
+        path_lengths.append(len(path))
+        entry_size = CE_HEADER.size + (2 if entry.flags & CE_EXTENDED_FLAGS else 0)
+        if version == 4:
+            # the path replaces the given amount of bytes at the end of the previous path
+            common = len(os.path.commonprefix((previous_path, path)))
+            previous_path, path = path, _encode_varint(len(previous_path) - common) + path[common:]
+            size += entry_size + len(path) + 1
+        else:
+            # entries are padded with 1 to 8 null bytes
+            size += (entry_size + len(path) + 8) & ~7
+        # END handle path compression
+        paths.append(path)
     # END for each entry
 
-    # write previously cached extensions data
-    if extension_data is not None:
-        stream_sha.write(extension_data)
-
-    # write the sha over the content
-    stream_sha.write_sha()
+    # the buffer is zeroed, which takes care of the padding and the path terminators
+    data = bytearray(size)
+    pack_header = CE_HEADER.pack_into
+    pack_flags = _flags_struct.pack_into
+    pos = offset
+    for entry, path, path_len in zip(entries, paths, path_lengths):
+        mode, binsha, entry_flags, _path, ctime_bytes, mtime_bytes, dev, inode, uid, gid, file_size = entry
+        # paths too long for the name length are null-terminated instead, like git does
+        flags = min(path_len, CE_NAMEMASK) | (entry_flags & CE_NAMEMASK_INV & ~CE_EXTENDED & 0xFFFF)
+        extended_flags = (entry_flags & CE_EXTENDED_FLAGS) >> CE_EXTENDED_SHIFT
+        if extended_flags:
+            flags |= CE_EXTENDED
+        pack_header(data, pos, ctime_bytes, mtime_bytes, dev, inode, mode, uid, gid, file_size, binsha, flags)
+        path_pos = pos + CE_HEADER.size
+        if extended_flags:
+            pack_flags(data, path_pos, extended_flags)
+            path_pos += 2
+        # END handle extended flags
+        data[path_pos : path_pos + len(path)] = path
+        if version == 4:
+            pos = path_pos + len(path) + 1
+        else:
+            pos += (path_pos - pos + len(path) + 8) & ~7
+    # END for each entry
+    return data, pos
 
 
 def read_header(stream: IO[bytes]) -> Tuple[int, int]:
@@ -208,8 +306,7 @@ def read_header(stream: IO[bytes]) -> Tuple[int, int]:
     unpacked = cast(Tuple[int, int], unpack(">LL", stream.read(4 * 2)))
     version, num_entries = unpacked
 
-    # TODO: handle version 3: extended data, see read-cache.c
-    assert version in (1, 2)
+    assert version in (1, 2, 3, 4), "Unsupported index version: %i" % version
     return version, num_entries
 
 
@@ -233,35 +330,70 @@ def entry_key(*entry: Union[BaseIndexEntry, PathLike, int]) -> Tuple[PathLike, i
 
 def read_cache(
     stream: IO[bytes],
-) -> Tuple[int, Dict[Tuple[PathLike, int], "IndexEntry"], bytes, bytes]:
+    read_shared_index: Optional[Callable[[bytes], IO[bytes]]] = None,
+    compact: bool = False,
+) -> Tuple[int, MutableMapping[Tuple[PathLike, int], "IndexEntry"], bytes, bytes]:
     """Read a cache file from the given stream
 
+    :param read_shared_index: function returning a stream of the shared index with the
+        given binary sha. If set and the cache is a split index, as indicated by its link
+        extension, the entries of the shared index are merged with the ones of the split
+        index, and the link extension is not returned as part of the extension data
+    :param compact: if True, the entries are kept as PackedIndexEntries instead of
+        LazyIndexEntries, which need a fraction of the memory for large indices
     :return: tuple(version, entries_dict, extension_data, content_sha)
 
       * version is the integer version number
-      * entries dict is a dictionary which maps IndexEntry instances to a path at a stage
+      * entries dict is a mapping of IndexEntry instances to a path at a stage. The entries
+        are unpacked lazily from the read data, or from their packed records, once they
+        are accessed
       * extension_data is '' or 4 bytes of type + 4 bytes of size + size bytes
       * content_sha is a 20 byte sha on all cache file contents"""
     version, num_entries = read_header(stream)
-    count = 0
-    entries: Dict[Tuple[PathLike, int], "IndexEntry"] = {}
-
-    read = stream.read
-    tell = stream.tell
-    while count < num_entries:
-        beginoffset = tell()
-        ctime = unpack(">8s", read(8))[0]
-        mtime = unpack(">8s", read(8))[0]
-        (dev, ino, mode, uid, gid, size, sha, flags) = unpack(">LLLLLL20sH", read(20 + 4 * 6 + 2))
-        path_size = flags & CE_NAMEMASK
-        path = read(path_size).decode(defenc)
-
-        real_size = (tell() - beginoffset + 8) & ~7
-        read((beginoffset + real_size) - tell())
-        entry = IndexEntry((mode, sha, flags, path, ctime, mtime, dev, ino, uid, gid, size))
-        # entry_key would be the method to use, but we safe the effort
-        entries[(path, entry.stage)] = entry
-        count += 1
+    # read everything at once and scan it for the entry keys, there is no need to unpack
+    # anything but the flags, which hold the path length and the stage
+    data = stream.read()
+    items: Dict[Tuple[PathLike, int], Union[int, IndexEntry]] = {}
+    # entries of a split index which replace shared entries have no path
+    replacements: List[int] = []
+    # packed entries need no keys, just their paths and offsets
+    packed_paths: List[bytes] = []
+    packed_offsets = array("Q")
+    unpack_flags = _flags_struct.unpack_from
+    flags_offset = CE_HEADER.size - 2
+    find = data.find
+    path = b""
+    pos = 0
+    for _ in range(num_entries):
+        flags = unpack_flags(data, pos + flags_offset)[0]
+        path_start = pos + CE_HEADER.size
+        if flags & CE_EXTENDED:
+            path_start += 2
+        if version == 4:
+            # the path replaces the given amount of bytes at the end of the previous path
+            strip, path_start = _decode_varint(data, path_start)
+            path_end = find(b"\0", path_start)
+            path = path[: len(path) - strip] + data[path_start:path_end]
+            next_pos = path_end + 1
+        else:
+            path_end = path_start + (flags & CE_NAMEMASK)
+            if flags & CE_NAMEMASK == CE_NAMEMASK:
+                # the length doesn't fit, and the path is null-terminated instead
+                path_end = find(b"\0", path_start)
+            path = data[path_start:path_end]
+            # entries are padded with 1 to 8 null bytes
+            next_pos = pos + ((path_end - pos + 8) & ~7)
+        # END handle path compression
+        if not path:
+            replacements.append(pos)
+        elif compact:
+            packed_paths.append(path)
+            packed_offsets.append(pos)
+        else:
+            # entry_key would be the method to use, but we safe the effort
+            items[(path.decode(defenc), (flags & CE_STAGEMASK) >> CE_STAGESHIFT)] = pos
+        # END handle entry
+        pos = next_pos
     # END for each entry
 
     # the footer contains extension data and a sha on the content so far
@@ -270,7 +402,7 @@ def read_cache(
     # 4 bytes ID
     # 4 bytes length of chunk
     # repeated 0 - N times
-    extension_data = stream.read(~0)
+    extension_data = data[pos:]
     assert (
         len(extension_data) > 19
     ), "Index Footer was not at least a sha on content as it was only %i bytes in size" % len(extension_data)
@@ -280,11 +412,361 @@ def read_cache(
     # truncate the sha in the end as we will dynamically create it anyway
     extension_data = extension_data[:-20]
 
+    entries: IndexEntryMapping
+    if read_shared_index is not None and extension_data[:4] == b"link":
+        # git writes the link extension first
+        link_size = unpack(">L", extension_data[4:8])[0]
+        base_sha, delete_bits, replace_bits = read_link(extension_data[8 : 8 + link_size])
+        extension_data = extension_data[8 + link_size :]
+        base = cast(LazyIndexEntries, read_cache(read_shared_index(base_sha))[1])
+        for path, offset in zip(packed_paths, packed_offsets):
+            items[(path.decode(defenc), (data[offset + flags_offset] & 0x30) >> 4)] = offset
+        # END for each packed entry
+        entries = _merge_split_index(base, data, items, replacements, delete_bits, replace_bits)
+        if compact:
+            entries = PackedIndexEntries(entries.values())
+        entries.split_index = SplitIndex(base_sha, base)
+    elif compact:
+        # records are the entry headers, including the extended flags, in the on-disk layout
+        header_size = CE_HEADER.size
+        records = b"".join(
+            data[offset : offset + header_size]
+            + (data[offset + header_size : offset + header_size + 2] if data[offset + flags_offset] & 0x40 else b"\0\0")
+            for offset in packed_offsets
+        )
+        entries = PackedIndexEntries._from_buffers(records, packed_paths)
+    else:
+        entries = LazyIndexEntries(data, items, is_sorted=True)
+    # END handle entries
     return (version, entries, extension_data, content_sha)
 
 
+def read_link(data: bytes) -> Tuple[bytes, List[int], List[int]]:
+    """:return: tuple(shared_index_sha, delete_positions, replace_positions) as parsed from the
+    data of the link extension of a split index, with positions referring to the entries of
+    the shared index"""
+    if len(data) == 20:
+        return data, [], []
+    delete_bits, pos = _read_ewah(data, 20)
+    replace_bits = _read_ewah(data, pos)[0]
+    return data[:20], delete_bits, replace_bits
+
+
+def write_link(base_sha: bytes, delete_positions: Iterable[int], replace_positions: Iterable[int], size: int) -> bytes:
+    """:return: data of the link extension of a split index
+    :param size: amount of entries in the shared index"""
+    return base_sha + _write_ewah(delete_positions, size) + _write_ewah(replace_positions, size)
+
+
+def _merge_split_index(
+    base: LazyIndexEntries,
+    data: bytes,
+    items: Dict[Tuple[PathLike, int], Union[int, IndexEntry]],
+    replacements: List[int],
+    delete_bits: List[int],
+    replace_bits: List[int],
+) -> LazyIndexEntries:
+    """:return: entries of the shared index, with the replacements and deletions of the split
+    index applied and its new entries added. Entries of the split index are unpacked right away,
+    while the shared ones are unpacked lazily from the data of the shared index."""
+    base_keys = list(base.keys())
+    merged = dict(base._items)
+    for position, offset in zip(replace_bits, replacements):
+        path = base_keys[position][0]
+        entry = IndexEntry.from_buffer(data, offset, path)
+        # the flags of the replacing entry hold the length of its stripped path
+        name_length = min(len(force_bytes(str(path), encoding=defenc)), CE_NAMEMASK)
+        entry = entry._replace(flags=entry.flags | name_length)
+        merged[(path, entry.stage)] = entry
+    # END for each replaced entry
+    for position in delete_bits:
+        del merged[base_keys[position]]
+    # END for each deleted entry
+    for key, item in items.items():
+        merged[key] = IndexEntry.from_buffer(data, cast(int, item), key[0])
+    # END for each new entry
+    return LazyIndexEntries(base._data, merged)
+
+
+def split_index_changes(
+    entries: Sequence[IndexEntry], base: LazyIndexEntries
+) -> Tuple[List[IndexEntry], List[int], List[int]]:
+    """Compare the given entries to the ones of a shared index, to write them as split index.
+
+    :param entries: sorted entries to write
+    :param base: entries of the shared index, in the order of the shared index file
+    :return: tuple(split_entries, delete_positions, replace_positions). split_entries are the
+        entries to write into the split index, which are the replacing entries with their
+        paths stripped in the order of the shared entries they replace, followed by the new
+        entries"""
+    base_positions = {key: i for i, key in enumerate(base.keys())}
+    replaced: List[Tuple[int, IndexEntry]] = []
+    added: List[IndexEntry] = []
+    for entry in entries:
+        key = (entry.path, entry.stage)
+        position = base_positions.pop(key, None)
+        if position is None:
+            added.append(entry)
+        else:
+            # the length of the path in the flags is computed when writing
+            base_entry = base[key]
+            if (
+                base_entry[:2] != entry[:2]
+                or base_entry[4:] != entry[4:]
+                or base_entry.flags & CE_NAMEMASK_INV != entry.flags & CE_NAMEMASK_INV
+            ):
+                replaced.append((position, entry._replace(path="")))
+        # END handle entry
+    # END for each entry
+    replaced.sort(key=lambda item: item[0])
+    split_entries = [entry for _position, entry in replaced]
+    split_entries.extend(added)
+    return split_entries, sorted(base_positions.values()), [position for position, _entry in replaced]
+
+
+def read_extensions(extension_data: bytes) -> Iterator[Tuple[bytes, bytes]]:
+    """:return: iterator yielding tuple(signature, data) for each extension in extension_data,
+    as returned by read_cache"""
+    pos = 0
+    while pos < len(extension_data):
+        signature = extension_data[pos : pos + 4]
+        size = unpack(">L", extension_data[pos + 4 : pos + 8])[0]
+        yield signature, extension_data[pos + 8 : pos + 8 + size]
+        pos += 8 + size
+    # END for each extension
+
+
+def write_extension(signature: bytes, data: bytes) -> bytes:
+    """:return: the given extension data, prefixed with its signature and size"""
+    return signature + pack(">L", len(data)) + data
+
+
+def read_cache_tree(data: bytes) -> CacheTree:
+    """:return: root CacheTree as parsed from the data of the TREE extension"""
+
+    def read_node(pos: int) -> Tuple[str, CacheTree, int]:
+        name_end = data.index(b"\0", pos)
+        name = data[pos:name_end].decode(defenc)
+        line_end = data.index(b"\n", name_end)
+        entry_count, num_subtrees = (int(n) for n in data[name_end + 1 : line_end].split(b" "))
+        node = CacheTree(entry_count)
+        pos = line_end + 1
+        if entry_count >= 0:
+            node.binsha = data[pos : pos + 20]
+            pos += 20
+        # END handle valid node
+        for _ in range(num_subtrees):
+            subtree_name, subtree, pos = read_node(pos)
+            node.subtrees[subtree_name] = subtree
+        # END for each subtree
+        return name, node, pos
+
+    return read_node(0)[1]
+
+
+def write_cache_tree(cache_tree: CacheTree) -> bytes:
+    """:return: data of the TREE extension representing the given root CacheTree"""
+    out: List[bytes] = []
+
+    def write_node(name: bytes, node: CacheTree) -> None:
+        out.append(b"%s\0%i %i\n" % (name, node.entry_count, len(node.subtrees)))
+        if node.entry_count >= 0:
+            out.append(node.binsha)
+        # git orders subtrees by the length of their name first, see subtree_name_cmp()
+        subtrees = [(name.encode(defenc), subtree) for name, subtree in node.subtrees.items()]
+        subtrees.sort(key=lambda item: (len(item[0]), item[0]))
+        for subtree_name, subtree in subtrees:
+            write_node(subtree_name, subtree)
+        # END for each subtree
+
+    write_node(b"", cache_tree)
+    return b"".join(out)
+
+
+def _read_ewah(data: bytes, pos: int) -> Tuple[List[int], int]:
+    """:return: tuple(positions of set bits, offset past the bitmap) of the EWAH compressed
+    bitmap at pos in data"""
+    bit_size, num_words = unpack(">LL", data[pos : pos + 8])
+    words = unpack(">%iQ" % num_words, data[pos + 8 : pos + 8 + 8 * num_words])
+    bits: List[int] = []
+    bit = 0
+    wi = 0
+    while wi < num_words:
+        marker = words[wi]
+        wi += 1
+        run_length = (marker >> 1) & 0xFFFFFFFF
+        if marker & 1:
+            bits.extend(range(bit, bit + run_length * 64))
+        bit += run_length * 64
+        for word in words[wi : wi + (marker >> 33)]:
+            while word:
+                low_bit = word & -word
+                bits.append(bit + low_bit.bit_length() - 1)
+                word ^= low_bit
+            # END for each set bit
+            bit += 64
+        # END for each literal word
+        wi += marker >> 33
+    # END for each marker word
+    # skip the position of the last marker word
+    return [b for b in bits if b < bit_size], pos + 8 + 8 * num_words + 4
+
+
+def _write_ewah(bits: Iterable[int], bit_size: int) -> bytes:
+    """:return: EWAH bitmap of the given size with the given bits set, using a single
+    marker word followed by literal words"""
+    words = [0] * ((bit_size + 63) // 64)
+    for bit in bits:
+        words[bit // 64] |= 1 << (bit % 64)
+    # END for each bit
+    return (
+        pack(">LL", bit_size, len(words) + 1)
+        + pack(">%iQ" % (len(words) + 1), len(words) << 33, *words)
+        + pack(">L", 0)
+    )
+
+
+def _read_stat_data(data: bytes, pos: int) -> Tuple[bytes, int]:
+    return data[pos : pos + 36], pos + 36
+
+
+def read_untracked_cache(data: bytes) -> UntrackedCache:
+    """:return: UntrackedCache as parsed from the data of the UNTR extension"""
+    ident_size, pos = _decode_varint(data, 0)
+    uc = UntrackedCache(data[pos : pos + ident_size])
+    pos += ident_size
+    uc.info_exclude_stat, pos = _read_stat_data(data, pos)
+    uc.excludes_file_stat, pos = _read_stat_data(data, pos)
+    uc.dir_flags = unpack(">L", data[pos : pos + 4])[0]
+    uc.info_exclude_sha = data[pos + 4 : pos + 24]
+    uc.excludes_file_sha = data[pos + 24 : pos + 44]
+    pos += 44
+    name_end = data.index(b"\0", pos)
+    uc.exclude_per_dir = data[pos:name_end].decode(defenc)
+    num_dirs, pos = _decode_varint(data, name_end + 1)
+    if not num_dirs:
+        return uc
+    # END handle empty cache
+
+    # directories are stored depth-first, and all bitmaps refer to that order
+    dirs: List[UntrackedCacheDir] = []
+
+    def read_dir(pos: int) -> Tuple[UntrackedCacheDir, int]:
+        num_untracked, pos = _decode_varint(data, pos)
+        num_subdirs, pos = _decode_varint(data, pos)
+        name_end = data.index(b"\0", pos)
+        node = UntrackedCacheDir(data[pos:name_end].decode(defenc))
+        dirs.append(node)
+        pos = name_end + 1
+        for _ in range(num_untracked):
+            name_end = data.index(b"\0", pos)
+            node.untracked.append(data[pos:name_end].decode(defenc))
+            pos = name_end + 1
+        # END for each untracked name
+        for _ in range(num_subdirs):
+            subdir, pos = read_dir(pos)
+            node.subdirs[subdir.name] = subdir
+        # END for each subdirectory
+        return node, pos
+
+    uc.root, pos = read_dir(pos)
+    valid, pos = _read_ewah(data, pos)
+    check_only, pos = _read_ewah(data, pos)
+    sha_valid, pos = _read_ewah(data, pos)
+    for i in valid:
+        dirs[i].valid = True
+        dirs[i].stat_data, pos = _read_stat_data(data, pos)
+    # END for each valid directory
+    for i in check_only:
+        dirs[i].check_only = True
+    # END for each check-only directory
+    for i in sha_valid:
+        dirs[i].exclude_sha = data[pos : pos + 20]
+        pos += 20
+    # END for each directory with exclude file
+    return uc
+
+
+def write_untracked_cache(uc: UntrackedCache) -> bytes:
+    """:return: data of the UNTR extension representing the given UntrackedCache"""
+    out = [
+        _encode_varint(len(uc.ident)),
+        uc.ident,
+        uc.info_exclude_stat,
+        uc.excludes_file_stat,
+        pack(">L", uc.dir_flags),
+        uc.info_exclude_sha,
+        uc.excludes_file_sha,
+        uc.exclude_per_dir.encode(defenc) + b"\0",
+    ]
+    if uc.root is None:
+        out.append(_encode_varint(0))
+        return b"".join(out)
+    # END handle empty cache
+
+    dirs: List[UntrackedCacheDir] = []
+    dir_data: List[bytes] = []
+
+    def write_dir(node: UntrackedCacheDir) -> None:
+        dirs.append(node)
+        untracked = node.untracked if node.valid else []
+        dir_data.append(_encode_varint(len(untracked)))
+        dir_data.append(_encode_varint(len(node.subdirs)))
+        dir_data.append(node.name.encode(defenc) + b"\0")
+        dir_data.extend(name.encode(defenc) + b"\0" for name in untracked)
+        for subdir in node.subdirs.values():
+            write_dir(subdir)
+        # END for each subdirectory
+
+    write_dir(uc.root)
+    out.append(_encode_varint(len(dirs)))
+    out.extend(dir_data)
+    out.append(_write_ewah((i for i, d in enumerate(dirs) if d.valid), len(dirs)))
+    out.append(_write_ewah((i for i, d in enumerate(dirs) if d.valid and d.check_only), len(dirs)))
+    out.append(_write_ewah((i for i, d in enumerate(dirs) if d.exclude_sha.strip(b"\0")), len(dirs)))
+    out.extend(d.stat_data for d in dirs if d.valid)
+    out.extend(d.exclude_sha for d in dirs if d.exclude_sha.strip(b"\0"))
+    out.append(b"\0")
+    return b"".join(out)
+
+
+def read_fsmonitor(data: bytes, paths: Sequence[PathLike]) -> FsmonitorData:
+    """:return: FsmonitorData as parsed from the data of the FSMN extension
+    :param paths: paths of the index entries in the order they were read in"""
+    version = unpack(">L", data[:4])[0]
+    if version == 1:
+        token: Union[str, int] = unpack(">Q", data[4:12])[0]
+        pos = 12
+    elif version == 2:
+        token_end = data.index(b"\0", 4)
+        token = data[4:token_end].decode(defenc)
+        pos = token_end + 1
+    else:
+        raise ValueError("Unsupported fsmonitor extension version: %i" % version)
+    # END handle version
+    dirty_bits = _read_ewah(data, pos + 4)[0]
+    return FsmonitorData(version, token, {str(paths[i]) for i in dirty_bits if i < len(paths)})
+
+
+def write_fsmonitor(fsmonitor: FsmonitorData, paths: Sequence[PathLike]) -> bytes:
+    """:return: data of the FSMN extension representing the given FsmonitorData
+    :param paths: paths of the index entries in the order they are written in"""
+    if fsmonitor.version == 1:
+        header = pack(">LQ", 1, int(fsmonitor.token))
+    else:
+        header = pack(">L", 2) + str(fsmonitor.token).encode(defenc) + b"\0"
+    # END handle version
+    dirty = fsmonitor.dirty
+    bitmap = _write_ewah((i for i, path in enumerate(paths) if str(path) in dirty), len(paths))
+    return header + pack(">L", len(bitmap)) + bitmap
+
+
 def write_tree_from_cache(
-    entries: List[IndexEntry], odb: "GitCmdObjectDB", sl: slice, si: int = 0
+    entries: List[IndexEntry],
+    odb: "GitCmdObjectDB",
+    sl: slice,
+    si: int = 0,
+    cache_tree: Optional[CacheTree] = None,
 ) -> Tuple[bytes, List["TreeCacheTup"]]:
     """Create a tree from the given sorted list of entries and put the respective
     trees into the given object database
@@ -293,6 +775,9 @@ def write_tree_from_cache(
     :param odb: object database to store the trees in
     :param si: start index at which we should start creating subtrees
     :param sl: slice indicating the range we should process on the entries list
+    :param cache_tree: if set, the CacheTree node of the tree to create. The trees of
+        its valid subtrees are used as they are instead of being created again, and all
+        nodes are updated to match the written trees
     :return: tuple(binsha, list(tree_entry, ...)) a tuple of a sha and a list of
         tree entries being a tuple of hexsha, mode, name"""
     tree_items: List["TreeCacheTup"] = []
@@ -312,6 +797,28 @@ def write_tree_from_cache(
         else:
             # find common base range
             base = entry.path[si:rbound]
+            subtree = None
+            if cache_tree is not None:
+                subtree = cache_tree.subtrees.get(base)
+                if subtree is None:
+                    subtree = cache_tree.subtrees[base] = CacheTree()
+                # END create node
+                if subtree.entry_count > 0:
+                    # the node tells where the directory ends, which we just verify
+                    xi = ci - 1 + subtree.entry_count
+                    prefix = entry.path[: rbound + 1]
+                    if (
+                        xi <= end
+                        and entries[xi - 1].path.startswith(prefix)
+                        and (xi == end or not entries[xi].path.startswith(prefix))
+                    ):
+                        tree_items.append((subtree.binsha, S_IFDIR, base))
+                        ci = xi
+                        continue
+                    # END reuse valid subtree
+                # END handle valid subtree
+            # END handle cache tree
+
             xi = ci
             while xi < end:
                 oentry = entries[xi]
@@ -324,7 +831,7 @@ def write_tree_from_cache(
 
             # enter recursion
             # ci - 1 as we want to count our current item as well
-            sha, _tree_entry_list = write_tree_from_cache(entries, odb, slice(ci - 1, xi), rbound + 1)
+            sha, _tree_entry_list = write_tree_from_cache(entries, odb, slice(ci - 1, xi), rbound + 1, subtree)
             tree_items.append((sha, S_IFDIR, base))
 
             # skip ahead
@@ -338,6 +845,16 @@ def write_tree_from_cache(
     sio.seek(0)
 
     istream = odb.store(IStream(str_tree_type, len(sio.getvalue()), sio))
+
+    if cache_tree is not None:
+        cache_tree.entry_count = end - sl.start
+        cache_tree.binsha = istream.binsha
+        # drop nodes of directories which don't exist anymore
+        names = {name for _sha, mode, name in tree_items if mode == S_IFDIR}
+        for name in [name for name in cache_tree.subtrees if name not in names]:
+            del cache_tree.subtrees[name]
+        # END for each stale node
+    # END update cache tree
     return (istream.binsha, tree_items)
 
 
@@ -368,76 +885,66 @@ def aggressive_tree_merge(odb: "GitCmdObjectDB", tree_shas: Sequence[bytes]) ->
     if len(tree_shas) > 3:
         raise ValueError("Cannot handle %i trees at once" % len(tree_shas))
 
-    # three trees
+    # three trees, merged like git-read-tree -m --aggressive does
     for base, ours, theirs in traverse_trees_recursive(odb, tree_shas, ""):
-        if base is not None:
-            # base version exists
+        # entries are the same if they have the same sha and mode, or are missing in both trees
+        base_id, ours_id, theirs_id = ((e and e[:2]) for e in (base, ours, theirs))
+        if ours_id == theirs_id:
+            # changed, added or deleted the same way in both branches, or not changed at all
             if ours is not None:
-                # ours exists
-                if theirs is not None:
-                    # it exists in all branches, if it was changed in both
-                    # its a conflict, otherwise we take the changed version
-                    # This should be the most common branch, so it comes first
-                    if (base[0] != ours[0] and base[0] != theirs[0] and ours[0] != theirs[0]) or (
-                        base[1] != ours[1] and base[1] != theirs[1] and ours[1] != theirs[1]
-                    ):
-                        # changed by both
-                        out.append(_tree_entry_to_baseindexentry(base, 1))
-                        out.append(_tree_entry_to_baseindexentry(ours, 2))
-                        out.append(_tree_entry_to_baseindexentry(theirs, 3))
-                    elif base[0] != ours[0] or base[1] != ours[1]:
-                        # only we changed it
-                        out.append(_tree_entry_to_baseindexentry(ours, 0))
-                    else:
-                        # either nobody changed it, or they did. In either
-                        # case, use theirs
-                        out.append(_tree_entry_to_baseindexentry(theirs, 0))
-                    # END handle modification
-                else:
-                    if ours[0] != base[0] or ours[1] != base[1]:
-                        # they deleted it, we changed it, conflict
-                        out.append(_tree_entry_to_baseindexentry(base, 1))
-                        out.append(_tree_entry_to_baseindexentry(ours, 2))
-                    # else:
-                    #   we didn't change it, ignore
-                    #   pass
-                    # END handle our change
-                # END handle theirs
-            else:
-                if theirs is None:
-                    # deleted in both, its fine - its out
-                    pass
-                else:
-                    if theirs[0] != base[0] or theirs[1] != base[1]:
-                        # deleted in ours, changed theirs, conflict
-                        out.append(_tree_entry_to_baseindexentry(base, 1))
-                        out.append(_tree_entry_to_baseindexentry(theirs, 3))
-                    # END theirs changed
-                    # else:
-                    #   theirs didn't change
-                    #   pass
-                # END handle theirs
-            # END handle ours
-        else:
-            # all three can't be None
-            if ours is None:
-                # added in their branch
-                assert theirs is not None
+                out.append(_tree_entry_to_baseindexentry(ours, 0))
+        elif ours_id == base_id:
+            # only they changed, added or deleted it
+            if theirs is not None:
                 out.append(_tree_entry_to_baseindexentry(theirs, 0))
-            elif theirs is None:
-                # added in our branch
+        elif theirs_id == base_id:
+            # only we changed, added or deleted it
+            if ours is not None:
                 out.append(_tree_entry_to_baseindexentry(ours, 0))
-            else:
-                # both have it, except for the base, see whether it changed
-                if ours[0] != theirs[0] or ours[1] != theirs[1]:
-                    out.append(_tree_entry_to_baseindexentry(ours, 2))
-                    out.append(_tree_entry_to_baseindexentry(theirs, 3))
-                else:
-                    # it was added the same in both
-                    out.append(_tree_entry_to_baseindexentry(ours, 0))
-                # END handle two items
-            # END handle heads
-        # END handle base exists
+        else:
+            # changed differently in both branches, conflict
+            for stage, tree_entry in enumerate((base, ours, theirs), 1):
+                if tree_entry is not None:
+                    out.append(_tree_entry_to_baseindexentry(tree_entry, stage))
+            # END for each version
+        # END handle changes
     # END for each entries tuple
 
     return out
+
+
+def entries_from_tree(odb: "GitCmdObjectDB", tree_sha: bytes) -> Tuple[List[BaseIndexEntry], CacheTree]:
+    """:return: tuple(entries, cache_tree) with BaseIndexEntries for all blobs and submodules
+        of the given tree, sorted by path, and the root of the cache-tree describing the tree
+        and all of its subtrees, like git-read-tree creates it
+    :param tree_sha: binary sha of the tree to read"""
+    out: List[BaseIndexEntry] = []
+
+    def read_tree(binsha: bytes, path_prefix: str) -> CacheTree:
+        node = CacheTree(binsha=binsha)
+        first = len(out)
+        for sha, mode, name in tree_entries_from_odb(odb, binsha):
+            if S_ISDIR(mode):
+                node.subtrees[name] = read_tree(sha, path_prefix + name + "/")
+            else:
+                out.append(BaseIndexEntry((mode, sha, 0, path_prefix + name)))
+        # END for each tree entry
+        node.entry_count = len(out) - first
+        return node
+
+    return out, read_tree(tree_sha, "")
+
+
+def has_path_conflicts(entries: Iterable[BaseIndexEntry]) -> bool:
+    """:return: True if the path of one of the given entries is a leading directory of the
+    path of another, which can't be represented in a tree"""
+    paths = {str(e.path) for e in entries}
+    for path in paths:
+        i = path.rfind("/")
+        while i > 0:
+            if path[:i] in paths:
+                return True
+            i = path.rfind("/", 0, i)
+        # END for each leading directory
+    # END for each path
+    return False
@@ -0,0 +1,583 @@
+# status.py
+# Copyright (C) 2008, 2009 Michael Trier (mtrier@gmail.com) and contributors
+#
+# This module is part of GitPython and is released under
+# the BSD License: https://opensource.org/license/bsd-3-clause/
+"""Module with an in-process implementation of git-status based on the stat data of the index"""
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import os.path as osp
+import re
+from stat import S_IFMT, S_IFLNK, S_IFREG, S_ISDIR, S_ISLNK, S_ISREG, S_IXUSR
+import subprocess
+
+from git.cmd import PROC_CREATIONFLAGS
+from git.compat import is_posix
+from git.objects.fun import diff_trees_recursive, traverse_tree_recursive
+from git.objects.util import _glob_to_regex
+from git.refs.symbolic import SymbolicReference
+from git.repo.fun import find_submodule_git_dir
+from git.util import hex_to_bin
+
+from .fun import S_IFGITLINK
+from .typ import BaseIndexEntry, CacheTree, IndexEntry, UntrackedCache, UntrackedCacheDir
+
+# typing -----------------------------------------------------------------------------
+
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Set, TYPE_CHECKING, Tuple, cast
+
+from git.types import PathLike
+
+if TYPE_CHECKING:
+    from git.db import GitCmdObjectDB
+    from git.objects.fun import EntryTup
+
+# ------------------------------------------------------------------------------------
+
+__all__ = (
+    "entry_from_stat",
+    "index_status",
+    "working_tree_status",
+    "unmerged_status",
+    "untracked_cache_ident",
+    "untracked_files",
+    "query_fsmonitor_hook",
+)
+
+# codes of unmerged paths by the stages they have entries in, as shown by git-status
+_UNMERGED_CODES = {
+    (1,): "DD",
+    (2,): "AU",
+    (1, 2): "UD",
+    (3,): "UA",
+    (1, 3): "DU",
+    (2, 3): "AA",
+    (1, 2, 3): "UU",
+}
+
+# amount of entries checked by a worker at a time
+_BATCH_SIZE = 512
+
+_NULL_SHA = b"\0" * 20
+
+# compiled pattern, negated, directories only, matched against the basename only
+_ExcludePattern = Tuple[Pattern[str], bool, bool, bool]
+# directory the patterns are relative to, like 'a/b/', and the patterns in file order
+_ExcludeList = Tuple[str, List[_ExcludePattern]]
+
+
+def _time_bytes(ns: int) -> bytes:
+    return ((ns // 1000000000) & 0xFFFFFFFF).to_bytes(4, "big") + (ns % 1000000000).to_bytes(4, "big")
+
+
+def entry_from_stat(entry: IndexEntry, st: os.stat_result) -> IndexEntry:
+    """:return: copy of the given entry with its stat data taken from st"""
+    return entry._replace(
+        ctime_bytes=_time_bytes(st.st_ctime_ns),
+        mtime_bytes=_time_bytes(st.st_mtime_ns),
+        dev=st.st_dev & 0xFFFFFFFF,
+        inode=st.st_ino & 0xFFFFFFFF,
+        uid=st.st_uid & 0xFFFFFFFF,
+        gid=st.st_gid & 0xFFFFFFFF,
+        size=st.st_size & 0xFFFFFFFF,
+    )
+
+
+def _hash_file(abspath: str, st: os.stat_result) -> bytes:
+    """:return: binary sha of the blob git would create for the file at abspath"""
+    if S_ISLNK(st.st_mode):
+        data = os.fsencode(os.readlink(abspath))
+        return hashlib.sha1(b"blob %i\0" % len(data) + data).digest()
+    # END handle symlink
+    sha = hashlib.sha1(b"blob %i\0" % st.st_size)
+    with open(abspath, "rb") as fp:
+        for chunk in iter(lambda: fp.read(65536), b""):
+            sha.update(chunk)
+    # END read file
+    return sha.digest()
+
+
+def _submodule_head(abspath: str) -> Optional[bytes]:
+    """:return: binary sha of the commit checked out in the submodule at abspath, or None
+    if it is not checked out"""
+    from git.repo import Repo
+
+    git_dir = find_submodule_git_dir(osp.join(abspath, ".git"))
+    if git_dir is None:
+        return None
+    try:
+        return hex_to_bin(SymbolicReference.dereference_recursive(Repo(git_dir), "HEAD"))
+    except (OSError, ValueError):
+        return None
+    # END exception handling
+
+
+def _working_tree_status(
+    entry: IndexEntry, abspath: str, racy_ns: Optional[int], filemode: bool
+) -> Tuple[str, Optional[IndexEntry]]:
+    """:return: tuple(status_code, refreshed_entry) of a single entry at stage 0, where
+    refreshed_entry is set if the entry was found unchanged by content"""
+    try:
+        st = os.lstat(abspath)
+    except (FileNotFoundError, NotADirectoryError):
+        return "D", None
+    # END handle removed files
+
+    mode = entry.mode
+    if mode == S_IFGITLINK:
+        if not S_ISDIR(st.st_mode):
+            return "T", None
+        sha = _submodule_head(abspath)
+        return ("M" if sha is not None and sha != entry.binsha else " "), None
+    # END handle submodules
+    if S_ISDIR(st.st_mode):
+        # a directory which replaced a file
+        return "D", None
+    if S_ISLNK(st.st_mode):
+        file_type = S_IFLNK
+    elif S_ISREG(st.st_mode):
+        file_type = S_IFREG
+    else:
+        file_type = S_IFMT(st.st_mode)
+    if S_IFMT(mode) != file_type:
+        return "T", None
+    if entry.intent_to_add:
+        return "A", None
+    if filemode and S_ISREG(st.st_mode) and bool(mode & S_IXUSR) != bool(st.st_mode & S_IXUSR):
+        return "M", None
+    # END handle mode changes
+
+    size = st.st_size & 0xFFFFFFFF
+    stat_matches = (
+        entry.mtime_bytes == _time_bytes(st.st_mtime_ns)
+        and entry.ctime_bytes == _time_bytes(st.st_ctime_ns)
+        and entry.size == size
+        and entry.inode == st.st_ino & 0xFFFFFFFF
+        and entry.uid == st.st_uid & 0xFFFFFFFF
+        and entry.gid == st.st_gid & 0xFFFFFFFF
+    )
+    if stat_matches:
+        # the file may have been changed after it was added within the same timestamp,
+        # unless it is older than the index
+        if racy_ns is not None and st.st_mtime_ns < racy_ns:
+            return " ", None
+    elif entry.size != size and entry.size != 0:
+        # a size of 0 may be a racily-clean entry git 'smudged' when writing the index
+        return "M", None
+    # END compare stat data
+
+    if _hash_file(abspath, st) != entry.binsha:
+        return "M", None
+    return " ", (None if stat_matches else entry_from_stat(entry, st))
+
+
+def working_tree_status(
+    entries: Sequence[IndexEntry],
+    working_tree_dir: PathLike,
+    index_mtime_ns: Optional[int] = None,
+    filemode: bool = True,
+    workers: Optional[int] = None,
+) -> Tuple[Dict[str, str], List[IndexEntry]]:
+    """Compare the given entries to the files in the working tree, like git-diff-files does.
+
+    The stat data of each entry is compared to the one of its file first. Only files with
+    differing stat data but the same size, and files which may have changed within the same
+    timestamp their entry was recorded in (racily clean entries), are hashed.
+
+    :param entries: entries at stage 0 to check
+    :param working_tree_dir: directory the paths of the entries are relative to
+    :param index_mtime_ns: modification time of the index file the entries were read from,
+        in nanoseconds. If None, all entries are considered racily clean
+    :param filemode: if True, changes of the executable bit are reported, like core.filemode does
+    :param workers: amount of threads checking the files, or None to let the thread pool choose.
+        If 1, all files are checked in the calling thread
+    :return: tuple(dict(path: status_code), refreshed_entries) with the status code of
+        all changed paths, which is one of M (modified), T (type changed), D (deleted) or
+        A (added with intent-to-add), and entries of files which turned out to be
+        unchanged by content, with their stat data updated"""
+    root = str(working_tree_dir)
+
+    def check(batch: Sequence[IndexEntry]) -> List[Tuple[str, str, Optional[IndexEntry]]]:
+        out = []
+        for entry in batch:
+            if entry.skip_worktree:
+                continue
+            path = str(entry.path)
+            code, refreshed = _working_tree_status(entry, osp.join(root, path), index_mtime_ns, filemode)
+            if code != " " or refreshed is not None:
+                out.append((path, code, refreshed))
+        # END for each entry
+        return out
+
+    batches = [entries[i : i + _BATCH_SIZE] for i in range(0, len(entries), _BATCH_SIZE)]
+    if workers == 1 or len(batches) < 2:
+        results = [check(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(check, batches))
+    # END handle threads
+
+    status: Dict[str, str] = {}
+    refreshed_entries: List[IndexEntry] = []
+    for result in results:
+        for path, code, refreshed in result:
+            if code != " ":
+                status[path] = code
+            if refreshed is not None:
+                refreshed_entries.append(refreshed)
+        # END for each changed entry
+    # END for each batch
+    return status, refreshed_entries
+
+
+def index_status(
+    odb: "GitCmdObjectDB",
+    head_tree_sha: Optional[bytes],
+    entries: Sequence[IndexEntry],
+    cache_tree: Optional[CacheTree] = None,
+) -> Dict[str, str]:
+    """Compare the given entries to the tree of HEAD, like ``git diff-index --cached HEAD`` does.
+
+    :param odb: database to read the trees from
+    :param head_tree_sha: binary sha of the tree of HEAD, or None if there is no commit yet
+    :param entries: sorted entries at stage 0. Entries added with intent-to-add are ignored
+    :param cache_tree: cache-tree of the entries. If it is valid, only the trees which differ
+        from HEAD are compared
+    :return: dict(path: status_code) of all changed paths, with status codes being one of
+        A (added), D (deleted), M (modified) or T (type changed)"""
+    status: Dict[str, str] = {}
+    if cache_tree is not None and cache_tree.valid and cache_tree.entry_count == len(entries):
+        for a, b in diff_trees_recursive(odb, head_tree_sha, cache_tree.binsha, ""):
+            path = cast("EntryTup", a or b)[2]
+            if a is None:
+                status[path] = "A"
+            elif b is None:
+                status[path] = "D"
+            else:
+                status[path] = "T" if S_IFMT(a[1]) != S_IFMT(b[1]) else "M"
+        # END for each changed path
+        return status
+    # END use valid cache tree
+
+    head: Dict[str, Tuple[bytes, int]] = {}
+    if head_tree_sha is not None:
+        head = {path: (binsha, mode) for binsha, mode, path in traverse_tree_recursive(odb, head_tree_sha, "")}
+    for entry in entries:
+        if entry.intent_to_add:
+            continue
+        path = str(entry.path)
+        item = head.pop(path, None)
+        if item is None:
+            status[path] = "A"
+        elif S_IFMT(item[1]) != S_IFMT(entry.mode):
+            status[path] = "T"
+        elif item[0] != entry.binsha or item[1] != entry.mode:
+            status[path] = "M"
+    # END for each entry
+    for path in head:
+        status[path] = "D"
+    # END for each removed path
+    return status
+
+
+def unmerged_status(stages: Dict[str, List[int]]) -> Dict[str, str]:
+    """:return: dict(path: two letter status code) of unmerged paths as shown by git-status, like UU
+    :param stages: dict(path: list of the stages the path has entries in)"""
+    return {path: _UNMERGED_CODES[tuple(sorted(path_stages))] for path, path_stages in stages.items()}
+
+
+# { Untracked files
+
+
+def _parse_excludes(data: bytes) -> List[_ExcludePattern]:
+    """:return: list of patterns in the given gitignore file, in file order"""
+    patterns = []
+    for line in os.fsdecode(data).splitlines():
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\#") or line.startswith("\\!"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        basename = "/" not in line
+        patterns.append((re.compile(_glob_to_regex(line.lstrip("/"))), negated, dir_only, basename))
+    # END for each line
+    return patterns
+
+
+def _read_excludes(
+    path: Optional[PathLike], tracked_sha: Optional[bytes] = None
+) -> Tuple[bytes, List[_ExcludePattern]]:
+    """:return: tuple(sha, patterns) of the gitignore file at path, with the sha computed like
+    the untracked cache stores it
+    :param tracked_sha: sha of the entry of the file if it is tracked. Like git, it is used
+        if the file is unchanged, otherwise the sha of a blob with an additional newline"""
+    if path is None:
+        return _NULL_SHA, []
+    try:
+        with open(path, "rb") as fp:
+            data = fp.read()
+    except OSError:
+        return _NULL_SHA, []
+    # END handle missing file
+    sha = hashlib.sha1(b"blob %i\0" % len(data) + data).digest()
+    if data and sha != tracked_sha:
+        sha = hashlib.sha1(b"blob %i\0" % (len(data) + 1) + data + b"\n").digest()
+    return sha, _parse_excludes(data)
+
+
+def _is_excluded(excludes: Sequence[_ExcludeList], path: str, is_dir: bool) -> bool:
+    """:return: True if the given path is ignored by the given pattern lists, which are
+    ordered by increasing precedence. Within each list, the last matching pattern wins"""
+    name = path.rpartition("/")[2]
+    for base, patterns in reversed(excludes):
+        for regex, negated, dir_only, basename in reversed(patterns):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(name if basename else path[len(base) :]):
+                return not negated
+        # END for each pattern
+    # END for each exclude list
+    return False
+
+
+def _stat_data_matches(stat_data: bytes, st: os.stat_result) -> bool:
+    """:return: True if the 36 bytes of stat data of the untracked cache describe st,
+    ignoring the device like git does by default"""
+    other = b"".join(
+        (
+            _time_bytes(st.st_ctime_ns),
+            _time_bytes(st.st_mtime_ns),
+            b"".join((n & 0xFFFFFFFF).to_bytes(4, "big") for n in (st.st_ino, st.st_uid, st.st_gid, st.st_size)),
+        )
+    )
+    return stat_data[:16] == other[:16] and stat_data[20:] == other[16:]
+
+
+def untracked_cache_ident(working_tree_dir: PathLike) -> bytes:
+    """:return: identifier of the environment an untracked cache is valid for, as git writes it"""
+    sysname = os.uname().sysname if hasattr(os, "uname") else "Windows"
+    return b"Location %s, system %s\0" % (os.fsencode(str(working_tree_dir)), sysname.encode())
+
+
+class _UntrackedScan(object):
+
+    """Walks the working tree to find untracked files, using the directories of an
+    untracked cache which are known to be unchanged"""
+
+    __slots__ = ("root", "tracked", "gitignore_shas", "index_mtime_ns", "changed_dirs", "out")
+
+    def __init__(
+        self,
+        root: str,
+        tracked: List[str],
+        gitignore_shas: Dict[str, bytes],
+        index_mtime_ns: Optional[int],
+        changed_dirs: Optional[Set[str]],
+    ) -> None:
+        self.root = root
+        self.tracked = tracked
+        self.gitignore_shas = gitignore_shas
+        self.index_mtime_ns = index_mtime_ns
+        self.changed_dirs = changed_dirs
+        self.out: List[str] = []
+
+    def _is_tracked(self, path: str) -> bool:
+        tracked = self.tracked
+        i = bisect_left(tracked, path)
+        return i < len(tracked) and tracked[i] == path
+
+    def _has_tracked_below(self, dir_path: str) -> bool:
+        tracked = self.tracked
+        i = bisect_left(tracked, dir_path)
+        return i < len(tracked) and tracked[i].startswith(dir_path)
+
+    def _is_unchanged(self, dir_path: str, node: UntrackedCacheDir) -> bool:
+        """:return: True if the directory still looks like when the node was recorded"""
+        if not node.valid:
+            return False
+        if self.changed_dirs is not None:
+            return dir_path.rstrip("/") not in self.changed_dirs
+        if self.index_mtime_ns is None:
+            return False
+        try:
+            st = os.lstat(osp.join(self.root, dir_path))
+        except OSError:
+            return False
+        # END handle removed directories
+        # the directory may have changed within the timestamp the index was written in
+        return st.st_mtime_ns < self.index_mtime_ns and _stat_data_matches(node.stat_data, st)
+
+    def scan(self, dir_path: str, excludes: List[_ExcludeList], node: Optional[UntrackedCacheDir]) -> None:
+        """Find the untracked files in the given directory, which contains tracked files
+
+        :param dir_path: path of the directory relative to the root, with a trailing slash
+            unless it is the root
+        :param excludes: exclude lists of the parent directories
+        :param node: untracked cache node of the directory, or None if it must be read"""
+        exclude_sha, patterns = _read_excludes(
+            osp.join(self.root, dir_path, ".gitignore"), self.gitignore_shas.get(dir_path + ".gitignore")
+        )
+        excludes = excludes + [(dir_path, patterns)]
+        if node is not None and node.exclude_sha == exclude_sha and self._is_unchanged(dir_path, node):
+            for name in node.untracked:
+                if name.endswith("/"):
+                    self.walk(dir_path + name, excludes)
+                else:
+                    self.out.append(dir_path + name)
+            # END for each untracked path
+            for subdir in node.subdirs.values():
+                if not subdir.check_only:
+                    self.scan(dir_path + subdir.name + "/", excludes, subdir)
+            # END for each subdirectory
+            return
+        # END use cached directory
+
+        subdirs: Dict[str, UntrackedCacheDir] = {}
+        if node is not None:
+            # if the gitignore file changed, the cached nodes below can't be trusted either
+            if node.exclude_sha == exclude_sha:
+                subdirs = node.subdirs
+            node.invalidate()
+        # END handle outdated node
+        for entry in self._list(dir_path):
+            path = dir_path + entry.name
+            if self._is_tracked(path):
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if _is_excluded(excludes, path, is_dir):
+                continue
+            if not is_dir:
+                self.out.append(path)
+            elif self._has_tracked_below(path + "/"):
+                self.scan(path + "/", excludes, subdirs.get(entry.name))
+            else:
+                self.walk(path + "/", excludes)
+        # END for each directory entry
+
+    def walk(self, dir_path: str, excludes: List[_ExcludeList]) -> None:
+        """Add all files below the given directory, which contains no tracked files"""
+        if osp.lexists(osp.join(self.root, dir_path, ".git")):
+            # a nested repository, which is shown as a whole like git does
+            self.out.append(dir_path)
+            return
+        # END handle nested repository
+        excludes = excludes + [(dir_path, _read_excludes(osp.join(self.root, dir_path, ".gitignore"))[1])]
+        for entry in self._list(dir_path):
+            path = dir_path + entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if _is_excluded(excludes, path, is_dir):
+                continue
+            if is_dir:
+                self.walk(path + "/", excludes)
+            else:
+                self.out.append(path)
+        # END for each directory entry
+
+    def _list(self, dir_path: str) -> List["os.DirEntry[str]"]:
+        try:
+            with os.scandir(osp.join(self.root, dir_path)) as it:
+                return [entry for entry in it if entry.name != ".git"]
+        except OSError:
+            return []
+        # END handle unreadable directories
+
+
+def untracked_files(
+    working_tree_dir: PathLike,
+    entries: Iterable[BaseIndexEntry],
+    info_exclude: Optional[PathLike] = None,
+    excludes_file: Optional[PathLike] = None,
+    untracked_cache: Optional[UntrackedCache] = None,
+    index_mtime_ns: Optional[int] = None,
+    changed_dirs: Optional[Set[str]] = None,
+) -> List[str]:
+    """Find all untracked files which are not ignored, like ``git status --untracked-files=all``
+    does. Nested repositories are listed as a whole, as a path with a trailing slash.
+
+    Directories containing tracked files are read one by one. If an untracked cache is
+    given, its directories are reused instead if their stat data, and the gitignore files
+    they were read with, are still the same.
+
+    :param working_tree_dir: directory to walk
+    :param entries: all entries of the index
+    :param info_exclude: path to $GIT_DIR/info/exclude, if any
+    :param excludes_file: path to the file configured with core.excludesFile, if any, whose
+        patterns have the lowest precedence
+    :param untracked_cache: the untracked cache of the index, which is only used if it was
+        written for the given working tree and the same global exclude files
+    :param index_mtime_ns: modification time of the index file in nanoseconds. Cached
+        directories modified in the same timestamp are read again
+    :param changed_dirs: if set, the directories which changed according to a filesystem
+        monitor, like 'a/b' or '' for the root. Other cached directories are trusted
+        without checking their stat data
+    :return: sorted list of untracked paths"""
+    root = str(working_tree_dir)
+    excludes_file_sha, excludes_file_patterns = _read_excludes(excludes_file)
+    info_exclude_sha, info_exclude_patterns = _read_excludes(info_exclude)
+    excludes: List[_ExcludeList] = [("", excludes_file_patterns), ("", info_exclude_patterns)]
+
+    node = None
+    if (
+        untracked_cache is not None
+        and untracked_cache.ident == untracked_cache_ident(root)
+        and untracked_cache.exclude_per_dir == ".gitignore"
+        and untracked_cache.excludes_file_sha == excludes_file_sha
+        and untracked_cache.info_exclude_sha == info_exclude_sha
+    ):
+        node = untracked_cache.root
+    # END check untracked cache
+
+    tracked = set()
+    gitignore_shas = {}
+    for entry in entries:
+        path = str(entry.path)
+        tracked.add(path)
+        if not entry.stage and path.rpartition("/")[2] == ".gitignore":
+            gitignore_shas[path] = entry.binsha
+    # END for each entry
+    scan = _UntrackedScan(root, sorted(tracked), gitignore_shas, index_mtime_ns, changed_dirs)
+    scan.scan("", excludes, node)
+    return sorted(scan.out)
+
+
+def query_fsmonitor_hook(
+    hook_path: PathLike, working_tree_dir: PathLike, token: str
+) -> Tuple[str, Optional[List[str]]]:
+    """Ask a fsmonitor hook, as configured with core.fsmonitor, for the paths which changed
+    since the given token, using version 2 of the hook protocol.
+
+    :return: tuple(new_token, changed_paths), with changed_paths being None if all paths
+        must be assumed changed, like if the hook failed or didn't know the token"""
+    try:
+        process = subprocess.Popen(
+            [str(hook_path), "2", token],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=str(working_tree_dir),
+            close_fds=is_posix,
+            creationflags=PROC_CREATIONFLAGS,
+        )
+    except OSError:
+        return "", None
+    # END handle missing hook
+    stdout = process.communicate()[0]
+    if process.returncode != 0:
+        return "", None
+    new_token, _sep, data = stdout.partition(b"\0")
+    paths = [os.fsdecode(p) for p in data.split(b"\0") if p]
+    if "/" in paths or not token:
+        return new_token.decode(), None
+    return new_token.decode(), paths
+
+
+# } END untracked files
@@ -1,15 +1,35 @@
 """Module with additional types used by the index"""
 
+from array import array
 from binascii import b2a_hex
+import os
 from pathlib import Path
+from struct import Struct
 
-from .util import pack, unpack
+from .util import pack, unpack, _encode_varint
+from git.compat import defenc
 from git.objects import Blob
 
 
 # typing ----------------------------------------------------------------------
 
-from typing import NamedTuple, Sequence, TYPE_CHECKING, Tuple, Union, cast, List
+from typing import (
+    Dict,
+    Iterable,
+    ItemsView,
+    Iterator,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+    ValuesView,
+    cast,
+)
 
 from git.types import PathLike
 
@@ -20,7 +40,21 @@ StageType = int
 
 # ---------------------------------------------------------------------------------
 
-__all__ = ("BlobFilter", "BaseIndexEntry", "IndexEntry", "StageType")
+__all__ = (
+    "BlobFilter",
+    "BaseIndexEntry",
+    "IndexEntry",
+    "CacheTree",
+    "UntrackedCache",
+    "UntrackedCacheDir",
+    "FsmonitorData",
+    "SplitIndex",
+    "IndexEntryMapping",
+    "LazyIndexEntries",
+    "PackedIndexEntries",
+    "StatusEntry",
+    "StageType",
+)
 
 # { Invariants
 CE_NAMEMASK = 0x0FFF
@@ -29,6 +63,23 @@ CE_EXTENDED = 0x4000
 CE_VALID = 0x8000
 CE_STAGESHIFT = 12
 
+# extended flags of index version 3 and later, kept in the upper 16 bits of the flags
+CE_EXTENDED_SHIFT = 16
+CE_INTENT_TO_ADD = 0x2000 << CE_EXTENDED_SHIFT
+CE_SKIP_WORKTREE = 0x4000 << CE_EXTENDED_SHIFT
+CE_EXTENDED_FLAGS = CE_INTENT_TO_ADD | CE_SKIP_WORKTREE
+
+# ctime, mtime, dev, ino, mode, uid, gid, size, sha, flags - followed by the path
+CE_HEADER = Struct(">8s8sLLLLLL20sH")
+# extended flags following the header if CE_EXTENDED is set
+CE_EXT_HEADER = Struct(">H")
+# header and extended flags of an entry, as stored by PackedIndexEntries
+CE_RECORD = Struct(">8s8sLLLLLL20sHH")
+
+# flags of the untracked cache, as used by git-status
+DIR_SHOW_OTHER_DIRECTORIES = 1 << 1
+DIR_HIDE_EMPTY_DIRECTORIES = 1 << 2
+
 # } END invariants
 
 
@@ -127,6 +178,18 @@ class BaseIndexEntry(BaseIndexEntryHelper):
         """
         return (self.flags & CE_STAGEMASK) >> CE_STAGESHIFT
 
+    @property
+    def skip_worktree(self) -> bool:
+        """True if the entry is marked as skip-worktree, like in sparse checkouts.
+        Requires index version 3 or later"""
+        return bool(self.flags & CE_SKIP_WORKTREE)
+
+    @property
+    def intent_to_add(self) -> bool:
+        """True if the entry was added with ``git add --intent-to-add``.
+        Requires index version 3 or later"""
+        return bool(self.flags & CE_INTENT_TO_ADD)
+
     @classmethod
     def from_blob(cls, blob: Blob, stage: int = 0) -> "BaseIndexEntry":
         """:return: Fully equipped BaseIndexEntry at the given stage"""
@@ -170,6 +233,16 @@ class IndexEntry(BaseIndexEntry):
         time = pack(">LL", 0, 0)
         return IndexEntry((base.mode, base.binsha, base.flags, base.path, time, time, 0, 0, 0, 0, 0))
 
+    @classmethod
+    def from_buffer(cls, data: bytes, offset: int, path: PathLike) -> "IndexEntry":
+        """:return: entry unpacked from the index file data at the given offset, with the
+        given path, which is stored after the entry in a way depending on the index version"""
+        (ctime, mtime, dev, ino, mode, uid, gid, size, sha, flags) = CE_HEADER.unpack_from(data, offset)
+        if flags & CE_EXTENDED:
+            flags |= CE_EXT_HEADER.unpack_from(data, offset + CE_HEADER.size)[0] << CE_EXTENDED_SHIFT
+        # END handle extended flags
+        return IndexEntry((mode, sha, flags, path, ctime, mtime, dev, ino, uid, gid, size))
+
     @classmethod
     def from_blob(cls, blob: Blob, stage: int = 0) -> "IndexEntry":
         """:return: Minimal entry resembling the given blob object"""
@@ -189,3 +262,541 @@ class IndexEntry(BaseIndexEntry):
                 blob.size,
             )
         )
+
+
+class StatusEntry(NamedTuple):
+    """Status of a path, as shown by ``git status --porcelain``.
+
+    staged is the status of the path in the index compared to HEAD, unstaged the one of
+    the file compared to the index, both being one of ' ' (unchanged), M (modified),
+    T (type changed), A (added) or D (deleted). Unmerged paths use the same two letter
+    codes as git-status, like UU if both sides modified the path."""
+
+    path: str
+    staged: str
+    unstaged: str
+
+    def __str__(self) -> str:
+        return "%s%s %s" % (self.staged, self.unstaged, self.path)
+
+
+class CacheTree(object):
+
+    """Node of the cache-tree, as stored in the TREE extension of an index file.
+
+    It caches the sha of the tree written for a directory of the index, along with the
+    amount of index entries it covers. Nodes of directories containing changed paths are
+    invalidated, which is marked by an entry_count of -1, so only those trees need to be
+    written again."""
+
+    __slots__ = ("entry_count", "binsha", "subtrees")
+
+    def __init__(self, entry_count: int = -1, binsha: bytes = b"") -> None:
+        self.entry_count = entry_count
+        self.binsha = binsha
+        self.subtrees: Dict[str, "CacheTree"] = {}
+
+    def __repr__(self) -> str:
+        return "<CacheTree %i entries, %i subtrees>" % (self.entry_count, len(self.subtrees))
+
+    @property
+    def valid(self) -> bool:
+        """True if binsha is the tree of the entries below this node"""
+        return self.entry_count >= 0
+
+    def invalidate(self, path: PathLike) -> None:
+        """Invalidate all nodes of directories leading to the given path. A node of the path
+        itself is dropped, as a file replaces the directory in that case.
+
+        :param path: path of a changed index entry"""
+        node = self
+        node.entry_count = -1
+        parts = str(path).split("/")
+        for name in parts[:-1]:
+            child = node.subtrees.get(name)
+            if child is None:
+                return
+            node = child
+            node.entry_count = -1
+        # END for each directory
+        node.subtrees.pop(parts[-1], None)
+
+
+class UntrackedCacheDir(object):
+
+    """Directory of the untracked cache, as stored in the UNTR extension of an index file.
+
+    If valid, untracked holds the names of all untracked files in the directory, and of
+    untracked directories with a trailing slash if the cache shows other directories,
+    as found when the directory had the stat data in stat_data. exclude_sha is the sha
+    of the blob of the directory's .gitignore file, or a null sha if there was none."""
+
+    __slots__ = ("name", "untracked", "subdirs", "valid", "check_only", "stat_data", "exclude_sha")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.untracked: List[str] = []
+        self.subdirs: Dict[str, "UntrackedCacheDir"] = {}
+        self.valid = False
+        self.check_only = False
+        self.stat_data = b""
+        self.exclude_sha = b"\0" * 20
+
+    def __repr__(self) -> str:
+        return "<UntrackedCacheDir %r valid=%s, %i untracked>" % (self.name, self.valid, len(self.untracked))
+
+    def invalidate(self) -> None:
+        self.valid = False
+        self.untracked = []
+
+
+class UntrackedCache(object):
+
+    """The untracked cache, as stored in the UNTR extension of an index file.
+
+    It is only valid for the environment described by ident, and as long as the global
+    exclude files, $GIT_DIR/info/exclude and core.excludesFile, have the blobs with the
+    given shas, which are null shas if the files don't exist."""
+
+    __slots__ = (
+        "ident",
+        "info_exclude_stat",
+        "excludes_file_stat",
+        "dir_flags",
+        "info_exclude_sha",
+        "excludes_file_sha",
+        "exclude_per_dir",
+        "root",
+    )
+
+    def __init__(self, ident: bytes = b"", dir_flags: int = 0, exclude_per_dir: str = ".gitignore") -> None:
+        self.ident = ident
+        self.info_exclude_stat = b"\0" * 36
+        self.excludes_file_stat = b"\0" * 36
+        self.dir_flags = dir_flags
+        self.info_exclude_sha = b"\0" * 20
+        self.excludes_file_sha = b"\0" * 20
+        self.exclude_per_dir = exclude_per_dir
+        self.root: Optional[UntrackedCacheDir] = None
+
+    def __repr__(self) -> str:
+        return "<UntrackedCache %r>" % self.ident
+
+    def invalidate(self, path: PathLike) -> None:
+        """Invalidate the directory containing the given path, which became tracked or
+        untracked. If untracked directories are shown as such, its parents are invalidated
+        as well, as they may have become untracked or tracked as a whole."""
+        node = self.root
+        if node is None:
+            return
+        parts = str(path).split("/")
+        nodes = [node]
+        for name in parts[:-1]:
+            child = node.subdirs.get(name)
+            if child is None:
+                break
+            node = child
+            nodes.append(node)
+        # END for each directory
+        if len(nodes) < len(parts):
+            # the directory of the path isn't cached, only its parents can be affected
+            if not self.dir_flags & DIR_SHOW_OTHER_DIRECTORIES:
+                return
+        else:
+            nodes.pop().invalidate()
+            if not self.dir_flags & DIR_SHOW_OTHER_DIRECTORIES:
+                return
+        # END handle leaf directory
+        for node in nodes:
+            node.invalidate()
+        # END for each parent
+
+
+class FsmonitorData(object):
+
+    """Data of the FSMN extension of an index file.
+
+    token is the token of the file system monitor which the index was last synchronized
+    with, and dirty the paths of all entries which may have changed since then. All other
+    entries were unchanged at that time."""
+
+    __slots__ = ("version", "token", "dirty")
+
+    def __init__(self, version: int = 2, token: Union[str, int] = "", dirty: Optional[Set[str]] = None) -> None:
+        """
+        :param version: version of the extension, 1 uses a timestamp in nanoseconds as token
+        :param token: opaque token of the file system monitor, or a timestamp for version 1
+        :param dirty: paths of entries which are not known to be unchanged"""
+        self.version = version
+        self.token = token
+        self.dirty: Set[str] = set() if dirty is None else dirty
+
+    def __repr__(self) -> str:
+        return "<FsmonitorData %r, %i dirty>" % (self.token, len(self.dirty))
+
+
+class SplitIndex(object):
+
+    """The shared index a split index is based on, as referenced by its link extension.
+
+    base_sha is the sha of the shared index, which is stored as sharedindex.<hexsha> in
+    the git directory, and base are its entries. The split index itself only records
+    how its entries differ from these."""
+
+    __slots__ = ("base_sha", "base")
+
+    def __init__(self, base_sha: bytes, base: "LazyIndexEntries") -> None:
+        self.base_sha = base_sha
+        self.base = base
+
+    def __repr__(self) -> str:
+        return "<SplitIndex %s, %i shared entries>" % (self.base_sha.hex(), len(self.base))
+
+
+class IndexEntryMapping(MutableMapping[Tuple[PathLike, StageType], IndexEntry]):
+
+    """Base of mappings of (path, stage) keys to IndexEntry instances, which keep the
+    extensions read along with the entries consistent with them.
+
+    The cache_tree, if any, is invalidated for all entries which are added, removed or
+    changed in a way that changes their tree. Likewise, the untracked_cache is invalidated
+    for added and removed entries, and changed entries are marked dirty in the fsmonitor
+    data. If the entries were read from a split index, split_index refers to the shared
+    index they are based on.
+
+    Subclasses implement ``_set`` and ``_delete`` instead of ``__setitem__`` and ``__delitem__``."""
+
+    __slots__ = ("cache_tree", "untracked_cache", "fsmonitor", "split_index")
+
+    def __init__(self, cache_tree: Optional[CacheTree] = None) -> None:
+        self.cache_tree = cache_tree
+        self.untracked_cache: Optional[UntrackedCache] = None
+        self.fsmonitor: Optional[FsmonitorData] = None
+        self.split_index: Optional[SplitIndex] = None
+
+    def _set(self, key: Tuple[PathLike, StageType], entry: IndexEntry) -> None:
+        raise NotImplementedError("To be implemented in subclass")
+
+    def _delete(self, key: Tuple[PathLike, StageType]) -> None:
+        raise NotImplementedError("To be implemented in subclass")
+
+    def __setitem__(self, key: Tuple[PathLike, StageType], entry: IndexEntry) -> None:
+        if self.cache_tree is not None or self.untracked_cache is not None or self.fsmonitor is not None:
+            old = self.get(key)
+            if self.cache_tree is not None and (old is None or old.mode != entry.mode or old.binsha != entry.binsha):
+                self.cache_tree.invalidate(key[0])
+            if self.untracked_cache is not None and old is None:
+                self.untracked_cache.invalidate(key[0])
+            if self.fsmonitor is not None and old != entry:
+                self.fsmonitor.dirty.add(str(key[0]))
+        # END handle extensions
+        self._set(key, entry)
+
+    def __delitem__(self, key: Tuple[PathLike, StageType]) -> None:
+        self._delete(key)
+        if self.cache_tree is not None:
+            self.cache_tree.invalidate(key[0])
+        if self.untracked_cache is not None:
+            self.untracked_cache.invalidate(key[0])
+
+    def __repr__(self) -> str:
+        return "<%s with %i entries>" % (type(self).__name__, len(self))
+
+    @property
+    def is_sorted(self) -> bool:
+        """:return: True if iteration is known to yield the keys sorted by path and stage, the
+        way they are stored in an index file"""
+        return False
+
+
+class LazyIndexEntries(IndexEntryMapping):
+
+    """Mapping of (path, stage) keys to IndexEntry instances as read from an index file.
+
+    Only the keys are decoded when the index is read. Entries are unpacked from the
+    index data the first time they are accessed, which keeps looking up a few paths
+    in a large index cheap. Entries which were assigned are kept as they are."""
+
+    __slots__ = ("_data", "_items", "_sorted")
+
+    def __init__(
+        self,
+        data: bytes,
+        items: Dict[Tuple[PathLike, StageType], Union[int, IndexEntry]],
+        cache_tree: Optional[CacheTree] = None,
+        is_sorted: bool = False,
+    ) -> None:
+        """
+        :param data: buffer holding the entries as stored in the index file
+        :param items: dict mapping keys to the offset of the entry in data, or to the entry itself
+        :param cache_tree: root of the cache-tree matching the entries
+        :param is_sorted: if True, items are sorted by path and stage already, as read from
+            an index file. Adding new keys appends them, which doesn't keep them sorted"""
+        super(LazyIndexEntries, self).__init__(cache_tree)
+        self._data = data
+        self._items = items
+        self._sorted = is_sorted
+
+    @property
+    def is_sorted(self) -> bool:
+        return self._sorted
+
+    def __getitem__(self, key: Tuple[PathLike, StageType]) -> IndexEntry:
+        item = self._items[key]
+        if isinstance(item, int):
+            item = IndexEntry.from_buffer(self._data, item, key[0])
+            self._items[key] = item
+        # END unpack entry
+        return item
+
+    def _set(self, key: Tuple[PathLike, StageType], entry: IndexEntry) -> None:
+        if self._sorted and key not in self._items:
+            self._sorted = False
+        self._items[key] = entry
+
+    def _delete(self, key: Tuple[PathLike, StageType]) -> None:
+        del self._items[key]
+
+    def __iter__(self) -> Iterator[Tuple[PathLike, StageType]]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+
+class _PackedValuesView(ValuesView):
+    _mapping: "PackedIndexEntries"
+
+    def __iter__(self) -> Iterator[IndexEntry]:
+        return self._mapping._iter_entries()
+
+
+class _PackedItemsView(ItemsView):
+    _mapping: "PackedIndexEntries"
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[PathLike, StageType], IndexEntry]]:
+        for entry in self._mapping._iter_entries():
+            yield (entry.path, entry.stage), entry
+
+
+class PackedIndexEntries(IndexEntryMapping):
+
+    """Mapping of (path, stage) keys to IndexEntry instances, which keeps its entries in
+    sorted parallel arrays instead of as objects.
+
+    Each entry is stored as a record of 64 bytes, which is the entry's header as stored in
+    an index file, followed by its extended flags, and its path is stored in a single buffer
+    of all paths. This takes about a tenth of the memory of a dict of IndexEntry instances.
+    Keys are looked up by bisection, entries are unpacked each time they are accessed, and
+    adding or removing entries moves the records behind them. Iterating yields the entries
+    sorted by path and stage, the way they are stored in an index file."""
+
+    __slots__ = ("_records", "_paths", "_path_starts", "_path_ends", "_garbage")
+
+    def __init__(self, entries: Iterable[IndexEntry] = (), cache_tree: Optional[CacheTree] = None) -> None:
+        """
+        :param entries: entries to store, in any order
+        :param cache_tree: root of the cache-tree matching the entries"""
+        super(PackedIndexEntries, self).__init__(cache_tree)
+        self._records = bytearray()
+        self._paths = bytearray()
+        self._path_starts = array("Q")
+        self._path_ends = array("Q")
+        # amount of bytes of paths of removed entries in _paths
+        self._garbage = 0
+
+        packed = []
+        for entry in entries:
+            path = str(entry.path).encode(defenc)
+            packed.append((path, entry.stage, self._pack(entry, path)))
+        # END for each entry
+        packed.sort(key=lambda item: item[:2])
+        self._records = bytearray(b"".join(item[2] for item in packed))
+        self._add_paths(item[0] for item in packed)
+
+    @classmethod
+    def _from_buffers(cls, records: bytes, paths: Sequence[bytes]) -> "PackedIndexEntries":
+        """:return: instance holding the given sorted records and their paths"""
+        inst = cls()
+        inst._records = bytearray(records)
+        inst._add_paths(paths)
+        return inst
+
+    def _add_paths(self, paths: Iterable[bytes]) -> None:
+        starts = self._path_starts
+        ends = self._path_ends
+        pos = len(self._paths)
+        for path in paths:
+            starts.append(pos)
+            pos += len(path)
+            ends.append(pos)
+            self._paths += path
+        # END for each path
+
+    @staticmethod
+    def _pack(entry: IndexEntry, path: bytes) -> bytes:
+        extended_flags = (entry.flags & CE_EXTENDED_FLAGS) >> CE_EXTENDED_SHIFT
+        flags = min(len(path), CE_NAMEMASK) | (entry.flags & ~CE_NAMEMASK & ~CE_EXTENDED & 0xFFFF)
+        if extended_flags:
+            flags |= CE_EXTENDED
+        return CE_RECORD.pack(
+            entry.ctime_bytes,
+            entry.mtime_bytes,
+            entry.dev,
+            entry.inode,
+            entry.mode,
+            entry.uid,
+            entry.gid,
+            entry.size,
+            entry.binsha,
+            flags,
+            extended_flags,
+        )
+
+    def _path_at(self, i: int) -> bytes:
+        return bytes(self._paths[self._path_starts[i] : self._path_ends[i]])
+
+    def _stage_at(self, i: int) -> int:
+        return (self._records[i * CE_RECORD.size + 60] & 0x30) >> 4
+
+    def _entry_at(self, i: int, path: PathLike) -> IndexEntry:
+        (ctime, mtime, dev, ino, mode, uid, gid, size, sha, flags, extended_flags) = CE_RECORD.unpack_from(
+            self._records, i * CE_RECORD.size
+        )
+        if flags & CE_EXTENDED:
+            flags |= extended_flags << CE_EXTENDED_SHIFT
+        return IndexEntry((mode, sha, flags, path, ctime, mtime, dev, ino, uid, gid, size))
+
+    def _bisect(self, path: bytes, stage: int) -> int:
+        """:return: index of the first entry not sorting before the given path and stage"""
+        lo = 0
+        hi = len(self._path_starts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_path = self._path_at(mid)
+            if mid_path < path or (mid_path == path and self._stage_at(mid) < stage):
+                lo = mid + 1
+            else:
+                hi = mid
+        # END bisect
+        return lo
+
+    def _find(self, key: object) -> Tuple[int, bool]:
+        """:return: tuple(index, found) of the given key, with index being the one at which
+        it would have to be inserted if it isn't found"""
+        if not isinstance(key, tuple) or len(key) != 2:
+            return 0, False
+        path = str(key[0]).encode(defenc)
+        i = self._bisect(path, key[1])
+        return i, i < len(self._path_starts) and self._path_at(i) == path and self._stage_at(i) == key[1]
+
+    def __getitem__(self, key: Tuple[PathLike, StageType]) -> IndexEntry:
+        i, found = self._find(key)
+        if not found:
+            raise KeyError(key)
+        return self._entry_at(i, key[0])
+
+    def _set(self, key: Tuple[PathLike, StageType], entry: IndexEntry) -> None:
+        i, found = self._find(key)
+        path = str(key[0]).encode(defenc)
+        record = self._pack(entry, path)
+        size = CE_RECORD.size
+        if found:
+            self._records[i * size : (i + 1) * size] = record
+            return
+        # END replace entry
+        self._records[i * size : i * size] = record
+        start = len(self._paths)
+        self._paths += path
+        self._path_starts.insert(i, start)
+        self._path_ends.insert(i, start + len(path))
+
+    def _delete(self, key: Tuple[PathLike, StageType]) -> None:
+        i, found = self._find(key)
+        if not found:
+            raise KeyError(key)
+        size = CE_RECORD.size
+        del self._records[i * size : (i + 1) * size]
+        self._garbage += self._path_ends[i] - self._path_starts[i]
+        del self._path_starts[i]
+        del self._path_ends[i]
+        if self._garbage > len(self._paths) // 2:
+            paths = [self._path_at(i) for i in range(len(self))]
+            self._paths = bytearray()
+            self._path_starts = array("Q")
+            self._path_ends = array("Q")
+            self._garbage = 0
+            self._add_paths(paths)
+        # END compact paths
+
+    def __iter__(self) -> Iterator[Tuple[PathLike, StageType]]:
+        for i in range(len(self._path_starts)):
+            yield (self._path_at(i).decode(defenc), self._stage_at(i))
+        # END for each entry
+
+    def __len__(self) -> int:
+        return len(self._path_starts)
+
+    def __contains__(self, key: object) -> bool:
+        return self._find(key)[1]
+
+    @property
+    def is_sorted(self) -> bool:
+        return True
+
+    def values(self) -> ValuesView[IndexEntry]:
+        return _PackedValuesView(self)
+
+    def items(self) -> ItemsView[Tuple[PathLike, StageType], IndexEntry]:
+        return _PackedItemsView(self)
+
+    def _iter_entries(self, start: int = 0) -> Iterator[IndexEntry]:
+        for i in range(start, len(self._path_starts)):
+            yield self._entry_at(i, self._path_at(i).decode(defenc))
+        # END for each entry
+
+    def iter_prefix(self, prefix: PathLike) -> Iterator[IndexEntry]:
+        """:return: iterator yielding all entries whose path starts with the given prefix in
+        sorted order, like the entries below a directory if its path ends with a slash"""
+        prefix_bytes = str(prefix).encode(defenc)
+        for i in range(self._bisect(prefix_bytes, 0), len(self._path_starts)):
+            path = self._path_at(i)
+            if not path.startswith(prefix_bytes):
+                break
+            yield self._entry_at(i, path.decode(defenc))
+        # END for each entry
+
+    def has_extended_flags(self) -> bool:
+        """:return: True if any entry has extended flags, which requires index version 3"""
+        records = self._records
+        size = CE_RECORD.size
+        return any(records[i * size + 60] & 0x40 for i in range(len(self._path_starts)))
+
+    def to_index_data(self, version: int = 2) -> bytes:
+        """:return: the entries as stored in an index file of the given version, without the
+        header. The records and paths are copied as they are, no entries are unpacked"""
+        records = memoryview(self._records)
+        size = CE_RECORD.size
+        header_size = CE_HEADER.size
+        out: List[Union[bytes, memoryview]] = []
+        previous_path = b""
+        for i in range(len(self._path_starts)):
+            offset = i * size
+            extended = records[offset + 60] & 0x40
+            out.append(records[offset : offset + (size if extended else header_size)])
+            path = self._path_at(i)
+            if version == 4:
+                common = len(os.path.commonprefix((previous_path, path)))
+                out.append(_encode_varint(len(previous_path) - common))
+                out.append(path[common:] + b"\0")
+                previous_path = path
+            else:
+                out.append(path)
+                entry_size = header_size + (2 if extended else 0) + len(path)
+                out.append(b"\0" * (((entry_size + 8) & ~7) - entry_size))
+            # END handle path compression
+        # END for each entry
+        return b"".join(out)
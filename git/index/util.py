@@ -12,7 +12,7 @@ import os.path as osp
 
 # typing ----------------------------------------------------------------------
 
-from typing import Any, Callable, TYPE_CHECKING, Optional, Type
+from typing import Any, Callable, TYPE_CHECKING, Optional, Tuple, Type
 
 from git.types import PathLike, _T
 
@@ -32,6 +32,32 @@ unpack = struct.unpack
 # } END aliases
 
 
+def _encode_varint(value: int) -> bytes:
+    """:return: value encoded like git's offset varints, as used by index version 4"""
+    out = bytearray((value & 0x7F,))
+    value >>= 7
+    while value:
+        value -= 1
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    # END while there are bits left
+    out.reverse()
+    return bytes(out)
+
+
+def _decode_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """:return: tuple(value, offset past the varint) of the varint at pos in data"""
+    c = data[pos]
+    pos += 1
+    value = c & 0x7F
+    while c & 0x80:
+        c = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (c & 0x7F)
+    # END while there are more bytes
+    return value, pos
+
+
 class TemporaryFileSwap(object):
 
     """Utility class moving a file to a temporary location within the same directory
@@ -7,6 +7,7 @@ import inspect
 from .base import *
 from .blob import *
 from .commit import *
+from .graph import *
 from .submodule import util as smutil
 from .submodule.base import *
 from .submodule.root import *
@@ -15,7 +15,7 @@ from .util import get_object_type_by_name
 
 # typing ------------------------------------------------------------------
 
-from typing import Any, TYPE_CHECKING, Union
+from typing import Any, Type, TypeVar, TYPE_CHECKING, Union
 
 from git.types import PathLike, Commit_ish, Lit_commit_ish
 
@@ -29,6 +29,8 @@ if TYPE_CHECKING:
 
 IndexObjUnion = Union["Tree", "Blob", "Submodule"]
 
+T_Object = TypeVar("T_Object", bound="Object")
+
 # --------------------------------------------------------------------------
 
 
@@ -50,7 +52,7 @@ class Object(LazyMixin):
         dbtyp.str_commit_type,
         dbtyp.str_tag_type,
     )
-    __slots__ = ("repo", "binsha", "size")
+    __slots__ = ("repo", "binsha", "size", "__weakref__")
     type: Union[Lit_commit_ish, None] = None
 
     def __init__(self, repo: "Repo", binsha: bytes):
@@ -91,11 +93,47 @@ class Object(LazyMixin):
             # the NULL binsha is always the root commit
             return get_object_type_by_name(b"commit")(repo, sha1)
         # END handle special case
+        identity_map = getattr(repo, "identity_map", None)
+        if identity_map is not None:
+            inst = identity_map.get(sha1)
+            if inst is not None:
+                return inst
+        # END handle identity map
         oinfo = repo.odb.info(sha1)
-        inst = get_object_type_by_name(oinfo.type)(repo, oinfo.binsha)
+        obj_type = get_object_type_by_name(oinfo.type)
+        if oinfo.type == dbtyp.str_tree_type:
+            # a tree obtained by sha is a root tree, just like the tree of a commit
+            inst = obj_type._interned(repo, oinfo.binsha, obj_type.tree_id << 12, "")  # type: ignore[union-attr]
+        else:
+            inst = obj_type._interned(repo, oinfo.binsha)
+        # END handle root trees
         inst.size = oinfo.size
         return inst
 
+    @classmethod
+    def _interned(cls: Type[T_Object], repo: "Repo", binsha: bytes, *args: Any) -> T_Object:
+        """
+        :return: instance of our type for the given binsha, taken from the identity map
+            of the repository if it has one, or a new instance which is added to it.
+            Without an identity map, a new instance is returned.
+        :param args: additional arguments to our constructor, like mode and path of index
+            objects. They are part of the key, as index objects are identified by their path.
+            Root trees have an empty path and are keyed by their binsha, like all other objects"""
+        identity_map = getattr(repo, "identity_map", None)
+        if identity_map is None:
+            return cls(repo, binsha, *args)
+        key = cls._identity_key(binsha, *args)
+        inst = identity_map.get(key)
+        if inst is None:
+            inst = cls(repo, binsha, *args)
+            identity_map[key] = inst
+        return inst
+
+    @staticmethod
+    def _identity_key(binsha: bytes, *args: Any) -> Any:
+        """:return: key of the object created with the given constructor arguments in the identity map"""
+        return (binsha,) + args if args and args[-1] else binsha
+
     def _set_cache_(self, attr: str) -> None:
         """Retrieve object information"""
         if attr == "size":
@@ -47,6 +47,7 @@ from typing import (
 from git.types import PathLike, Literal
 
 if TYPE_CHECKING:
+    from git.db import CommitRecord
     from git.repo import Repo
     from git.refs import SymbolicReference
 
@@ -87,12 +88,16 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
         "committed_date",
         "committer_tz_offset",
         "message",
-        "parents",
+        "_parents",
         "encoding",
         "gpgsig",
+        "_parent_binshas",
     )
     _id_attribute_ = "hexsha"
 
+    # amount of commits looked up at once in the commit cache when iterating
+    _cache_batch_size = 256
+
     def __init__(
         self,
         repo: "Repo",
@@ -172,7 +177,36 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
 
     @classmethod
     def _get_intermediate_items(cls, commit: "Commit") -> Tuple["Commit", ...]:
-        return tuple(commit.parents)
+        # don't keep the parents on the commit, traversals would retain all history they saw otherwise
+        return cls._new_parents(commit.repo, commit._parent_binshas)
+
+    @classmethod
+    def _new_parents(cls, repo: "Repo", parent_binshas: bytes) -> Tuple["Commit", ...]:
+        """:return: parent commits for the given concatenation of their binshas"""
+        return tuple(cls._interned(repo, parent_binshas[i : i + 20]) for i in range(0, len(parent_binshas), 20))
+
+    @property
+    def parents(self) -> Sequence["Commit"]:
+        """:return: our parent commits, which are created on first access"""
+        return self._parents
+
+    @parents.setter
+    def parents(self, parents: Sequence["Commit"]) -> None:
+        self._parents = parents
+        self._parent_binshas = b"".join(p.binsha for p in parents)
+
+    def _set_parent_binshas(self, parent_binshas: bytes) -> None:
+        """Set the binshas of our parents as read from the object database, dropping parent commits we had before"""
+        self._parent_binshas = parent_binshas
+        try:
+            del self._parents
+        except AttributeError:
+            pass
+        # END handle unset parents
+
+    @classmethod
+    def _get_visited_key(cls, commit: "Commit") -> bytes:
+        return commit.binsha
 
     @classmethod
     def _calculate_sha_(cls, repo: "Repo", commit: "Commit") -> bytes:
@@ -197,10 +231,11 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
         corresponding attribute in the new object.
         """
 
-        attrs = {k: getattr(self, k) for k in self.__slots__}
+        attrs = {k: getattr(self, k) for k in self.__slots__ if not k.startswith("_")}
+        attrs["parents"] = self.parents
 
         for attrname in kwargs:
-            if attrname not in self.__slots__:
+            if attrname not in attrs:
                 raise ValueError("invalid attribute name")
 
         attrs.update(kwargs)
@@ -210,14 +245,76 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
         return new_commit
 
     def _set_cache_(self, attr: str) -> None:
-        if attr in Commit.__slots__:
+        if attr == "_parents":
+            # parents are kept as binshas until they are needed
+            self._parents = self._new_parents(self.repo, self._parent_binshas)
+        elif attr in Commit.__slots__:
+            # repo-like objects may not support the commit cache
+            cache = getattr(self.repo, "commit_cache", None)
+            # the signature is the only header we don't keep in the commit cache
+            if cache is not None and attr != "gpgsig":
+                record = cache.get(self.binsha)
+                if record is not None:
+                    self._set_from_cache_record(record)
+                    if attr == "message":
+                        data = self.repo.odb.stream(self.binsha).read()
+                        self._set_message(data[record[-1] :])
+                    return
+            # END handle commit cache
+
             # read the data in a chunk, its faster - then provide a file wrapper
             _binsha, _typename, self.size, stream = self.repo.odb.stream(self.binsha)
-            self._deserialize(BytesIO(stream.read()))
+            data = stream.read()
+            self._deserialize(BytesIO(data))
+            if cache is not None:
+                cache.put(self.binsha, self._to_cache_record(data))
         else:
             super(Commit, self)._set_cache_(attr)
         # END handle attrs
 
+    def _to_cache_record(self, data: bytes) -> "CommitRecord":
+        """:return: record for the ``CommitCache`` describing this commit, which was deserialized from data"""
+        message_offset = data.find(b"\n\n")
+        # headers are separated from the message by an empty line
+        message_offset = len(data) if message_offset < 0 else message_offset + 2
+        return (
+            self.size,
+            self.tree.binsha,
+            self._parent_binshas,
+            self.author.name,
+            self.author.email,
+            self.authored_date,
+            self.author_tz_offset,
+            self.committer.name,
+            self.committer.email,
+            self.committed_date,
+            self.committer_tz_offset,
+            self.encoding,
+            message_offset,
+        )
+
+    def _set_from_cache_record(self, record: "CommitRecord") -> None:
+        """Set all attributes but the message and signature from the given ``CommitCache`` record"""
+        (
+            self.size,
+            tree_binsha,
+            parent_binshas,
+            author_name,
+            author_email,
+            self.authored_date,
+            self.author_tz_offset,
+            committer_name,
+            committer_email,
+            self.committed_date,
+            self.committer_tz_offset,
+            self.encoding,
+            _message_offset,
+        ) = record
+        self.tree = Tree._interned(self.repo, tree_binsha, Tree.tree_id << 12, "")
+        self._set_parent_binshas(parent_binshas)
+        self.author = Actor._intern(author_name, author_email)
+        self.committer = Actor._intern(committer_name, committer_email)
+
     @property
     def authored_datetime(self) -> datetime.datetime:
         return from_timestamp(self.authored_date, self.author_tz_offset)
@@ -461,19 +558,41 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
             proc_or_stream = cast(IO, proc_or_stream)  # type: ignore [redundant-cast]
             stream = proc_or_stream
 
+        cache = getattr(repo, "commit_cache", None)
+        batch: List[bytes] = []
         readline = stream.readline
         while True:
             line = readline()
+            if line:
+                hexsha = line.strip()
+                if len(hexsha) > 40:
+                    # split additional information, as returned by bisect for instance
+                    hexsha, _ = line.split(None, 1)
+                # END handle extra info
+
+                assert len(hexsha) == 40, "Invalid line: %s" % hexsha
+                if cache is None:
+                    yield cls._interned(repo, hex_to_bin(hexsha))
+                    continue
+                batch.append(hex_to_bin(hexsha))
+                if len(batch) < cls._cache_batch_size:
+                    continue
+            # END handle line
+
+            # look up the whole batch in one query, instead of one query per commit
+            if batch:
+                records = cache.get_many(batch) if cache is not None else {}
+                for binsha in batch:
+                    commit = cls._interned(repo, binsha)
+                    record = records.get(binsha)
+                    if record is not None:
+                        commit._set_from_cache_record(record)
+                    yield commit
+                # END for each commit in batch
+                batch = []
+            # END handle batch
             if not line:
                 break
-            hexsha = line.strip()
-            if len(hexsha) > 40:
-                # split additional information, as returned by bisect for instance
-                hexsha, _ = line.split(None, 1)
-            # END handle extra info
-
-            assert len(hexsha) == 40, "Invalid line: %s" % hexsha
-            yield cls(repo, hex_to_bin(hexsha))
         # END for each line in stream
         # TODO: Review this - it seems process handling got a bit out of control
         # due to many developers trying to fix the open file handles issue
@@ -693,9 +812,9 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
             Otherwise it is assumed to be a plain data stream from our object
         """
         readline = stream.readline
-        self.tree = Tree(self.repo, hex_to_bin(readline().split()[1]), Tree.tree_id << 12, "")
+        self.tree = Tree._interned(self.repo, hex_to_bin(readline().split()[1]), Tree.tree_id << 12, "")
 
-        self.parents = []
+        parent_binshas = []
         next_line = None
         while True:
             parent_line = readline()
@@ -703,9 +822,10 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
                 next_line = parent_line
                 break
             # END abort reading parents
-            self.parents.append(type(self)(self.repo, hex_to_bin(parent_line.split()[-1].decode("ascii"))))
+            parent_binshas.append(hex_to_bin(parent_line.split()[-1].decode("ascii")))
         # END for each parent line
-        self.parents = tuple(self.parents)
+        # parent commits are created on first access of our parents
+        self._set_parent_binshas(b"".join(parent_binshas))
 
         # we don't know actual author encoding before we have parsed it, so keep the lines around
         author_line = next_line
@@ -780,7 +900,11 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
 
         # a stream from our data simply gives us the plain message
         # The end of our message stream is marked with a newline that we strip
-        self.message = stream.read()
+        self._set_message(stream.read())
+        return self
+
+    def _set_message(self, message: bytes) -> None:
+        self.message = message
         try:
             self.message = self.message.decode(self.encoding, "replace")
         except UnicodeDecodeError:
@@ -792,8 +916,6 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
             )
         # END exception handling
 
-        return self
-
     # } END serializable implementation
 
     @property
@@ -813,6 +935,6 @@ class Commit(base.Object, TraversableIterableObj, Diffable, Serializable):
                 re.MULTILINE,
             )
             for author in results:
-                co_authors.append(Actor(*author))
+                co_authors.append(Actor._intern(*author))
 
         return co_authors
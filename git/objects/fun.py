@@ -2,18 +2,21 @@
 from stat import S_ISDIR
 
 
-from git.compat import safe_decode, defenc
+from git.compat import defenc
 
 # typing ----------------------------------------------
 
 from typing import (
     Callable,
+    Dict,
+    Iterator,
     List,
     MutableSequence,
     Sequence,
     Tuple,
     TYPE_CHECKING,
     Union,
+    cast,
     overload,
 )
 
@@ -30,8 +33,10 @@ EntryTupOrNone = Union[EntryTup, None]
 __all__ = (
     "tree_to_stream",
     "tree_entries_from_data",
+    "tree_entries_from_odb",
     "traverse_trees_recursive",
     "traverse_tree_recursive",
+    "diff_trees_recursive",
 )
 
 
@@ -72,48 +77,51 @@ def tree_entries_from_data(data: bytes) -> List[EntryTup]:
 
     :param data: data block with tree data (as bytes)
     :return: list(tuple(binsha, mode, tree_relative_path), ...)"""
-    ord_zero = ord("0")
-    space_ord = ord(" ")
+    find = data.find
     len_data = len(data)
+    # trees use only a handful of distinct modes, parse each of them once
+    modes: Dict[bytes, int] = {}
     i = 0
-    out = []
+    out: List[EntryTup] = []
+    append = out.append
     while i < len_data:
-        mode = 0
-
-        # read mode
-        # Some git versions truncate the leading 0, some don't
-        # The type will be extracted from the mode later
-        while data[i] != space_ord:
-            # move existing mode integer up one level being 3 bits
-            # and add the actual ordinal value of the character
-            mode = (mode << 3) + (data[i] - ord_zero)
-            i += 1
-        # END while reading mode
-
-        # byte is space now, skip it
-        i += 1
-
-        # parse name, it is NULL separated
-
-        ns = i
-        while data[i] != 0:
-            i += 1
-        # END while not reached NULL
-
-        # default encoding for strings in git is utf8
-        # Only use the respective unicode object if the byte stream was encoded
-        name_bytes = data[ns:i]
-        name = safe_decode(name_bytes)
-
-        # byte is NULL, get next 20
-        i += 1
-        sha = data[i : i + 20]
-        i = i + 20
-        out.append((sha, mode, name))
-    # END for each byte in data stream
+        # each entry is '<octal mode> <name>\0<binsha>'
+        # Some git versions truncate the leading 0 of the mode, some don't
+        space = find(b" ", i)
+        null = find(b"\0", space)
+        if space < 0 or null < 0 or null + 21 > len_data:
+            raise ValueError("Invalid tree entry at offset %i" % i)
+        # END handle truncated data
+
+        mode_bytes = data[i:space]
+        mode = modes.get(mode_bytes)
+        if mode is None:
+            mode = modes[mode_bytes] = int(mode_bytes, 8)
+        # END parse new mode
+
+        # default encoding for strings in git is utf8, keep undecodable bytes as surrogates
+        i = null + 21
+        append((data[null + 1 : i], mode, data[space + 1 : null].decode(defenc, "surrogateescape")))
+    # END for each entry in data stream
     return out
 
 
+def tree_entries_from_odb(odb: "GitCmdObjectDB", binsha: bytes) -> Sequence[EntryTup]:
+    """
+    :return: entries of the tree with the given binsha, like ``tree_entries_from_data`` returns them.
+        If the object database has a ``tree_cache``, they are taken from it or added to it.
+    :note: entries may be shared with the cache, hence the returned sequence must not be altered"""
+    cache = getattr(odb, "tree_cache", None)
+    if cache is None:
+        return tree_entries_from_data(odb.stream(binsha).read())
+    entries = cache.get(binsha)
+    if entries is None:
+        data = odb.stream(binsha).read()
+        entries = cache.put(binsha, tree_entries_from_data(data), len(data))
+    # END handle cache miss
+    return entries
+
+
 def _find_by_name(tree_data: MutableSequence[EntryTupOrNone], name: str, is_dir: bool, start_at: int) -> EntryTupOrNone:
     """return data entry matching the given name and tree mode
     or None.
@@ -179,7 +187,7 @@ def traverse_trees_recursive(
             data: List[EntryTupOrNone] = []
         else:
             # make new list for typing as list invariant
-            data = list(tree_entries_from_data(odb.stream(tree_sha).read()))
+            data = list(tree_entries_from_odb(odb, tree_sha))
         # END handle muted trees
         trees_data.append(data)
     # END for each sha to get data for
@@ -240,7 +248,7 @@ def traverse_tree_recursive(odb: "GitCmdObjectDB", tree_sha: bytes, path_prefix:
         * [2] path relative to the repository
     :param path_prefix: prefix to prepend to the front of all returned paths"""
     entries = []
-    data = tree_entries_from_data(odb.stream(tree_sha).read())
+    data = tree_entries_from_odb(odb, tree_sha)
 
     # unpacking/packing is faster than accessing individual items
     for sha, mode, name in data:
@@ -251,3 +259,63 @@ def traverse_tree_recursive(odb: "GitCmdObjectDB", tree_sha: bytes, path_prefix:
     # END for each item
 
     return entries
+
+
+def _diff_key(entry: EntryTup) -> str:
+    # git sorts trees as if their name was followed by a slash
+    return entry[2] + "/" if S_ISDIR(entry[1]) else entry[2]
+
+
+def diff_trees_recursive(
+    odb: "GitCmdObjectDB", a_sha: Union[bytes, None], b_sha: Union[bytes, None], path_prefix: str
+) -> Iterator[Tuple[EntryTupOrNone, EntryTupOrNone]]:
+    """
+    :return: iterator yielding pairs of entries (a, b) of all blobs and commits which differ
+        between the trees pointed to by the binary a_sha and b_sha, in the order git-diff-tree
+        would list them. Entries have the same format as the ones of ``traverse_tree_recursive``.
+        An entry is None if it doesn't exist in the respective tree, an entry changing its
+        type between tree and non-tree is reported as removal and addition.
+    :param a_sha: sha of the first tree, or None to compare against an empty tree
+    :param b_sha: sha of the second tree, or None to compare against an empty tree
+    :param path_prefix: a prefix to be added to the returned paths on this level,
+        set it '' for the first iteration
+    :note: Subtrees with the same sha on both sides are skipped without reading them"""
+    a_data = tree_entries_from_odb(odb, a_sha) if a_sha is not None else ()
+    b_data = tree_entries_from_odb(odb, b_sha) if b_sha is not None else ()
+    len_a, len_b = len(a_data), len(b_data)
+    ai = bi = 0
+
+    # both lists are sorted, hence walk them side by side
+    while ai < len_a or bi < len_b:
+        a_entry: EntryTupOrNone = a_data[ai] if ai < len_a else None
+        b_entry: EntryTupOrNone = b_data[bi] if bi < len_b else None
+        if a_entry is not None and b_entry is not None:
+            a_key, b_key = _diff_key(a_entry), _diff_key(b_entry)
+            if a_key < b_key:
+                b_entry = None
+            elif b_key < a_key:
+                a_entry = None
+            elif a_entry[0] == b_entry[0] and a_entry[1] == b_entry[1]:
+                # unchanged, no matter whether it is a blob or a whole tree
+                ai += 1
+                bi += 1
+                continue
+            # END handle keys
+        # END handle both entries
+        if a_entry is not None:
+            ai += 1
+        if b_entry is not None:
+            bi += 1
+
+        entry = cast(EntryTup, a_entry or b_entry)
+        if S_ISDIR(entry[1]):
+            yield from diff_trees_recursive(
+                odb,
+                a_entry and a_entry[0],
+                b_entry and b_entry[0],
+                path_prefix + entry[2] + "/",
+            )
+        else:
+            yield _to_full_path(a_entry, path_prefix), _to_full_path(b_entry, path_prefix)
+        # END handle trees
+    # END for each entry
@@ -0,0 +1,279 @@
+# graph.py
+# Copyright (C) 2008, 2009 Michael Trier (mtrier@gmail.com) and contributors
+#
+# This module is part of GitPython and is released under
+# the BSD License: https://opensource.org/license/bsd-3-clause/
+"""Module containing an in-memory index of the commit graph"""
+from array import array
+from collections import deque
+import heapq
+from subprocess import PIPE
+
+from git.util import bin_to_hex, finalize_process
+
+from .commit import Commit
+
+# typing -------------------------------------------------------------------
+
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from git.repo import Repo
+    from git.refs import SymbolicReference
+
+# --------------------------------------------------------------------------
+
+__all__ = ("CommitGraph",)
+
+
+class CommitGraph(object):
+
+    """An in-memory index of the commit graph of a revision range.
+
+    The graph is read once with a single git-rev-list invocation and stores commits
+    under consecutive integer indices, with parent and child adjacency and commit
+    dates kept in lists and arrays indexed by them. No Commit objects are created,
+    all queries take and return hexshas and run in O(V+E) or better.
+
+    Parents which are not part of the range, like the boundary commits of 'A..B',
+    are not part of the graph.
+
+    Example::
+
+        graph = CommitGraph(repo, "v1.0..master")
+        graph.is_ancestor(older, newer)
+        for hexsha in graph.topo_order():
+            ..."""
+
+    __slots__ = ("repo", "revs", "kwargs", "_hexshas", "_index", "_dates", "_parents", "_children")
+
+    def __init__(
+        self,
+        repo: "Repo",
+        rev: Union[str, Commit, "SymbolicReference", Sequence[Union[str, Commit, "SymbolicReference"]]] = "HEAD",
+        **kwargs: Any,
+    ) -> None:
+        """Read the graph of all commits reachable from the given revisions.
+
+        :param repo: Repo the commits live in
+        :param rev: revision specifier or list of them, see git-rev-list for viable options.
+            These are kept and re-evaluated by ``refresh()``.
+        :param kwargs: Additional arguments to git-rev-list, like ``since`` or ``first_parent``.
+            They must not alter the output format."""
+        self.repo = repo
+        if isinstance(rev, (list, tuple)):
+            self.revs = [str(r) for r in rev]
+        else:
+            self.revs = [str(rev)]
+        self.kwargs = kwargs
+
+        self._hexshas: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._dates = array("q")
+        self._parents: List[Tuple[int, ...]] = []
+        self._children: List[List[int]] = []
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._hexshas)
+
+    def __contains__(self, sha: Union[str, bytes, Commit]) -> bool:
+        return self._to_hexsha(sha) in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._hexshas)
+
+    def __repr__(self) -> str:
+        return '<git.CommitGraph "%s" (%i commits)>' % (" ".join(self.revs), len(self))
+
+    # { Construction
+
+    def refresh(self) -> int:
+        """Add all commits which became reachable from our revisions since the graph was read,
+        which is what happens if references move forward.
+
+        Only the new commits are read, as walking stops at the known tips of the graph.
+        Commits which became unreachable, like after a history rewrite, are not removed.
+        Create a new graph in that case.
+
+        :return: number of commits added"""
+        lines = list(self.revs)
+        # known commits without children cover everything we know already
+        lines.extend("^" + self._hexshas[i] for i in range(len(self._hexshas)) if not self._children[i])
+
+        proc = self.repo.git.rev_list(
+            stdin=True, parents=True, timestamp=True, as_process=True, istream=PIPE, **self.kwargs
+        )
+        # rev-list reads all revisions from stdin before it starts walking
+        proc.stdin.write(("\n".join(lines) + "\n").encode("ascii"))
+        proc.stdin.close()
+        records = [line.decode("ascii").split() for line in proc.stdout]
+        finalize_process(proc)
+
+        index = self._index
+        first = len(self._hexshas)
+        for record in records:
+            index[record[1]] = len(self._hexshas)
+            self._hexshas.append(record[1])
+            self._dates.append(int(record[0]))
+            self._children.append([])
+        # END for each new commit
+
+        # parents are usually listed after their children, hence link them once all are known
+        for i, record in enumerate(records, first):
+            parents = tuple(index[p] for p in record[2:] if p in index)
+            self._parents.append(parents)
+            for p in parents:
+                self._children[p].append(i)
+        # END for each new commit
+        return len(records)
+
+    # } END construction
+
+    # { Utilities
+
+    def _to_hexsha(self, sha: Union[str, bytes, Commit]) -> str:
+        if isinstance(sha, Commit):
+            return sha.hexsha
+        if isinstance(sha, bytes):
+            if len(sha) == 20:
+                return bin_to_hex(sha).decode("ascii")
+            return sha.decode("ascii")
+        return sha
+
+    def _to_index(self, sha: Union[str, bytes, Commit]) -> int:
+        """:return: index of the given commit
+        :raise KeyError: if the commit is not part of the graph"""
+        hexsha = self._to_hexsha(sha)
+        try:
+            return self._index[hexsha]
+        except KeyError as e:
+            raise KeyError("Commit %s is not part of the graph" % hexsha) from e
+
+    def _reachable(self, start: int, edges: List[Any]) -> Set[int]:
+        seen = {start}
+        stack = [start]
+        while stack:
+            for n in edges[stack.pop()]:
+                if n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+        # END while there are commits to visit
+        return seen
+
+    def _to_hexshas(self, indices: Iterable[int]) -> List[str]:
+        hexshas = self._hexshas
+        return [hexshas[i] for i in indices]
+
+    # } END utilities
+
+    # { Queries
+
+    def parents(self, sha: Union[str, bytes, Commit]) -> List[str]:
+        """:return: hexshas of the parents of the given commit which are part of the graph"""
+        return self._to_hexshas(self._parents[self._to_index(sha)])
+
+    def children(self, sha: Union[str, bytes, Commit]) -> List[str]:
+        """:return: hexshas of the children of the given commit"""
+        return self._to_hexshas(self._children[self._to_index(sha)])
+
+    def committed_date(self, sha: Union[str, bytes, Commit]) -> int:
+        """:return: committer date of the given commit in seconds since epoch"""
+        return self._dates[self._to_index(sha)]
+
+    def ancestors(self, sha: Union[str, bytes, Commit], include_self: bool = False) -> Set[str]:
+        """:return: set of hexshas of all commits in the graph reachable from the given one"""
+        start = self._to_index(sha)
+        reachable = self._reachable(start, self._parents)
+        if not include_self:
+            reachable.discard(start)
+        return set(self._to_hexshas(reachable))
+
+    def descendants(self, sha: Union[str, bytes, Commit], include_self: bool = False) -> Set[str]:
+        """:return: set of hexshas of all commits in the graph the given one is reachable from"""
+        start = self._to_index(sha)
+        reachable = self._reachable(start, self._children)
+        if not include_self:
+            reachable.discard(start)
+        return set(self._to_hexshas(reachable))
+
+    def first_parent_chain(self, sha: Union[str, bytes, Commit]) -> List[str]:
+        """:return: hexshas of the given commit followed by its first parent, the first parent of
+        that one, and so on, until a root or boundary commit is reached"""
+        i = self._to_index(sha)
+        chain = [i]
+        parents = self._parents[i]
+        while parents:
+            i = parents[0]
+            chain.append(i)
+            parents = self._parents[i]
+        # END while there is a first parent
+        return self._to_hexshas(chain)
+
+    def is_ancestor(self, ancestor: Union[str, bytes, Commit], sha: Union[str, bytes, Commit]) -> bool:
+        """:return: True if ancestor is reachable from sha, or if both are the same commit,
+        like ``Repo.is_ancestor`` does"""
+        target = self._to_index(ancestor)
+        start = self._to_index(sha)
+        if target == start:
+            return True
+        parents = self._parents
+        seen = {start}
+        stack = [start]
+        while stack:
+            for p in parents[stack.pop()]:
+                if p == target:
+                    return True
+                if p not in seen:
+                    seen.add(p)
+                    stack.append(p)
+        # END while there are commits to visit
+        return False
+
+    def topo_order(self, reverse: bool = False) -> List[str]:
+        """:return: hexshas of all commits, with no parent being shown before all of its children
+            were shown, similar to ``git rev-list --topo-order``
+        :param reverse: if True, parents are shown before their children"""
+        return self._to_hexshas(self._ordered(by_date=False, reverse=reverse))
+
+    def date_order(self, reverse: bool = False) -> List[str]:
+        """:return: hexshas of all commits in descending committer date order, with no parent
+            being shown before all of its children were shown, as ``git rev-list --date-order`` does
+        :param reverse: if True, parents are shown before their children"""
+        return self._to_hexshas(self._ordered(by_date=True, reverse=reverse))
+
+    def _ordered(self, by_date: bool, reverse: bool) -> List[int]:
+        parents: Sequence[Sequence[int]] = self._parents
+        children: Sequence[Sequence[int]] = self._children
+        if reverse:
+            parents, children = children, parents
+        pending = [len(c) for c in children]
+        ready = [i for i, count in enumerate(pending) if not count]
+        order: List[int] = []
+        if by_date:
+            dates = self._dates
+            sign = 1 if reverse else -1
+            heap = [(sign * dates[i], i) for i in ready]
+            heapq.heapify(heap)
+            while heap:
+                i = heapq.heappop(heap)[1]
+                order.append(i)
+                for p in parents[i]:
+                    pending[p] -= 1
+                    if not pending[p]:
+                        heapq.heappush(heap, (sign * dates[p], p))
+            # END while there are commits to show
+        else:
+            # depth first, keeping lines of development together
+            stack: Deque[int] = deque(reversed(ready))
+            while stack:
+                i = stack.pop()
+                order.append(i)
+                for p in reversed(parents[i]):
+                    pending[p] -= 1
+                    if not pending[p]:
+                        stack.append(p)
+            # END while there are commits to show
+        return order
+
+    # } END queries
@@ -103,7 +103,7 @@ class Submodule(IndexObject, TraversableIterableObj):
     # this is a bogus type for base class compatibility
     type: Literal["submodule"] = "submodule"  # type: ignore
 
-    __slots__ = ("_parent_commit", "_url", "_branch_path", "_name", "__weakref__")
+    __slots__ = ("_parent_commit", "_url", "_branch_path", "_name")
     _cache_attrs = ("path", "_url", "_branch_path")
 
     def __init__(
@@ -83,7 +83,7 @@ class TagObject(base.Object):
             _obj, hexsha = lines[0].split(" ")
             _type_token, type_name = lines[1].split(" ")
             object_type = get_object_type_by_name(type_name.encode("ascii"))
-            self.object = object_type(self.repo, hex_to_bin(hexsha))
+            self.object = object_type._interned(self.repo, hex_to_bin(hexsha))
 
             self.tag = lines[2][4:]  # tag <tag name>
 
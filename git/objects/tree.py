@@ -4,7 +4,10 @@
 # This module is part of GitPython and is released under
 # the BSD License: https://opensource.org/license/bsd-3-clause/
 
-from git.util import IterableList, join_path
+import os
+
+from git.compat import defenc
+from git.util import IterableList, bin_to_hex, finalize_process, hex_to_bin, join_path
 import git.diff as git_diff
 from git.util import to_bin_sha
 
@@ -13,7 +16,7 @@ from .base import IndexObject, IndexObjUnion
 from .blob import Blob
 from .submodule.base import Submodule
 
-from .fun import tree_entries_from_data, tree_to_stream
+from .fun import EntryTup, diff_trees_recursive, tree_entries_from_data, tree_entries_from_odb, tree_to_stream
 
 
 # typing -------------------------------------------------
@@ -25,6 +28,9 @@ from typing import (
     Iterable,
     Iterator,
     List,
+    NamedTuple,
+    Optional,
+    Sequence,
     Tuple,
     Type,
     Union,
@@ -51,7 +57,17 @@ TraversedTreeTup = Union[Tuple[Union["Tree", None], IndexObjUnion, Tuple["Submod
 
 cmp: Callable[[str, str], int] = lambda a, b: (a > b) - (a < b)
 
-__all__ = ("TreeModifier", "Tree")
+__all__ = ("TreeModifier", "TreeEntry", "Tree")
+
+
+class TreeEntry(NamedTuple):
+    """An entry of a tree listing as yielded by ``Tree.iter_entries``"""
+
+    path: str
+    mode: int
+    binsha: bytes
+    # size of blobs in bytes, None for trees and submodules or if sizes were not requested
+    size: Optional[int]
 
 
 def git_cmp(t1: TreeCacheTup, t2: TreeCacheTup) -> int:
@@ -109,10 +125,18 @@ class TreeModifier(object):
     Once all adjustments are complete, the _cache, which really is a reference to
     the cache of a tree, will be sorted. Assuring it will be in a serializable state"""
 
-    __slots__ = "_cache"
+    __slots__ = ("_cache", "_tree")
 
-    def __init__(self, cache: List[TreeCacheTup]) -> None:
+    def __init__(self, cache: List[TreeCacheTup], tree: Union["Tree", None] = None) -> None:
+        """
+        :param cache: list of tree entries to modify
+        :param tree: tree owning the cache, whose name index is discarded when the cache changes"""
         self._cache = cache
+        self._tree = tree
+
+    def _invalidate_index(self) -> None:
+        if self._tree is not None:
+            self._tree._invalidate_name_index()
 
     def _index_by_name(self, name: str) -> int:
         """:return: index of an item with name, or -1 if not found"""
@@ -131,6 +155,7 @@ class TreeModifier(object):
 
         :return self:"""
         merge_sort(self._cache, git_cmp)
+        self._invalidate_index()
         return self
 
     # } END interface
@@ -160,6 +185,7 @@ class TreeModifier(object):
 
         if index == -1:
             self._cache.append(item)
+            self._invalidate_index()
         else:
             if force:
                 self._cache[index] = item
@@ -182,12 +208,14 @@ class TreeModifier(object):
         tree_cache = (binsha, mode, name)
 
         self._cache.append(tree_cache)
+        self._invalidate_index()
 
     def __delitem__(self, name: str) -> None:
         """Deletes an item with the given name if it exists"""
         index = self._index_by_name(name)
         if index > -1:
             del self._cache[index]
+            self._invalidate_index()
 
     # } END mutators
 
@@ -206,7 +234,7 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
     """
 
     type: Literal["tree"] = "tree"
-    __slots__ = "_cache"
+    __slots__ = ("_cache", "_name_index")
 
     # actual integer ids for comparison
     commit_id = 0o16  # equals stat.S_IFDIR | stat.S_IFLNK - a directory link
@@ -241,9 +269,11 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
 
     def _set_cache_(self, attr: str) -> None:
         if attr == "_cache":
-            # Set the data when we need it
-            ostream = self.repo.odb.stream(self.binsha)
-            self._cache: List[TreeCacheTup] = tree_entries_from_data(ostream.read())
+            # Set the data when we need it, the entries may be shared with the tree cache
+            self._cache: List[TreeCacheTup] = list(tree_entries_from_odb(self.repo.odb, self.binsha))
+        elif attr == "_name_index":
+            # built on first lookup by name, as iterating trees doesn't need it
+            self._name_index: Dict[str, int] = {info[2]: i for i, info in enumerate(self._cache)}
         else:
             super(Tree, self)._set_cache_(attr)
         # END handle attribute
@@ -252,13 +282,25 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
         """Iterable yields tuples of (binsha, mode, name), which will be converted
         to the respective object representation"""
         for binsha, mode, name in iterable:
-            path = join_path(self.path, name)
-            try:
-                yield self._map_id_to_type[mode >> 12](self.repo, binsha, mode, path)
-            except KeyError as e:
-                raise TypeError("Unknown mode %o found in tree data for path '%s'" % (mode, path)) from e
+            yield self._to_object(binsha, mode, join_path(self.path, name))
         # END for each item
 
+    def _invalidate_name_index(self) -> None:
+        try:
+            del self._name_index
+        except AttributeError:
+            pass
+
+    def _to_object(self, binsha: bytes, mode: int, path: PathLike) -> IndexObjUnion:
+        try:
+            obj_type = self._map_id_to_type[mode >> 12]
+        except KeyError as e:
+            raise TypeError("Unknown mode %o found in tree data for path '%s'" % (mode, path)) from e
+        if obj_type is Submodule:
+            # submodules carry state of their own, like their parent commit, and are never shared
+            return obj_type(self.repo, binsha, mode, path)
+        return obj_type._interned(self.repo, binsha, mode, path)
+
     def join(self, file: str) -> IndexObjUnion:
         """Find the named object in this tree's contents
 
@@ -284,15 +326,39 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
                 raise KeyError(msg % file)
             return item
         else:
-            for info in self._cache:
-                if info[2] == file:  # [2] == name
-                    return self._map_id_to_type[info[1] >> 12](
-                        self.repo, info[0], info[1], join_path(self.path, info[2])
-                    )
-            # END for each obj
-            raise KeyError(msg % file)
+            index = self._name_index.get(file)
+            if index is None:
+                raise KeyError(msg % file)
+            info = self._cache[index]
+            return self._to_object(info[0], info[1], join_path(self.path, info[2]))
         # END handle long paths
 
+    def join_many(self, files: Iterable[str]) -> List[IndexObjUnion]:
+        """Find several objects by their paths, like ``join`` does for a single one.
+        Trees on the way are looked up only once for all paths below them.
+
+        :return: list of ``git.Blob``, ``git.Tree`` or ``git.Submodule`` in the order of the given paths
+        :raise KeyError: if any of the given paths does not exist in this tree"""
+        trees: Dict[str, Tree] = {"": self}
+
+        def tree_at(path: str) -> Tree:
+            tree = trees.get(path)
+            if tree is None:
+                parent_path, _, name = path.rpartition("/")
+                item = tree_at(parent_path).join(name)
+                if item.type != "tree":
+                    raise KeyError("Tree named %r not found" % path)
+                tree = trees[path] = item
+            # END resolve tree
+            return tree
+
+        items = []
+        for file in files:
+            dir_path, _, name = file.rpartition("/")
+            items.append(tree_at(dir_path).join(name))
+        # END for each file
+        return items
+
     def __truediv__(self, file: str) -> IndexObjUnion:
         """For PY3 only"""
         return self.join(file)
@@ -313,8 +379,18 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
         :return: An object allowing to modify the internal cache. This can be used
             to change the tree's contents. When done, make sure you call ``set_done``
             on the tree modifier, or serialization behaviour will be incorrect.
-            See the ``TreeModifier`` for more information on how to alter the cache"""
-        return TreeModifier(self._cache)
+            See the ``TreeModifier`` for more information on how to alter the cache
+
+        :note: if the repository has an identity map, this tree is removed from it, as it won't
+            match its binsha anymore. Later lookups get a new instance, but the ones holding this
+            tree already, like the commit it was obtained from, see the changes"""
+        identity_map = getattr(self.repo, "identity_map", None)
+        if identity_map is not None:
+            key = self._identity_key(self.binsha, self.mode, getattr(self, "path", None))
+            if identity_map.get(key) is self:
+                del identity_map[key]
+        # END handle identity map
+        return TreeModifier(self._cache, self)
 
     def traverse(
         self,  # type: ignore[override]
@@ -325,9 +401,33 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
         visit_once: bool = False,
         ignore_self: int = 1,
         as_edge: bool = False,
+        pathspec: Union[str, Sequence[str], util.Pathspec, None] = None,
     ) -> Union[Iterator[IndexObjUnion], Iterator[TraversedTreeTup]]:
         """For documentation, see util.Traversable._traverse()
-        Trees are set to visit_once = False to gain more performance in the traversal"""
+        Trees are set to visit_once = False to gain more performance in the traversal
+
+        :param pathspec: optional git pathspec or list of them, see ``util.Pathspec``.
+            Only items with matching paths are returned, and trees which cannot contain
+            any matching path are skipped without being read"""
+        if pathspec is not None:
+            spec = pathspec if isinstance(pathspec, util.Pathspec) else util.Pathspec(pathspec)
+            user_predicate, user_prune = predicate, prune
+
+            def spec_predicate(i: Union[IndexObjUnion, TraversedTreeTup], d: int) -> bool:
+                item = cast(IndexObjUnion, i[1] if isinstance(i, tuple) else i)
+                return spec.matches(str(item.path)) and user_predicate(i, d)
+
+            def spec_prune(i: Union[IndexObjUnion, TraversedTreeTup], d: int) -> bool:
+                item = cast(IndexObjUnion, i[1] if isinstance(i, tuple) else i)
+                if item.type == "tree":
+                    # decided by the path alone, before the tree is read
+                    skip = not spec.matches_below(str(item.path))
+                else:
+                    skip = not spec.matches(str(item.path))
+                return skip or user_prune(i, d)
+
+            predicate, prune = spec_predicate, spec_prune
+        # END handle pathspec
 
         # """
         # # To typecheck instead of using cast.
@@ -351,6 +451,128 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
             ),
         )
 
+    def iter_entries(
+        self,
+        recursive: bool = True,
+        long: bool = False,
+        pathspec: Union[PathLike, Sequence[PathLike], None] = None,
+    ) -> Iterator[TreeEntry]:
+        """Stream the entries of this tree as listed by a single git-ls-tree invocation.
+
+        Unlike ``traverse``, no subtree is read by us and no object is created per entry,
+        which makes this the way to go to list the paths and shas of very large trees.
+
+        :param recursive: if True, list the entries of all subtrees instead of the subtrees themselves
+        :param long: if True, the size of blobs is listed as well. This requires git to read
+            the header of each blob
+        :param pathspec: optional path or list of paths relative to this tree, limiting the listing
+            to entries at or below them. Like git-ls-tree, patterns are not supported
+        :return: iterator yielding ``TreeEntry`` tuples of (path, mode, binsha, size), with paths
+            being relative to the repository like the ones of objects in this tree"""
+        args: List[PathLike] = [self.hexsha]
+        if pathspec is not None:
+            args.append("--")
+            args.extend([pathspec] if isinstance(pathspec, (str, os.PathLike)) else pathspec)
+        # END handle pathspec
+        proc = self.repo.git.ls_tree(args, r=recursive, l=long, z=True, full_tree=True, as_process=True)
+
+        prefix = "%s/" % self.path if self.path else ""
+        read = proc.stdout.read
+        remainder = b""
+        try:
+            while True:
+                chunk = read(65536)
+                if not chunk:
+                    break
+                # records are '<mode> <type> <sha>[ <size>]\t<path>', each terminated by NUL
+                records = (remainder + chunk).split(b"\0")
+                remainder = records.pop()
+                for record in records:
+                    info, path = record.split(b"\t", 1)
+                    fields = info.split()
+                    size = int(fields[3]) if long and fields[3] != b"-" else None
+                    yield TreeEntry(
+                        prefix + path.decode(defenc, "surrogateescape"), int(fields[0], 8), hex_to_bin(fields[2]), size
+                    )
+                # END for each record
+            # END for each chunk
+        except BaseException:
+            # we were closed early or failed, don't keep git running until the process is collected
+            proc._terminate()
+            raise
+        # END handle early exit
+        finalize_process(proc)
+
+    def diff_native(self, other: Union["Tree", str]) -> git_diff.DiffIndex:
+        """Compare this tree to another one without spawning git, like ``diff(other)``
+        does for two trees.
+
+        Both trees are walked side by side and subtrees with the same sha on both sides are
+        skipped, hence only the trees along the changed paths are read.
+
+        :param other: Tree or treeish revision to compare to, being the b side of the diffs
+        :return: git.DiffIndex with one Diff per changed blob or submodule, with paths
+            relative to the compared trees
+        :note: Unlike ``diff``, renames and copies are not detected, and no patches are created"""
+        if isinstance(other, str):
+            other = self.repo.tree(other)
+        # END resolve revision
+
+        index: git_diff.DiffIndex = git_diff.DiffIndex()
+        for a, b in diff_trees_recursive(self.repo.odb, self.binsha, other.binsha, ""):
+            if a is None:
+                change_type: git_diff.Lit_change_type = "A"
+            elif b is None:
+                change_type = "D"
+            elif (a[1] ^ b[1]) & 0o170000:
+                # the object type differs, like a file turning into a symlink
+                change_type = "T"
+            else:
+                change_type = "M"
+            # END get change type
+            path = cast(EntryTup, a or b)[2].encode(defenc, "surrogateescape")
+            index.append(
+                git_diff.Diff(
+                    self.repo,
+                    path,
+                    path,
+                    bin_to_hex(a[0]).decode("ascii") if a else None,
+                    bin_to_hex(b[0]).decode("ascii") if b else None,
+                    # git lists the mode of missing sides as zero
+                    "%06o" % (a[1] if a else 0),
+                    "%06o" % (b[1] if b else 0),
+                    a is None,
+                    b is None,
+                    False,
+                    None,
+                    None,
+                    "",
+                    change_type,
+                    None,
+                )
+            )
+        # END for each changed entry
+        return index
+
+    def directory_sizes(self, pathspec: Union[PathLike, Sequence[PathLike], None] = None) -> Dict[str, int]:
+        """
+        :return: dict mapping the path of this tree and of each tree below it to the total size
+            in bytes of all blobs it contains, recursively. Trees without blobs are not listed.
+        :param pathspec: optional path or list of paths relative to this tree, limiting the blobs
+            which are accounted for"""
+        root = self.path or ""
+        sizes: Dict[str, int] = {}
+        for entry in self.iter_entries(recursive=True, long=True, pathspec=pathspec):
+            if entry.size is None:
+                continue
+            path = entry.path
+            while path != root:
+                path = path.rpartition("/")[0]
+                sizes[path] = sizes.get(path, 0) + entry.size
+            # END for each directory containing the blob
+        # END for each entry
+        return sizes
+
     def list_traverse(self, *args: Any, **kwargs: Any) -> IterableList[IndexObjUnion]:
         """
         :return: IterableList with the results of the traversal as produced by
@@ -373,7 +595,7 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
     def __getitem__(self, item: Union[str, int, slice]) -> IndexObjUnion:
         if isinstance(item, int):
             info = self._cache[item]
-            return self._map_id_to_type[info[1] >> 12](self.repo, info[0], info[1], join_path(self.path, info[2]))
+            return self._to_object(info[0], info[1], join_path(self.path, info[2]))
 
         if isinstance(item, str):
             # compatibility
@@ -414,6 +636,7 @@ class Tree(IndexObject, git_diff.Diffable, util.Traversable, util.Serializable):
 
     def _deserialize(self, stream: "BytesIO") -> "Tree":
         self._cache = tree_entries_from_data(stream.read())
+        self._invalidate_name_index()
         return self
 
 
@@ -8,6 +8,7 @@
 
 
 from abc import ABC, abstractmethod
+from fnmatch import translate
 import warnings
 from git.util import IterableList, IterableObj, Actor
 
@@ -18,6 +19,7 @@ from string import digits
 import time
 import calendar
 from datetime import datetime, timedelta, tzinfo
+from weakref import WeakValueDictionary
 
 # typing ------------------------------------------------------------
 from typing import (
@@ -26,8 +28,11 @@ from typing import (
     Deque,
     Iterator,
     Generic,
+    List,
     NamedTuple,
+    Optional,
     overload,
+    Pattern,
     Sequence,  # NOQA: F401
     TYPE_CHECKING,
     Tuple,
@@ -76,6 +81,7 @@ __all__ = (
     "parse_date",
     "parse_actor_and_date",
     "ProcessStreamAdapter",
+    "Pathspec",
     "Traversable",
     "altz_to_utctz_str",
     "utctz_to_altz",
@@ -192,12 +198,22 @@ class tzoffset(tzinfo):
 
 utc = tzoffset(0, "UTC")
 
+# tzoffsets are immutable, hence all datetimes with the same offset can share one
+_tzoffsets: "WeakValueDictionary[float, tzoffset]" = WeakValueDictionary()
+
+
+def _interned_tzoffset(secs_west_of_utc: float) -> tzoffset:
+    tz = _tzoffsets.get(secs_west_of_utc)
+    if tz is None:
+        tz = _tzoffsets[secs_west_of_utc] = tzoffset(secs_west_of_utc)
+    return tz
+
 
 def from_timestamp(timestamp: float, tz_offset: float) -> datetime:
     """Converts a timestamp + tz_offset into an aware datetime instance."""
     utc_dt = datetime.fromtimestamp(timestamp, utc)
     try:
-        local_dt = utc_dt.astimezone(tzoffset(tz_offset))
+        local_dt = utc_dt.astimezone(_interned_tzoffset(tz_offset))
         return local_dt
     except ValueError:
         return utc_dt
@@ -344,6 +360,135 @@ class ProcessStreamAdapter(object):
         return getattr(self._stream, attr)
 
 
+def _glob_to_regex(pattern: str) -> str:
+    """:return: regular expression for a pattern with ':(glob)' semantics, in which wildcards
+    don't match slashes and '**' matches across directories"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        elif c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[" and pattern.find("]", i + 2) > -1:
+            end = pattern.find("]", i + 2)
+            group = pattern[i + 1 : end]
+            if group[0] in "!^":
+                group = "^" + group[1:]
+            out.append("[%s]" % group.replace("\\", "\\\\"))
+            i = end
+        else:
+            out.append(re.escape(c))
+        # END handle character
+        i += 1
+    # END for each character
+    return "(?s:%s)\\Z" % "".join(out)
+
+
+class Pathspec(object):
+
+    """A list of git pathspecs, compiled once to match many paths against them.
+
+    Supported are literal paths, which also match everything below them, wildcard patterns
+    as git uses them by default, in which '*' matches slashes as well, and the magic
+    signatures 'exclude' (or '!' and '^'), 'glob', 'literal' and 'top', like in
+    ``:(exclude)docs`` or ``:!*.txt``. All paths are relative to the repository root.
+
+    Besides matching paths, it tells whether paths below a directory could match,
+    which allows to skip directories without reading them."""
+
+    __slots__ = ("_include", "_exclude")
+
+    _wildcards = re.compile(r"[*?[]")
+
+    def __init__(self, pathspecs: Union[str, Sequence[str]]) -> None:
+        """:raise ValueError: if a pathspec uses unsupported magic"""
+        if isinstance(pathspecs, str):
+            pathspecs = [pathspecs]
+        # compiled items are (pattern, literal prefix, regex or None for literal patterns)
+        self._include: List[Tuple[str, str, Optional[Pattern[str]]]] = []
+        self._exclude: List[Tuple[str, str, Optional[Pattern[str]]]] = []
+        for spec in pathspecs:
+            magic: List[str] = []
+            if spec.startswith(":("):
+                words, _, spec = spec[2:].partition(")")
+                magic = [w.strip() for w in words.split(",")]
+            elif spec.startswith(":"):
+                i = 1
+                while i < len(spec) and spec[i] in "!^/":
+                    magic.append("exclude" if spec[i] in "!^" else "top")
+                    i += 1
+                spec = spec[i + 1 :] if spec[i : i + 1] == ":" else spec[i:]
+            # END parse magic
+            unsupported = set(magic) - {"exclude", "glob", "literal", "top"}
+            if unsupported:
+                raise ValueError("Unsupported pathspec magic: %s" % ", ".join(sorted(unsupported)))
+
+            pattern = spec.strip("/")
+            match = None if "literal" in magic else self._wildcards.search(pattern)
+            item: Tuple[str, str, Optional[Pattern[str]]]
+            if match is None:
+                item = (pattern, pattern, None)
+            else:
+                regex = _glob_to_regex(pattern) if "glob" in magic else translate(pattern)
+                item = (pattern, pattern[: match.start()], re.compile(regex))
+            # END compile pattern
+            (self._exclude if "exclude" in magic else self._include).append(item)
+        # END for each pathspec
+
+    def __repr__(self) -> str:
+        return "<git.Pathspec %r, excluding %r>" % ([i[0] for i in self._include], [i[0] for i in self._exclude])
+
+    @staticmethod
+    def _item_matches(item: Tuple[str, str, Optional[Pattern[str]]], path: str) -> bool:
+        pattern, _prefix, regex = item
+        if regex is None:
+            return not pattern or path == pattern or path.startswith(pattern + "/")
+        # like git, patterns match leading directories as well
+        while True:
+            if regex.match(path):
+                return True
+            path = path.rpartition("/")[0]
+            if not path:
+                return False
+        # END for each leading directory
+
+    def matches(self, path: str) -> bool:
+        """:return: True if the given path is matched by the pathspecs"""
+        if self._include and not any(self._item_matches(i, path) for i in self._include):
+            return False
+        return not any(self._item_matches(i, path) for i in self._exclude)
+
+    def matches_below(self, path: str) -> bool:
+        """:return: True if the given directory path, or any path below it, may be matched
+        by the pathspecs. If False, the directory doesn't need to be read"""
+        if not path:
+            return True
+        if any(self._item_matches(i, path) for i in self._exclude):
+            return False
+        if not self._include:
+            return True
+        dir_path = path + "/"
+        for item in self._include:
+            pattern, prefix, regex = item
+            if regex is None:
+                if not pattern or dir_path.startswith(pattern + "/") or pattern.startswith(dir_path):
+                    return True
+            elif path.startswith(prefix) or prefix.startswith(dir_path):
+                return True
+        # END for each include
+        return False
+
+
 @runtime_checkable
 class Traversable(Protocol):
 
@@ -371,6 +516,14 @@ class Traversable(Protocol):
         """
         raise NotImplementedError("To be implemented in subclass")
 
+    @classmethod
+    def _get_visited_key(cls, item: Any) -> Any:
+        """
+        Returns:
+            Key under which the given item is remembered as visited during traversals.
+            Subclasses may return a more compact key identifying the item"""
+        return item
+
     @abstractmethod
     def list_traverse(self, *args: Any, **kwargs: Any) -> Any:
         """ """
@@ -499,11 +652,11 @@ class Traversable(Protocol):
         while stack:
             d, item, src = stack.pop()  # depth of item, item, item_source
 
-            if visit_once and item in visited:
-                continue
-
             if visit_once:
-                visited.add(item)
+                key = self._get_visited_key(item)
+                if key in visited:
+                    continue
+                visited.add(key)
 
             rval: Union[TraversedTup, "Traversable", "Blob"]
             if as_edge:  # if as_edge return (src, item) unless rrc is None (e.g. for first item)
@@ -4,10 +4,12 @@
 # This module is part of GitPython and is released under
 # the BSD License: https://opensource.org/license/bsd-3-clause/
 from __future__ import annotations
+from array import array
 import logging
 import os
 import re
 import shlex
+from subprocess import PIPE
 import warnings
 
 from pathlib import Path
@@ -23,7 +25,7 @@ from git.compat import (
     is_win,
 )
 from git.config import GitConfigParser
-from git.db import GitCmdObjectDB
+from git.db import CommitCache, GitCmdObjectDB, TreeCache
 from git.exc import (
     GitCommandError,
     InvalidGitRepositoryError,
@@ -31,6 +33,7 @@ from git.exc import (
 )
 from git.index import IndexFile
 from git.objects import Submodule, RootModule, Commit
+from git.objects.util import utctz_to_altz
 from git.refs import HEAD, Head, Reference, TagReference
 from git.remote import Remote, add_progress, to_progress_instance
 from git.util import (
@@ -44,12 +47,14 @@ from git.util import (
 import os.path as osp
 
 from .fun import (
+    map_commits,
     rev_parse,
     is_git_dir,
     find_submodule_git_dir,
     touch,
     find_worktree_git_dir,
 )
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import gc
 import gitdb
 
@@ -69,6 +74,7 @@ from typing import (
     BinaryIO,
     Callable,
     Dict,
+    Iterable,
     Iterator,
     List,
     Mapping,
@@ -86,7 +92,9 @@ from typing import (
 from git.types import ConfigLevels_Tup, TypedDict
 
 if TYPE_CHECKING:
+    from weakref import WeakValueDictionary
     from git.util import IterableList
+    from git.objects import Object
     from git.refs.symbolic import SymbolicReference
     from git.objects import Tree
     from git.objects.submodule.base import UpdateProgress
@@ -106,6 +114,73 @@ class BlameEntry(NamedTuple):
     orig_linenos: range
 
 
+class HistoryColumns(object):
+    """Commit data of a history, stored column by column in compact arrays rather than
+    in one object per commit, as returned by ``Repo.history_columns``.
+
+    Columns are ``array.array`` instances, except for 'binsha' which is a bytearray holding
+    20 bytes per commit. Authors and committers are dictionary-encoded: their columns hold
+    indices into ``actors``. All columns support the buffer protocol, and ``to_numpy()``
+    wraps them into numpy arrays without copying."""
+
+    __slots__ = ("columns", "actors", "_actor_ids")
+
+    # field name -> array typecode, in the order of the git-log format we parse
+    field_types = {
+        "binsha": "B",
+        "parent_count": "I",
+        "author": "I",
+        "authored_date": "q",
+        "author_tz_offset": "i",
+        "committer": "I",
+        "committed_date": "q",
+        "committer_tz_offset": "i",
+        "insertions": "q",
+        "deletions": "q",
+    }
+    # insertions and deletions are expensive, as they require diffing each commit
+    default_fields = tuple(f for f in field_types if f not in ("insertions", "deletions"))
+
+    def __init__(self, fields: Sequence[str]) -> None:
+        for field in fields:
+            if field not in self.field_types:
+                raise ValueError("Unknown field %r, must be one of %s" % (field, ", ".join(self.field_types)))
+        # END for each field
+        self.columns: Dict[str, Union[array, bytearray]] = {
+            f: bytearray() if f == "binsha" else array(t) for f, t in self.field_types.items() if f in fields
+        }
+        self.actors: List[Actor] = []
+        self._actor_ids: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        for name, column in self.columns.items():
+            return len(column) // 20 if name == "binsha" else len(column)
+        return 0
+
+    def __getitem__(self, field: str) -> Union[array, bytearray]:
+        return self.columns[field]
+
+    def _actor_id(self, name: str, email: str) -> int:
+        key = (name, email)
+        actor_id = self._actor_ids.get(key)
+        if actor_id is None:
+            actor_id = self._actor_ids[key] = len(self.actors)
+            self.actors.append(Actor._intern(name, email))
+        return actor_id
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """:return: dict mapping field names to numpy arrays sharing memory with our columns.
+            'binsha' is returned as array of 20 byte strings.
+        :raise ImportError: if numpy is not installed
+        :note: our columns cannot grow while the returned arrays are alive"""
+        import numpy
+
+        return {
+            name: numpy.frombuffer(column, dtype="S20" if name == "binsha" else column.typecode)  # type: ignore
+            for name, column in self.columns.items()
+        }
+
+
 class Repo(object):
     """Represents a git repository and allows you to query references,
     gather commit information, generate diffs, create and clone repositories query
@@ -129,6 +204,14 @@ class Repo(object):
     git_dir: PathLike
     _common_dir: PathLike = ""
 
+    # if set, parsed commits are cached persistently, see CommitCache.for_repo()
+    commit_cache: Optional[CommitCache] = None
+
+    # if set to a WeakValueDictionary, commits, tags, trees and blobs are shared by all lookups
+    # of the same object for as long as they are referenced anywhere, see Object._interned().
+    # Modifying a shared object affects all of its holders, see Tree.cache
+    identity_map: Optional[WeakValueDictionary[Any, Object]] = None
+
     # precompiled regex
     re_whitespace = re.compile(r"\s+")
     re_hexsha_only = re.compile("^[0-9A-Fa-f]{40}$")
@@ -308,6 +391,8 @@ class Repo(object):
             pass
 
     def close(self) -> None:
+        if self.commit_cache is not None:
+            self.commit_cache.close()
         if self.git:
             self.git.clear_cache()
             # Tempfiles objects on Windows are holding references to
@@ -365,6 +450,16 @@ class Repo(object):
         """:return: True if the repository is bare"""
         return self._bare
 
+    @property
+    def tree_cache(self) -> Optional[TreeCache]:
+        """:return: TreeCache keeping parsed trees of our object database in memory, or None.
+        Set it to a TreeCache to enable caching"""
+        return getattr(self.odb, "tree_cache", None)
+
+    @tree_cache.setter
+    def tree_cache(self, cache: Optional[TreeCache]) -> None:
+        self.odb.tree_cache = cache
+
     @property
     def heads(self) -> "IterableList[Head]":
         """A list of ``Head`` objects representing the branch heads in
@@ -664,6 +759,258 @@ class Repo(object):
 
         return Commit.iter_items(self, rev, paths, **kwargs)
 
+    def iter_commits_page(
+        self,
+        rev: Union[str, Commit, "SymbolicReference", None] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        paths: Union[PathLike, Sequence[PathLike]] = "",
+        **kwargs: Any,
+    ) -> Tuple[List[Commit], Optional[str]]:
+        """Read one page of the history of a given ref/commit, as ``iter_commits`` would yield it.
+
+        Instead of skipping all commits of previous pages, as ``iter_commits(skip=N)`` does,
+        the walk resumes at its frontier, the commits whose children were shown already but
+        which weren't shown themselves. Each page therefore costs the same, no matter how deep it is.
+
+        Example::
+
+            commits, cursor = repo.iter_commits_page("master")
+            while cursor is not None:
+                commits, cursor = repo.iter_commits_page("master", cursor)
+
+        :param rev: revision specifier, see git-rev-parse for viable options.
+            If None, the active branch will be used. Excluded revisions, like in 'A..B', are honored.
+        :param cursor: opaque string returned along with the previous page, or None for the first page.
+            It must be used with the same rev, paths and kwargs only.
+        :param limit: maximum amount of commits on the page
+        :param paths: optional path or list of paths; if set only commits that include the path
+            or paths will be returned
+        :param kwargs: Additional arguments to git-rev-list, like ``first_parent`` or ``since``.
+            Ordering options requiring the whole history to be walked, like ``topo_order``, are not supported.
+        :return: tuple(commits, cursor) with cursor being None once the end of the history was
+            reached. The last page may be empty if the history ends with a full page
+        :note: Pages match ``iter_commits`` as long as no commit is dated before any of its parents.
+            Otherwise, commits shown on a previous page may be shown again."""
+        if rev is None:
+            rev = self.head.commit
+        revs = self.git.rev_parse(str(rev)).splitlines()
+        if cursor is not None:
+            # keep the excluded revisions, but start walking at the frontier
+            revs = cursor.split(".") + [r for r in revs if r.startswith("^")]
+        # END handle cursor
+
+        args: List[Union[str, PathLike]] = []
+        if paths:
+            args.append("--")
+            args.extend([paths] if isinstance(paths, (str, os.PathLike)) else paths)
+        # END handle paths
+        proc = self.git.rev_list(
+            args, stdin=True, parents=True, max_count=limit, as_process=True, istream=PIPE, **kwargs
+        )
+        proc.stdin.write(("\n".join(revs) + "\n").encode("ascii"))
+        proc.stdin.close()
+        records = [line.decode("ascii").split() for line in proc.stdout]
+        finalize_process(proc)
+
+        # dicts keep the frontier in the order git would walk it
+        frontier = dict.fromkeys(r for r in revs if not r.startswith("^"))
+        shown = set()
+        num_parents = 1 if kwargs.get("first_parent") else None
+        for record in records:
+            shown.add(record[0])
+            frontier.pop(record[0], None)
+            frontier.update((p, None) for p in record[1:][:num_parents] if p not in shown)
+        # END for each commit on the page
+
+        commits = [Commit._interned(self, hex_to_bin(record[0])) for record in records]
+        if len(records) < limit or not frontier:
+            return commits, None
+        return commits, ".".join(frontier)
+
+    def history_columns(
+        self,
+        rev: Union[str, Commit, "SymbolicReference", None] = None,
+        fields: Optional[Sequence[str]] = None,
+        paths: Union[PathLike, Sequence[PathLike]] = "",
+        **kwargs: Any,
+    ) -> HistoryColumns:
+        """Read commit data of the given history directly into columns, for analytics.
+
+        The output of a single git-log invocation is parsed as it streams in, without creating
+        Commit objects.
+
+        :param rev: revision specifier, see git-rev-parse for viable options.
+            If None, the active branch will be used.
+        :param fields:
+            names of the columns to read, see ``HistoryColumns.field_types``. Defaults to all
+            fields but 'insertions' and 'deletions', which are the sum of changed lines over all
+            files compared to the first parent, like ``Commit.stats`` computes them. They are
+            zero for binary files. With git older than 2.31, which can't show merges that way,
+            the stats of merge commits are read by an additional git-diff-tree invocation.
+        :param paths: see ``iter_commits``
+        :param kwargs: Arguments to be passed to git-log, like max_count or since.
+            They must not alter the output format.
+        :return: ``HistoryColumns`` with one row per commit, in the order of ``iter_commits``"""
+        if rev is None:
+            rev = self.head.commit
+        result = HistoryColumns(fields or HistoryColumns.default_fields)
+        columns = result.columns
+        with_stats = "insertions" in columns or "deletions" in columns
+        # hexshas of merge commits to their row and first parent, if git-log can't show their stats
+        merges: Optional[Dict[bytes, Tuple[int, bytes]]] = None
+
+        args: List[Any] = [rev, "--date=raw", "--format=%x1e%H%x00%P%x00%an%x00%ae%x00%ad%x00%cn%x00%ce%x00%cd"]
+        if with_stats:
+            args.extend(["--numstat", "--no-renames"])
+            if self.git.version_info[:2] >= (2, 31):
+                args.append("--diff-merges=first-parent")
+            else:
+                merges = {}
+        # END handle stats
+        args.append("--")
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths] if paths else []
+        args.extend(paths)
+
+        # resolve columns once, as lookups per commit are what we want to avoid
+        binshas, parent_counts = columns.get("binsha"), columns.get("parent_count")
+        authors, authored_dates, author_tzs = (
+            columns.get("author"),
+            columns.get("authored_date"),
+            columns.get("author_tz_offset"),
+        )
+        committers, committed_dates, committer_tzs = (
+            columns.get("committer"),
+            columns.get("committed_date"),
+            columns.get("committer_tz_offset"),
+        )
+        insertions, deletions = columns.get("insertions"), columns.get("deletions")
+
+        def add_numstat(line: bytes, row: int) -> None:
+            # numstat lines look like '<insertions>\t<deletions>\t<path>', with '-' for binary files
+            added, removed, _path = line.split(b"\t", 2)
+            if insertions is not None and added != b"-":
+                insertions[row] += int(added)
+            if deletions is not None and removed != b"-":
+                deletions[row] += int(removed)
+
+        proc = self.git.log(*args, as_process=True, **kwargs)
+        for line in proc.stdout:
+            if line[:1] == b"\x1e":
+                hexsha, parents, aname, aemail, adate, cname, cemail, cdate = line[1:].rstrip(b"\n").split(b"\0")
+                if merges is not None and b" " in parents:
+                    merges[hexsha] = (len(result), parents.split(b" ", 1)[0])
+                if binshas is not None:
+                    binshas += hex_to_bin(hexsha)
+                if parent_counts is not None:
+                    parent_counts.append(parents.count(b" ") + 1 if parents else 0)
+                if authors is not None:
+                    authors.append(result._actor_id(aname.decode(defenc, "replace"), aemail.decode(defenc, "replace")))
+                if authored_dates is not None or author_tzs is not None:
+                    seconds, tz = adate.split()
+                    if authored_dates is not None:
+                        authored_dates.append(int(seconds))
+                    if author_tzs is not None:
+                        author_tzs.append(utctz_to_altz(tz.decode("ascii")))
+                if committers is not None:
+                    committers.append(
+                        result._actor_id(cname.decode(defenc, "replace"), cemail.decode(defenc, "replace"))
+                    )
+                if committed_dates is not None or committer_tzs is not None:
+                    seconds, tz = cdate.split()
+                    if committed_dates is not None:
+                        committed_dates.append(int(seconds))
+                    if committer_tzs is not None:
+                        committer_tzs.append(utctz_to_altz(tz.decode("ascii")))
+                if insertions is not None:
+                    insertions.append(0)
+                if deletions is not None:
+                    deletions.append(0)
+            elif with_stats and line.strip():
+                add_numstat(line, -1)
+            # END handle line type
+        # END for each line
+        finalize_process(proc)
+
+        if merges:
+            # git-log shows no diff for merges, compare each of them to its first parent instead
+            proc = self.git.diff_tree(
+                "--stdin", "--numstat", "-r", "--no-renames", "--", *paths, as_process=True, istream=PIPE
+            )
+            stdout, _stderr = proc.communicate(
+                b"".join(b"%s %s\n" % (hexsha, merge[1]) for hexsha, merge in merges.items())
+            )
+            finalize_process(proc)
+            row = -1
+            for line in stdout.splitlines():
+                if b"\t" in line:
+                    add_numstat(line, row)
+                elif line.strip():
+                    # the diff of each commit is preceded by its hexsha
+                    row = merges[line.strip()][0]
+            # END for each line
+        # END handle merges
+        return result
+
+    def parallel_map_commits(
+        self,
+        rev: Union[str, Commit, "SymbolicReference", None],
+        fn: Callable[[Commit], Any],
+        workers: Optional[int] = None,
+        ordered: bool = True,
+        chunk_size: Optional[int] = None,
+        paths: Union[PathLike, Sequence[PathLike]] = "",
+        **kwargs: Any,
+    ) -> Iterator[Any]:
+        """Apply fn to each commit of the given history, using a pool of worker processes.
+
+        Pure python work per commit, like parsing messages or computing stats, doesn't scale
+        with threads. Instead, the hexshas of the history are obtained once and split into
+        disjoint chunks of consecutive commits, which are handed to worker processes. Each of
+        these opens its own Repo for the chunk and closes it afterwards, only hexshas and results
+        travel between processes.
+
+        :param rev: revision specifier, see git-rev-parse for viable options.
+            If None, the active branch will be used.
+        :param fn:
+            Callable receiving a Commit and returning a picklable result. As it is sent to the
+            worker processes, it must be picklable itself, i.e. a function defined at module level.
+        :param workers: amount of worker processes, defaults to the number of CPUs
+        :param ordered:
+            If True, results are returned in the order of ``iter_commits``. Otherwise the results
+            of each chunk are returned as soon as it is done, which keeps all workers busy even
+            if the caller consumes results slowly.
+        :param chunk_size: amount of commits per chunk, defaults to spreading the history
+            over four chunks per worker
+        :param paths: see ``iter_commits``
+        :param kwargs: Arguments to be passed to git-rev-list, see ``iter_commits``
+        :return: iterator yielding the results of fn"""
+        if rev is None:
+            rev = self.head.commit
+        hexshas = [c.hexsha for c in Commit.iter_items(self, rev, paths, **kwargs)]
+        if not hexshas:
+            return
+
+        workers = workers or os.cpu_count() or 1
+        chunk_size = chunk_size or -(-len(hexshas) // (workers * 4))
+        chunks = [hexshas[i : i + chunk_size] for i in range(0, len(hexshas), chunk_size)]
+        args = (type(self), self.working_dir, type(self.odb), self.git.environment())
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = []
+        try:
+            futures = [executor.submit(map_commits, *args, chunk, fn) for chunk in chunks]
+            for future in futures if ordered else as_completed(futures):
+                yield from future.result()
+            # END for each chunk
+        finally:
+            # don't wait for chunks nobody is interested in anymore
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+        # END assure workers are stopped
+
     def merge_base(self, *rev: TBD, **kwargs: Any) -> List[Union[Commit_ish, None]]:
         """Find the closest common ancestor for the given revision (e.g. Commits, Tags, References, etc)
 
@@ -710,6 +1057,102 @@ class Repo(object):
             raise
         return True
 
+    def _to_hexshas(self, commits: Iterable[Union[str, Commit_ish]]) -> List[str]:
+        """:return: list of full hexshas of the commits behind the given revisions, in input order"""
+        hexshas = []
+        for c in commits:
+            if isinstance(c, Commit):
+                hexshas.append(c.hexsha)
+            elif isinstance(c, str) and self.re_hexsha_only.match(c):
+                hexshas.append(c.lower())
+            else:
+                hexshas.append(self.commit(c).hexsha)
+        # END for each commit
+        return hexshas
+
+    def name_rev_many(self, commits: Iterable[Union[str, Commit_ish]], **kwargs: Any) -> List[Optional[str]]:
+        """Name many commits in terms of the closest reference, as ``Commit.name_rev`` does for one.
+
+        All commits are streamed through a single git-name-rev process, instead of spawning
+        one process per commit.
+
+        :param commits: Commits or revision specifiers of the commits to name
+        :param kwargs: Additional arguments passed to git-name-rev, like ``tags=True`` or ``refs='v*'``
+        :return:
+            list of names, like 'master~2' or 'tags/v1.0', in the order of the given commits.
+            An entry is None if the respective commit cannot be named."""
+        hexshas = self._to_hexshas(commits)
+        if not hexshas:
+            return []
+        # --stdin is deprecated in favor of --annotate-stdin since git 2.35
+        stdin_flag = "--annotate-stdin" if self.git.version_info[:2] >= (2, 35) else "--stdin"
+        proc = self.git.name_rev(stdin_flag, as_process=True, istream=PIPE, **kwargs)
+        stdout, _stderr = proc.communicate(("\n".join(hexshas) + "\n").encode("ascii"))
+        finalize_process(proc)
+
+        # Each input line is echoed, followed by ' (<name>)' if the commit could be named.
+        # With name_only, the hexsha is replaced by the name instead.
+        names: List[Optional[str]] = []
+        for hexsha, line in zip(hexshas, stdout.decode(defenc).splitlines()):
+            if line == hexsha:
+                names.append(None)
+            elif line.startswith(hexsha):
+                names.append(line[len(hexsha) :].strip()[1:-1])
+            else:
+                names.append(line)
+        # END for each line
+        return names
+
+    def describe_many(self, commits: Iterable[Union[str, Commit_ish]]) -> List[Optional[Tuple[str, int]]]:
+        """Find the nearest tag for many commits at once, similar to ``git describe --tags``.
+
+        A map of tagged commits is obtained once, and the history of all given commits is walked
+        a single time in topological order, propagating the nearest tag from parents to children.
+        Unlike git-describe, which counts all commits reachable from the commit but not from the
+        tag, the distance is the length of the shortest parent chain leading to the tag. Both are
+        the same unless merges are involved.
+
+        :param commits: Commits or revision specifiers of the commits to describe
+        :return:
+            list of (tag_name, distance) tuples in the order of the given commits, where distance
+            is 0 if the commit is tagged itself. An entry is None if no tag can be reached.
+            If multiple tags point to the same commit, the first one in refname order is used."""
+        hexshas = self._to_hexshas(commits)
+        if not hexshas:
+            return []
+
+        tags: Dict[str, str] = {}
+        refs = self.git.for_each_ref("refs/tags", format="%(objectname) %(*objectname) %(refname:strip=2)")
+        for line in refs.splitlines():
+            objectname, peeled, name = line.split(" ", 2)
+            tags.setdefault(peeled or objectname, name)
+        # END for each tag
+
+        nearest: Dict[str, Tuple[str, int]] = {}
+        # parents are listed before their children, hence they are final once we see the child
+        # rev-list reads all revisions from stdin before it starts walking
+        proc = self.git.rev_list(stdin=True, parents=True, topo_order=True, reverse=True, as_process=True, istream=PIPE)
+        proc.stdin.write(("\n".join(set(hexshas)) + "\n").encode("ascii"))
+        proc.stdin.close()
+        for line in proc.stdout:
+            hexsha, *parents = line.decode("ascii").split()
+            tag = tags.get(hexsha)
+            if tag is not None:
+                nearest[hexsha] = (tag, 0)
+                continue
+            best: Optional[Tuple[str, int]] = None
+            for parent in parents:
+                candidate = nearest.get(parent)
+                if candidate is not None and (best is None or candidate[1] < best[1]):
+                    best = candidate
+            # END for each parent
+            if best is not None:
+                nearest[hexsha] = (best[0], best[1] + 1)
+        # END for each commit
+        finalize_process(proc)
+
+        return [nearest.get(hexsha) for hexsha in hexshas]
+
     def is_valid_object(self, sha: str, object_type: Union[str, None] = None) -> bool:
         try:
             complete_sha = self.odb.partial_to_complete_sha_hex(sha)
@@ -948,12 +1391,12 @@ class Repo(object):
                 c = Commit(
                     self,
                     hex_to_bin(hexsha),
-                    author=Actor(
+                    author=Actor._intern(
                         safe_decode(props[b"author"]),
                         safe_decode(props[b"author-mail"].lstrip(b"<").rstrip(b">")),
                     ),
                     authored_date=int(props[b"author-time"]),
-                    committer=Actor(
+                    committer=Actor._intern(
                         safe_decode(props[b"committer"]),
                         safe_decode(props[b"committer-mail"].lstrip(b"<").rstrip(b">")),
                     ),
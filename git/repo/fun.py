@@ -19,7 +19,7 @@ from git.cmd import Git
 
 # Typing ----------------------------------------------------------------------
 
-from typing import Union, Optional, cast, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Type, Union, Optional, cast, TYPE_CHECKING
 from git.types import Commit_ish
 
 if TYPE_CHECKING:
@@ -42,6 +42,7 @@ __all__ = (
     "deref_tag",
     "to_commit",
     "find_worktree_git_dir",
+    "map_commits",
 )
 
 
@@ -209,6 +210,31 @@ def to_commit(obj: Object) -> Union["Commit", "TagObject"]:
     return obj
 
 
+def map_commits(
+    repo_type: Type["Repo"],
+    path: "PathLike",
+    odbt: Type["GitCmdObjectDB"],
+    environment: Dict[str, str],
+    hexshas: List[str],
+    fn: Callable[["Commit"], Any],
+) -> List[Any]:
+    """Apply fn to each of the given commits, using a repository opened just for this call.
+
+    This is the unit of work of ``Repo.parallel_map_commits`` and runs in worker processes,
+    which is why it only receives picklable information about the repository. The repository
+    is closed once done, to not leave persistent git processes behind in the worker.
+
+    :return: list of results of fn, in the order of the given hexshas"""
+    from git.objects import Commit
+
+    repo = repo_type(path, odbt=odbt)
+    try:
+        repo.git.update_environment(**environment)
+        return [fn(Commit(repo, hex_to_bin(hexsha))) for hexsha in hexshas]
+    finally:
+        repo.close()
+
+
 def rev_parse(repo: "Repo", rev: str) -> Union["Commit", "Tag", "Tree", "Blob"]:
     """
     :return: Object at the given revision, either Commit, Tag, Tree or Blob
@@ -21,6 +21,7 @@ from sys import maxsize
 import time
 from urllib.parse import urlsplit, urlunsplit
 import warnings
+from weakref import WeakValueDictionary
 
 # from git.objects.util import Traversable
 
@@ -718,12 +719,34 @@ class Actor(object):
     conf_name = "name"
     conf_email = "email"
 
-    __slots__ = ("name", "email")
+    __slots__ = ("name", "email", "_frozen", "__weakref__")
+
+    # Actors parsed from git data are interned, as repositories have far fewer people than
+    # commits, blame lines or reflog entries referring to them. Holding weak references only,
+    # these tables never keep actors alive. Interned actors are shared and thus immutable.
+    _interned: "WeakValueDictionary[Tuple[type, Optional[str], Optional[str]], Actor]" = WeakValueDictionary()
+    _interned_strings: "WeakValueDictionary[Tuple[type, str], Actor]" = WeakValueDictionary()
 
     def __init__(self, name: Optional[str], email: Optional[str]) -> None:
         self.name = name
         self.email = email
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError(
+                "Cannot set %r of %r, which is shared by everyone parsing it - copy it instead" % (name, self)
+            )
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError("Cannot delete %r of %r, which is shared by everyone parsing it" % (name, self))
+        object.__delattr__(self, name)
+
+    def __reduce__(self) -> Tuple[type, Tuple[Optional[str], Optional[str]]]:
+        # copies and unpickled actors are not shared, and can be modified
+        return (type(self), (self.name, self.email))
+
     def __eq__(self, other: Any) -> bool:
         return self.name == other.name and self.email == other.email
 
@@ -739,6 +762,16 @@ class Actor(object):
     def __repr__(self) -> str:
         return '<git.Actor "%s <%s>">' % (self.name, self.email)
 
+    @classmethod
+    def _intern(cls, name: Optional[str], email: Optional[str]) -> "Actor":
+        """:return: the Actor shared by everyone referring to the given identity, see ``_interned``"""
+        key = (cls, name, email)
+        actor = cls._interned.get(key)
+        if actor is None:
+            actor = cls._interned[key] = cls(name, email)
+            actor._frozen = True
+        return actor
+
     @classmethod
     def _from_string(cls, string: str) -> "Actor":
         """Create an Actor from a string.
@@ -746,19 +779,27 @@ class Actor(object):
 
                 John Doe <jdoe@example.com>
 
-        :return: Actor"""
+        :return: Actor, which is shared with everyone parsing the same identity and can't be modified"""
+        key = (cls, string)
+        actor = cls._interned_strings.get(key)
+        if actor is not None:
+            return actor
+
         m = cls.name_email_regex.search(string)
         if m:
             name, email = m.groups()
-            return Actor(name, email)
+            actor = cls._intern(name, email)
         else:
             m = cls.name_only_regex.search(string)
             if m:
-                return Actor(m.group(1), None)
-            # assume best and use the whole string as name
-            return Actor(string, None)
+                actor = cls._intern(m.group(1), None)
+            else:
+                # assume best and use the whole string as name
+                actor = cls._intern(string, None)
             # END special case name
         # END handle name/email matching
+        cls._interned_strings[key] = actor
+        return actor
 
     @classmethod
     def _main_actor(
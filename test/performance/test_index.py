@@ -0,0 +1,39 @@
+"""Performance tests for reading and writing index files"""
+from io import BytesIO
+import sys
+from time import time
+
+from git.index.fun import read_cache, write_cache
+from git.index.typ import IndexEntry
+from test.lib import TestBase
+
+
+class TestIndexPerformance(TestBase):
+    def _make_entries(self, count):
+        paths = sorted("src/module%i/package%i/file%i.py" % (i % 97, i % 13, i) for i in range(count))
+        return [
+            IndexEntry((0o100644, b"\1" * 20, 0, path, b"\0" * 8, b"\0" * 8, 1, i, 0, 0, i))
+            for i, path in enumerate(paths)
+        ]
+
+    def test_read_write_versions(self):
+        entries = self._make_entries(100000)
+        for version in (2, 4):
+            stream = BytesIO()
+            st = time()
+            write_cache(entries, stream, version=version)
+            write_elapsed = time() - st
+            data = stream.getvalue()
+
+            st = time()
+            read_version, read_entries, _extension_data, _sha = read_cache(BytesIO(data))
+            read_elapsed = time() - st
+            assert read_version == version
+            assert len(read_entries) == len(entries)
+
+            print(
+                "Index version %i: %i entries in %i bytes, written in %f s, keys read in %f s"
+                % (version, len(entries), len(data), write_elapsed, read_elapsed),
+                file=sys.stderr,
+            )
+        # END for each version
@@ -4,8 +4,13 @@
 # This module is part of GitPython and is released under
 # the BSD License: https://opensource.org/license/bsd-3-clause/
 
+import copy
+import gc
+import pickle
+
 from test.lib import TestBase
 from git import Actor
+from git.objects.util import from_timestamp
 
 
 class TestActor(TestBase):
@@ -34,3 +39,37 @@ class TestActor(TestBase):
     def test_str_should_alias_name(self):
         a = Actor._from_string("Michael Trier <mtrier@example.com>")
         self.assertEqual(a.name, str(a))
+
+    def test_interning(self):
+        a = Actor._from_string("Jane Doe <jane@example.com>")
+        assert Actor._from_string("Jane Doe <jane@example.com>") is a
+        assert Actor._intern("Jane Doe", "jane@example.com") is a
+        assert Actor._from_string("Jane Doe") is not a
+        assert pickle.loads(pickle.dumps(a)) == a
+
+        # shared actors can't be modified, but their copies can
+        self.assertRaises(AttributeError, setattr, a, "name", "John Doe")
+        self.assertRaises(AttributeError, delattr, a, "email")
+        assert Actor._from_string("Jane Doe <jane@example.com>").name == "Jane Doe"
+        b = copy.copy(a)
+        b.name = "John Doe"
+        assert a.name == "Jane Doe" and b.name == "John Doe"
+        c = pickle.loads(pickle.dumps(a))
+        c.email = "john@example.com"
+        assert a.email == "jane@example.com"
+
+        class SubActor(Actor):
+            __slots__ = ()
+
+        assert type(SubActor._from_string("Jane Doe <jane@example.com>")) is SubActor
+        assert type(Actor._from_string("Jane Doe <jane@example.com>")) is Actor
+
+        # interned actors don't stay alive without being used
+        key = (Actor, "Jane Doe", "jane@example.com")
+        assert key in Actor._interned
+        del a
+        gc.collect()
+        assert key not in Actor._interned
+
+        assert from_timestamp(1000, -7200).tzinfo is from_timestamp(2000, -7200).tzinfo
+        assert from_timestamp(1000, -7200).tzinfo is not from_timestamp(1000, 3600).tzinfo
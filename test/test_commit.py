@@ -5,6 +5,8 @@
 # This module is part of GitPython and is released under
 # the BSD License: https://opensource.org/license/bsd-3-clause/
 import copy
+import gc
+import weakref
 from datetime import datetime
 from io import BytesIO
 import re
@@ -313,6 +315,41 @@ class TestCommit(TestCommitSerialization):
         rw_repo.index.commit("initial commit")
         list(rw_repo.iter_commits(rw_repo.head.ref))  # should fail unless bug is fixed
 
+    @with_rw_directory
+    def test_traversal_memory(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        for i in range(5):
+            repo.index.commit("commit %i" % i)
+        side = repo.index.commit("side", parent_commits=[repo.commit("HEAD~2")], head=False)
+        merge = repo.index.commit("merge", parent_commits=[repo.head.commit, side])
+
+        # walked commits are not kept alive by the commit the walk started at
+        head = repo.commit(merge.hexsha)
+        refs = [weakref.ref(c) for c in head.traverse()]
+        assert len(refs) == 6
+        gc.collect()
+        assert not any(ref() for ref in refs)
+        assert {c.hexsha for c in head.traverse()} == set(repo.git.rev_list("HEAD").split()[1:])
+
+        # parents are kept as binshas until they are accessed
+        assert head._parent_binshas == merge.parents[0].binsha + side.binsha
+        assert head.parents == tuple(merge.parents)
+        assert head.parents[1] is head.parents[1]
+        assert head.replace().parents == head.parents
+
+        # assigned parents replace the ones read from the object database
+        head.parents = [side]
+        assert list(head.traverse(depth=1)) == [side]
+        assert list(head.replace().parents) == [side]
+        stream = BytesIO()
+        head.replace(parents=head.parents + [merge])._serialize(stream)
+        stream.seek(0)
+        copied = Commit(repo, Commit.NULL_BIN_SHA)
+        copied.parents = [merge]
+        copied._deserialize(stream)
+        assert copied.parents == (side, merge)
+        assert list(copied.traverse(depth=1)) == [side, merge]
+
     def test_count(self):
         self.assertEqual(self.rorepo.tag("refs/tags/0.1.5").commit.count(), 143)
 
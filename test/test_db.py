@@ -3,9 +3,15 @@
 #
 # This module is part of GitPython and is released under
 # the BSD License: https://opensource.org/license/bsd-3-clause/
-from git.db import GitCmdObjectDB
+import os
+import threading
+from unittest import mock
+
+from git.db import CommitCache, GitCmdObjectDB, TreeCache
 from git.exc import BadObject
-from test.lib import TestBase
+from git.objects.fun import traverse_tree_recursive
+from git.repo import Repo
+from test.lib import TestBase, with_rw_directory
 from git.util import bin_to_hex
 
 import os.path as osp
@@ -24,3 +30,111 @@ class TestDB(TestBase):
         # fails with BadObject
         for invalid_rev in ("0000", "bad/ref", "super bad"):
             self.assertRaises(BadObject, gdb.partial_to_complete_sha_hex, invalid_rev)
+
+    @with_rw_directory
+    def test_commit_cache(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        for i in range(5):
+            repo.index.commit("commit %i\n\nbody\n" % i)
+        attrs = ("author", "authored_date", "author_tz_offset", "committer", "committed_date", "committer_tz_offset")
+        attrs += ("encoding", "message", "size", "tree", "parents", "gpgsig")
+        expected = [{a: getattr(c, a) for a in attrs} for c in repo.iter_commits()]
+
+        repo.commit_cache = CommitCache.for_repo(repo)
+        assert len(repo.commit_cache) == 0
+        assert [{a: getattr(c, a) for a in attrs} for c in repo.iter_commits()] == expected
+        repo.close()
+
+        # closing the repository closed the database, which is opened by the next thread using it
+        counts = []
+
+        def count() -> None:
+            counts.append(len(repo.commit_cache))
+            repo.close()
+
+        thread = threading.Thread(target=count)
+        thread.start()
+        thread.join()
+        assert counts == [5]
+
+        # a fresh cache reads what was written, and commits obtained from it are complete
+        repo = Repo(repo.git_dir)
+        repo.commit_cache = CommitCache.for_repo(repo)
+        record = repo.commit_cache.get(repo.head.commit.binsha)
+        assert record is not None and record[1] == repo.head.commit.tree.binsha
+        assert repo.commit_cache.get(b"\0" * 20) is None
+        assert len(repo.commit_cache.get_many([repo.head.commit.binsha, b"\0" * 20])) == 1
+        for attr in attrs:
+            assert [getattr(c, attr) for c in repo.iter_commits()] == [e[attr] for e in expected]
+        # END for each attribute
+        assert repo.head.commit.message == "commit 4\n\nbody\n"
+
+        # the oldest entries are evicted
+        cache = CommitCache(osp.join(rw_dir, "small.sqlite"), max_entries=2)
+        for i, c in enumerate(repo.iter_commits()):
+            cache.put(c.binsha, repo.commit_cache.get(c.binsha))
+        # END for each commit
+        cache.close()
+        assert len(cache) == 2
+
+        # corrupted caches are recreated
+        with open(cache.path, "wb") as fp:
+            fp.write(b"garbage" * 1000)
+        assert len(cache) == 0
+        cache.put(c.binsha, repo.commit_cache.get(c.binsha))
+        cache.flush()
+        assert cache.get(c.binsha) == repo.commit_cache.get(c.binsha)
+        cache.close()
+
+    @with_rw_directory
+    def test_tree_cache(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        for i in range(3):
+            for name in ("a/b/file", "a/c/file", "d/file"):
+                os.makedirs(osp.join(rw_dir, "repo", osp.dirname(name)), exist_ok=True)
+                with open(osp.join(rw_dir, "repo", name), "w") as fp:
+                    fp.write(name)
+            # END for each file
+            with open(osp.join(rw_dir, "repo", "a/b/file"), "w") as fp:
+                fp.write(str(i))
+            repo.index.add(["a", "d"])
+            repo.index.commit("commit %i" % i)
+        # END for each commit
+        commits = list(repo.iter_commits())
+        expected = [[(b.path, b.binsha) for b in c.tree.traverse()] for c in commits]
+
+        assert repo.tree_cache is None
+        repo.tree_cache = TreeCache()
+        assert repo.odb.tree_cache is repo.tree_cache
+        read = []
+        stream = repo.odb.stream
+        with mock.patch.object(repo.odb, "stream", side_effect=lambda sha: read.append(sha) or stream(sha)):
+            commits = list(repo.iter_commits())
+            assert [[(b.path, b.binsha) for b in c.tree.traverse()] for c in commits] == expected
+            # root, 'a' and 'a/b' change with every commit, 'a/c' and 'd' are shared
+            assert len(read) == 3 + 3 * 3 + 2
+            assert len(repo.tree_cache) == 3 * 3 + 2
+
+            del read[:]
+            commits = list(repo.iter_commits())
+            assert [[(b.path, b.binsha) for b in c.tree.traverse()] for c in commits] == expected
+            entries = traverse_tree_recursive(repo.odb, commits[0].tree.binsha, "")
+            assert [e[2] for e in entries] == ["a/b/file", "a/c/file", "d/file"]
+            # only the commits were read again
+            assert sorted(read) == sorted(c.binsha for c in commits)
+        # END with counted reads
+
+        # trees of the cache are not altered through trees using them
+        tree = commits[0].tree
+        tree.cache.add(tree.binsha, tree.mode, "new").set_done()
+        assert "new" not in [e[2] for e in repo.tree_cache.get(tree.binsha)]
+
+        # least recently used trees are evicted
+        repo.tree_cache.max_bytes = repo.tree_cache.nbytes
+        repo.tree_cache.get(tree.binsha)
+        repo.tree_cache.put(b"\1" * 20, [], 1000)
+        assert tree.binsha in repo.tree_cache
+        assert repo.tree_cache.nbytes <= repo.tree_cache.max_bytes
+        assert len(repo.tree_cache) < 11
+        repo.tree_cache.clear()
+        assert len(repo.tree_cache) == 0 and repo.tree_cache.nbytes == 0
@@ -298,5 +298,24 @@ class TestFun(TestBase):
         self.assertTrue(statbuf.st_mode & S_IFDIR)
 
     def test_tree_entries_from_data_with_failing_name_decode_py3(self):
-        r = tree_entries_from_data(b"100644 \x9f\0aaa")
-        assert r == [(b"aaa", 33188, "\udc9f")], r
+        r = tree_entries_from_data(b"100644 \x9f\0" + b"a" * 20)
+        assert r == [(b"a" * 20, 33188, "\udc9f")], r
+
+    def test_tree_entries_from_data(self):
+        entries = [
+            (b"\1" * 20, 0o100644, "a file"),
+            (b"\2" * 20, 0o100755, "b\xfcn"),
+            (b"\3" * 20, 0o40000, "c"),
+            (b"\0" * 20, 0o120000, "d"),
+            (b"\4" * 20, 0o160000, "e"),
+        ]
+        stream = BytesIO()
+        tree_to_stream(entries, stream.write)
+        assert tree_entries_from_data(stream.getvalue()) == entries
+        # leading zeros of modes are accepted
+        assert tree_entries_from_data(b"040000 c\0" + b"\3" * 20) == [entries[2]]
+        assert tree_entries_from_data(b"") == []
+        self.assertRaises(ValueError, tree_entries_from_data, b"100644 name")
+        self.assertRaises(ValueError, tree_entries_from_data, b"100644")
+        self.assertRaises(ValueError, tree_entries_from_data, b"100644 foo\0" + b"\1" * 15)
+        self.assertRaises(ValueError, tree_entries_from_data, stream.getvalue()[:-1])
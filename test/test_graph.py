@@ -0,0 +1,80 @@
+# test_graph.py
+# Copyright (C) 2008, 2009 Michael Trier (mtrier@gmail.com) and contributors
+#
+# This module is part of GitPython and is released under
+# the BSD License: https://opensource.org/license/bsd-3-clause/
+import os.path as osp
+
+from git import CommitGraph, Repo
+from test.lib import TestBase, with_rw_directory
+
+
+class TestCommitGraph(TestBase):
+    def _make_history(self, rw_dir):
+        #   c0 - c1 - c2 - merge
+        #          \      /
+        #           side -
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        commits = {}
+        commits["c0"] = repo.index.commit("c0", commit_date="@1000000000 +0000")
+        commits["c1"] = repo.index.commit("c1", commit_date="@1000000100 +0000")
+        commits["side"] = repo.index.commit(
+            "side", parent_commits=[commits["c1"]], head=False, commit_date="@1000000300 +0000"
+        )
+        commits["c2"] = repo.index.commit("c2", commit_date="@1000000200 +0000")
+        commits["merge"] = repo.index.commit(
+            "merge", parent_commits=[commits["c2"], commits["side"]], commit_date="@1000000400 +0000"
+        )
+        return repo, {name: c.hexsha for name, c in commits.items()}
+
+    @with_rw_directory
+    def test_queries(self, rw_dir):
+        repo, c = self._make_history(rw_dir)
+        graph = CommitGraph(repo)
+        assert len(graph) == 5
+        assert c["c0"] in graph
+        assert repo.commit(c["c0"]) in graph
+        assert repo.commit(c["c0"]).binsha in graph
+        assert "f" * 40 not in graph
+        assert set(graph) == set(c.values())
+
+        assert graph.parents(c["merge"]) == [c["c2"], c["side"]]
+        assert graph.parents(c["c0"]) == []
+        assert sorted(graph.children(c["c1"])) == sorted([c["c2"], c["side"]])
+        assert graph.committed_date(c["c1"]) == 1000000100
+
+        assert graph.ancestors(c["c2"]) == {c["c1"], c["c0"]}
+        assert graph.ancestors(c["c2"], include_self=True) == {c["c2"], c["c1"], c["c0"]}
+        assert graph.descendants(c["c1"]) == {c["c2"], c["side"], c["merge"]}
+        assert graph.first_parent_chain(c["merge"]) == [c["merge"], c["c2"], c["c1"], c["c0"]]
+
+        assert graph.is_ancestor(c["side"], c["merge"])
+        assert graph.is_ancestor(c["c0"], c["c0"])
+        assert not graph.is_ancestor(c["side"], c["c2"])
+        assert not graph.is_ancestor(c["merge"], c["c0"])
+        self.assertRaises(KeyError, graph.parents, "f" * 40)
+
+        for order in (graph.topo_order(), graph.date_order()):
+            assert order[0] == c["merge"] and order[-1] == c["c0"]
+            assert order.index(c["side"]) < order.index(c["c1"])
+            assert order.index(c["c2"]) < order.index(c["c1"])
+        # END for each order
+        assert graph.date_order() == repo.git.rev_list("HEAD", date_order=True).split()
+        assert graph.topo_order(reverse=True)[0] == c["c0"]
+        assert graph.date_order(reverse=True) == [c["c0"], c["c1"], c["c2"], c["side"], c["merge"]]
+
+    @with_rw_directory
+    def test_range_and_refresh(self, rw_dir):
+        repo, c = self._make_history(rw_dir)
+        graph = CommitGraph(repo, "%s..HEAD" % c["c1"])
+        assert set(graph) == {c["c2"], c["side"], c["merge"]}
+        assert graph.parents(c["c2"]) == []
+
+        graph = CommitGraph(repo, "HEAD")
+        assert graph.refresh() == 0
+        new = repo.index.commit("new")
+        assert graph.refresh() == 1
+        assert len(graph) == 6
+        assert graph.parents(new) == [c["merge"]]
+        assert graph.children(c["merge"]) == [new.hexsha]
+        assert graph.topo_order()[0] == new.hexsha
@@ -9,7 +9,8 @@ from io import BytesIO
 import os
 from stat import S_ISLNK, ST_MODE
 import tempfile
-from unittest import skipIf
+import time
+from unittest import mock, skipIf
 import shutil
 
 from git import (
@@ -25,14 +26,23 @@ from git import (
 )
 from git.compat import is_win
 from git.exc import HookExecutionError, InvalidGitRepositoryError
-from git.index.fun import hook_path
-from git.index.typ import BaseIndexEntry, IndexEntry
+from git.index.fun import hook_path, read_cache, read_header
+from git.index import status as status_module
+from git.index.typ import (
+    CE_EXTENDED_FLAGS,
+    BaseIndexEntry,
+    IndexEntry,
+    LazyIndexEntries,
+    PackedIndexEntries,
+    StatusEntry,
+)
 from git.objects import Blob
 from test.lib import TestBase, fixture_path, fixture, with_rw_repo
 from test.lib import with_rw_directory
 from git.util import Actor, rmtree
 from git.util import HIDE_WINDOWS_KNOWN_ERRORS, hex_to_bin
 from gitdb.base import IStream
+from gitdb.db import MemoryDB
 
 import os.path as osp
 from git.cmd import Git
@@ -137,6 +147,435 @@ class TestIndex(TestBase):
             self.assertEqual(fp.read(), fixture("index_merge"))
         os.remove(tmpfile)
 
+    def test_read_cache_lazy(self):
+        index_path = fixture_path("index_merge")
+        with open(index_path, "rb") as stream:
+            eager = dict(read_cache(stream, compact=True)[1].items())
+
+        with mock.patch.object(IndexEntry, "from_buffer", side_effect=IndexEntry.from_buffer) as from_buffer:
+            entries = IndexFile(self.rorepo, index_path).entries
+            assert isinstance(entries, LazyIndexEntries)
+            keys = list(entries)
+            assert keys == list(eager) and len(entries) == len(eager)
+
+            # looking up a single entry doesn't unpack the others
+            assert keys[0] in entries and from_buffer.call_count == 0
+            entry = entries[keys[0]]
+            assert entries[keys[0]] is entry and from_buffer.call_count == 1
+
+            # all other entries are unpacked once, on access
+            assert dict(entries.items()) == eager
+            assert list(entries.values()) == list(entries.values())
+            assert from_buffer.call_count == len(entries)
+        # END count unpacked entries
+
+        listing = self.rorepo.git.ls_files(stage=True, z=True, env={"GIT_INDEX_FILE": index_path})
+        expected = [line for line in listing.split("\0") if line]
+        actual = ["%06o %s %i\t%s" % (e.mode, e.hexsha, e.stage, e.path) for e in entries.values()]
+        assert actual == expected
+
+        del entries[keys[1]]
+        assert keys[1] not in entries and len(entries) == len(eager) - 1
+        assert list(entries) == keys[:1] + keys[2:]
+        self.assertRaises(KeyError, entries.__getitem__, keys[1])
+
+    @with_rw_directory
+    def test_write_tree_cache_tree(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        paths = ["top"] + ["dir%i/sub/file%i" % (i, j) for i in range(5) for j in range(3)]
+        for path in paths:
+            os.makedirs(osp.dirname(osp.join(repo.working_tree_dir, path)) or repo.working_tree_dir, exist_ok=True)
+            with open(osp.join(repo.working_tree_dir, path), "w") as fp:
+                fp.write(path)
+        # END for each path
+        repo.git.add(paths)
+        repo.git.write_tree()  # creates the TREE extension
+
+        index = IndexFile(repo)
+        assert index.entries.cache_tree.valid
+        assert len(index.entries.cache_tree.subtrees) == 5
+        with mock.patch.object(MemoryDB, "store", autospec=True, side_effect=MemoryDB.store) as store:
+            assert index.write_tree().hexsha == repo.git.write_tree()
+            assert store.call_count == 0
+
+            # only the trees leading to the changed file are written
+            with open(osp.join(repo.working_tree_dir, "dir3/sub/file1"), "w") as fp:
+                fp.write("changed")
+            index.add(["dir3/sub/file1", "dir1/sub/file1"], write=False)
+            assert index.entries.cache_tree.subtrees["dir1"].valid
+            assert not index.entries.cache_tree.subtrees["dir3"].valid
+            tree = index.write_tree()
+            assert store.call_count == 3
+
+            # removing a directory drops its node
+            for key in [k for k in index.entries if k[0].startswith("dir4/")]:
+                del index.entries[key]
+            tree_without_dir4 = index.write_tree()
+            assert store.call_count == 4
+        # END count stored trees
+        assert "dir4" not in index.entries.cache_tree.subtrees
+
+        # the result matches git, which accepts the cache-tree we write
+        index.write(ignore_extension_data=False)
+        assert repo.git.write_tree() == tree_without_dir4.hexsha
+        repo.git.add("dir4")
+        assert repo.git.write_tree() == tree.hexsha
+        assert IndexFile(repo).write_tree() == tree
+
+    @with_rw_directory
+    def test_status(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        wd = repo.working_tree_dir
+
+        def write(path, content):
+            os.makedirs(osp.dirname(osp.join(wd, path)) or wd, exist_ok=True)
+            with open(osp.join(wd, path), "w") as fp:
+                fp.write(content)
+
+        def git_status(*args):
+            out = repo.git.status("--porcelain", "--untracked-files=no", "--no-renames", "-z", *args)
+            return [line for line in out.split("\0") if line]
+
+        names = ["same_size", "other_size", "deleted", "staged", "staged_deleted", "executable", "link", "ita"]
+        for name in names[:-1]:
+            write("dir/%s" % name, "content")
+        # END for each file
+        write("unchanged", "content")
+        repo.git.add(".")
+        repo.index.commit("initial")
+
+        write("dir/same_size", "CONTENT")
+        write("dir/other_size", "other content")
+        os.remove(osp.join(wd, "dir/deleted"))
+        write("dir/staged", "staged")
+        repo.git.add("dir/staged")
+        write("dir/staged", "staged and changed")
+        write("added", "new")
+        repo.git.add("added")
+        repo.git.rm("dir/staged_deleted")
+
+        # with a valid cache-tree, as git-write-tree leaves it, only trees differing from HEAD are compared
+        repo.git.write_tree()
+        index = IndexFile(repo)
+        assert index.entries.cache_tree.valid
+        status = index.status()
+        assert [str(s) for s in status] == git_status()
+        assert StatusEntry("added", "A", " ") in status and StatusEntry("dir/staged_deleted", "D", " ") in status
+
+        os.chmod(osp.join(wd, "dir/executable"), 0o755)
+        os.remove(osp.join(wd, "dir/link"))
+        os.symlink("unchanged", osp.join(wd, "dir/link"))
+        write("dir/ita", "intent")
+        repo.git.add("dir/ita", intent_to_add=True)
+
+        index = IndexFile(repo)
+        status = index.status()
+        assert [str(s) for s in status] == git_status()
+        assert StatusEntry("added", "A", " ") in status
+        assert StatusEntry("dir/link", " ", "T") in status
+        assert [str(s) for s in index.status(paths=["dir/staged", osp.join(wd, "added")], workers=1)] == git_status(
+            "dir/staged", "added"
+        )
+
+        # files are only hashed if their stat data changed, or if they may have changed unnoticed
+        with mock.patch("git.index.status._hash_file", side_effect=status_module._hash_file) as hash_file:
+            index = IndexFile(repo)
+            future = time.time_ns() + 10**10
+            os.utime(index.path, ns=(future, future))
+            index.status()
+            assert hash_file.call_args_list == [mock.call(osp.join(wd, "dir/same_size"), mock.ANY)]
+            os.utime(index.path, ns=(0, 0))
+            assert [str(s) for s in index.status()] == git_status()
+            assert hash_file.call_count > 0
+        # END count hashed files
+
+        # unmerged paths
+        with repo.config_writer() as writer:
+            writer.set_value("user", "name", "Author")
+            writer.set_value("user", "email", "author@example.com")
+        # END configure identity
+        repo.git.reset("--hard")
+        branch = repo.active_branch.name
+        repo.git.checkout("-b", "other")
+        write("unchanged", "other")
+        repo.git.commit("-am", "other")
+        repo.git.checkout(branch)
+        write("unchanged", "ours")
+        repo.git.commit("-am", "ours")
+        self.assertRaises(GitCommandError, repo.git.merge, "other")
+        status = IndexFile(repo).status()
+        assert [str(s) for s in status] == git_status() == ["UU unchanged"]
+
+    @with_rw_directory
+    def test_status_untracked(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        wd = repo.working_tree_dir
+
+        def write(path, content="content"):
+            os.makedirs(osp.dirname(osp.join(wd, path)) or wd, exist_ok=True)
+            with open(osp.join(wd, path), "w") as fp:
+                fp.write(content)
+
+        def git_status():
+            out = repo.git.status("--porcelain", "--untracked-files=all", "--no-renames", "-z")
+            return [line for line in out.split("\0") if line]
+
+        for path in ("a/tracked", "a/b/tracked", "c/tracked", ".gitignore", "a/b/.gitignore"):
+            write(path)
+        write(".gitignore", "*.log\n!keep.log\n/build/\n")
+        write("a/b/.gitignore", "sub*\n")
+        repo.git.add(".")
+        for path in ("a/untracked", "a/keep.log", "a/skip.log", "a/b/sub", "a/build/file", "build/file", "c/d/e/new"):
+            write(path)
+        Repo.init(osp.join(wd, "nested"))
+        with repo.config_writer() as writer:
+            writer.set_value("core", "untrackedCache", "true")
+        # END enable untracked cache
+        repo.git.status()
+        repo.git.status()
+        future = time.time_ns() + 10**10
+        os.utime(osp.join(repo.git_dir, "index"), ns=(future, future))
+
+        index = IndexFile(repo)
+        untracked_cache = index.entries.untracked_cache
+        assert untracked_cache is not None and untracked_cache.root.valid
+        # only untracked directories are read, the others are known from the cache
+        with mock.patch("os.scandir", side_effect=os.scandir) as scandir:
+            status = index.status(untracked=True)
+        scanned = sorted(c[0][0] for c in scandir.call_args_list)
+        assert scanned == [osp.join(wd, p) for p in ("a/build/", "c/d/", "c/d/e/")]
+        assert [str(s) for s in status] == git_status()
+        assert StatusEntry("nested/", "?", "?") in status
+
+        # writing keeps the untracked cache, which git keeps using
+        index.write()
+        assert IndexFile(repo).entries.untracked_cache.root.valid
+        assert [str(s) for s in IndexFile(repo).status(untracked=True)] == git_status()
+
+        # changing the index invalidates the cached directories
+        write("a/new")
+        index = IndexFile(repo)
+        index.add(["a/new"])
+        assert not index.entries.untracked_cache.root.subdirs["a"].valid
+        write("new", "in root")
+        assert [str(s) for s in index.status(untracked=True)] == git_status()
+
+        # with a fsmonitor, only paths it reports and paths which were changed before are checked
+        monitor = mock.Mock(return_value=("token", None))
+        index = IndexFile(repo)
+        status = index.status(untracked=True, fsmonitor=monitor)
+        monitor.assert_called_once_with("")
+        assert index.entries.fsmonitor.token == "token"
+        assert index.entries.fsmonitor.dirty == set()
+        write("a/tracked", "changed")
+        monitor.return_value = ("token2", ["a/tracked"])
+        with mock.patch.object(status_module, "_working_tree_status", side_effect=status_module._working_tree_status):
+            status = index.status(untracked=True, fsmonitor=monitor)
+            checked = sorted(c[0][0].path for c in status_module._working_tree_status.call_args_list)
+        assert checked == ["a/tracked"]
+        monitor.assert_called_with("token")
+        assert [str(s) for s in status] == git_status()
+        assert index.entries.fsmonitor.dirty == {"a/tracked"}
+        index.write()
+        assert IndexFile(repo).entries.fsmonitor.token == "token2"
+        assert [str(s) for s in IndexFile(repo).status(untracked=True)] == git_status()
+
+        if not is_win:
+            hook = osp.join(rw_dir, "fsmonitor-hook")
+            with open(hook, "w") as fp:
+                fp.write('#!/bin/sh\nprintf "new-token\\0a/tracked\\0"\n')
+            os.chmod(hook, 0o755)
+            assert status_module.query_fsmonitor_hook(hook, wd, "token2") == ("new-token", ["a/tracked"])
+            assert status_module.query_fsmonitor_hook(hook, wd, "") == ("new-token", None)
+        # END check hook protocol
+
+    @with_rw_directory
+    def test_split_index(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        paths = ["file%i" % i for i in range(20)] + ["dir/file%i" % i for i in range(20)]
+        for path in paths:
+            os.makedirs(osp.dirname(osp.join(repo.working_tree_dir, path)) or repo.working_tree_dir, exist_ok=True)
+            with open(osp.join(repo.working_tree_dir, path), "w") as fp:
+                fp.write(path)
+        # END for each path
+        repo.git.add(".")
+        with repo.config_writer() as writer:
+            writer.set_value("core", "splitIndex", "true")
+            writer.set_value("splitIndex", "maxPercentChange", "20")
+        # END enable split index
+        repo.git.update_index(split_index=True)
+
+        def git_listing():
+            return repo.git.ls_files(stage=True)
+
+        def listing(index):
+            return "\n".join("%o %s %i\t%s" % (e.mode, e.hexsha, e.stage, e.path) for e in index._entries_sorted())
+
+        # git's split index is merged with its shared index
+        index = IndexFile(repo)
+        split_index = index.entries.split_index
+        assert split_index is not None and len(split_index.base) == len(paths)
+        assert listing(index) == git_listing()
+
+        # only changes to the shared index are written
+        with open(osp.join(repo.working_tree_dir, "dir/file0"), "w") as fp:
+            fp.write("changed")
+        index.add(["dir/file0"], write=False)
+        del index.entries[("dir/file1", 0)]
+        with open(osp.join(repo.working_tree_dir, "new"), "w") as fp:
+            fp.write("new")
+        index.add(["new"])
+        assert read_header(open(index.path, "rb"))[1] == 2
+        assert IndexFile(repo).entries.split_index.base_sha == split_index.base_sha
+        assert listing(index) == git_listing() == listing(IndexFile(repo))
+        assert repo.git.cat_file("-p", ":dir/file0") == "changed"
+
+        # changes git makes are merged as well
+        repo.git.rm("--cached", "file0")
+        repo.git.update_index("--chmod=+x", "file1")
+        assert listing(IndexFile(repo)) == git_listing()
+
+        # too many changes make it write a new shared index
+        index = IndexFile(repo)
+        for path in paths[10:]:
+            index.entries.pop((path, 0), None)
+        # END for each removed path
+        index.write()
+        read_index = IndexFile(repo)
+        assert read_index.entries.split_index.base_sha not in (split_index.base_sha, None)
+        assert len(read_index.entries) == len(read_index.entries.split_index.base)
+        assert osp.isfile(read_index._shared_index_path(read_index.entries.split_index.base_sha))
+        assert read_header(open(index.path, "rb"))[1] == 0
+        assert listing(read_index) == git_listing()
+
+        # disabling the split index writes all entries again
+        with repo.config_writer() as writer:
+            writer.set_value("core", "splitIndex", "false")
+        # END disable split index
+        read_index.write()
+        assert IndexFile(repo).entries.split_index is None
+        assert read_header(open(read_index.path, "rb"))[1] == len(read_index.entries)
+        assert listing(read_index) == git_listing()
+
+    @with_rw_directory
+    def test_packed_entries(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        paths = ["a", "dir/deep/file", "dir/deep/file2", "dir/other", "dir.txt", "long" * 40]
+        for path in paths:
+            os.makedirs(osp.dirname(osp.join(repo.working_tree_dir, path)) or repo.working_tree_dir, exist_ok=True)
+            with open(osp.join(repo.working_tree_dir, path), "w") as fp:
+                fp.write(path)
+        # END for each path
+        repo.git.add(paths[:-1])
+        repo.git.add(paths[-1], intent_to_add=True)
+
+        def listing(index):
+            return "\n".join("%o %s %i\t%s" % (e.mode, e.hexsha, e.stage, e.path) for e in index._entries_sorted())
+
+        for version in (2, 3, 4):
+            repo.git.update_index(index_version=version)
+            index = IndexFile(repo, compact=True)
+            assert isinstance(index.entries, PackedIndexEntries)
+            assert index.entries == IndexFile(repo).entries
+            assert listing(index) == repo.git.ls_files(stage=True)
+
+            # unchanged entries are written as they were read
+            with open(index.path, "rb") as fp:
+                data = fp.read()
+            index.write()
+            with open(index.path, "rb") as fp:
+                assert fp.read() == data
+        # END for each version
+
+        # a trailing slash limits the prefix to the entries below a directory
+        entries = index.entries
+        assert [e.path for e in entries.iter_prefix("dir/")] == ["dir/deep/file", "dir/deep/file2", "dir/other"]
+        assert [e.path for e in entries.iter_prefix("dir")] == [
+            "dir.txt",
+            "dir/deep/file",
+            "dir/deep/file2",
+            "dir/other",
+        ]
+        assert [e.path for e in entries.iter_prefix("dir/deep/file2")] == ["dir/deep/file2"]
+        assert not list(entries.iter_prefix("b"))
+
+        # mutations keep the entries sorted, and git reads what we write
+        del entries[("dir/other", 0)]
+        with open(osp.join(repo.working_tree_dir, "b"), "w") as fp:
+            fp.write("b")
+        index.add(["b", "dir/deep/file"])
+        assert list(entries) == sorted(entries)
+        assert ("dir/other", 0) not in entries and ("b", 0) in entries
+        assert listing(index) == repo.git.ls_files(stage=True)
+        assert listing(IndexFile(repo, compact=True)) == listing(IndexFile(repo))
+        assert index.write_tree() == IndexFile(repo).write_tree()
+
+    @with_rw_directory
+    def test_write_long_paths(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        blob = repo.odb.store(IStream("blob", 4, BytesIO(b"data")))
+        # paths which don't fit into the name length of the flags are null-terminated
+        paths = ["a", "long/" * 1000 + "file", "z"]
+        for version in (2, 4):
+            index = IndexFile(repo)
+            index.version = version
+            for path in paths:
+                index.add([BaseIndexEntry((0o100644, blob.binsha, 0, path))], write=False)
+            # END for each path
+            index.write()
+            assert repo.git.ls_files().splitlines() == paths
+            assert [key[0] for key in IndexFile(repo).entries] == paths
+        # END for each version
+
+    @with_rw_directory
+    def test_index_versions(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        paths = ["a", "dir/deep/file", "dir/deep/file2", "dir/other", "long" * 40]
+        for path in paths:
+            os.makedirs(osp.dirname(osp.join(repo.working_tree_dir, path)) or repo.working_tree_dir, exist_ok=True)
+            with open(osp.join(repo.working_tree_dir, path), "w") as fp:
+                fp.write(path)
+        # END for each path
+        repo.git.add(paths[:-1])
+        repo.git.add(paths[-1], intent_to_add=True)
+        repo.git.update_index("a", skip_worktree=True)
+        listing = repo.git.ls_files(stage=True, t=True)
+
+        sizes = {}
+        for version in (3, 4):
+            repo.git.update_index(index_version=version)
+            index = IndexFile(repo)
+            assert index.entries[("a", 0)].skip_worktree
+            assert index.version == version
+            assert index.entries[(paths[-1], 0)].intent_to_add
+            assert not index.entries[("dir/other", 0)].skip_worktree
+            assert [e.path for e in index.entries.values()] == sorted(paths)
+
+            # the version and flags survive a round-trip
+            with open(index.path, "rb") as fp:
+                data = fp.read()
+            os.remove(index.path)
+            index.write()
+            with open(index.path, "rb") as fp:
+                assert fp.read() == data
+            assert repo.git.ls_files(stage=True, t=True) == listing
+            sizes[version] = len(data)
+        # END for each version
+        assert sizes[4] < sizes[3]
+
+        # version 2 is upgraded to 3 if required
+        def version_on_disk():
+            with open(index.path, "rb") as fp:
+                return read_header(fp)[0]
+
+        index.version = 2
+        index.write()
+        assert version_on_disk() == 3
+        for key, entry in index.entries.items():
+            index.entries[key] = entry._replace(flags=entry.flags & ~CE_EXTENDED_FLAGS)
+        index.write()
+        assert version_on_disk() == 2
+
     def _cmp_tree_index(self, tree, index):
         # fail unless both objects contain the same paths and blobs
         if isinstance(tree, str):
@@ -817,6 +1256,96 @@ class TestIndex(TestBase):
             assert isinstance(index, IndexFile)
         # END for each arg tuple
 
+    @with_rw_directory
+    def test_from_tree_in_process(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+
+        def make_tree(files):
+            index = IndexFile.new(repo)
+            for path, (data, mode) in files.items():
+                blob = repo.odb.store(IStream("blob", len(data), BytesIO(data)))
+                index.entries[(path, 0)] = IndexEntry.from_base(BaseIndexEntry((mode, blob.binsha, 0, path)))
+            # END for each file
+            return index.write_tree()
+
+        base = {
+            "same": (b"same", 0o100644),
+            "dir/ours_mod": (b"base", 0o100644),
+            "dir/theirs_mod": (b"base", 0o100644),
+            "dir/sub/both_mod": (b"base", 0o100644),
+            "same_mod": (b"base", 0o100644),
+            "ours_del": (b"base", 0o100644),
+            "del_mod": (b"base", 0o100644),
+            "mode_content": (b"base", 0o100644),
+            "aa/file": (b"base", 0o100644),
+            "b/file": (b"base", 0o100644),
+            "ccc/file": (b"base", 0o100644),
+        }
+        ours = dict(base)
+        ours.update(
+            {
+                "dir/ours_mod": (b"ours", 0o100644),
+                "dir/sub/both_mod": (b"ours", 0o100644),
+                "same_mod": (b"new", 0o100644),
+                "both_add": (b"ours", 0o100644),
+                "mode_content": (b"ours", 0o100644),
+            }
+        )
+        del ours["ours_del"]
+        del ours["del_mod"]
+        theirs = dict(base)
+        theirs.update(
+            {
+                "dir/theirs_mod": (b"theirs", 0o100644),
+                "dir/sub/both_mod": (b"theirs", 0o100644),
+                "same_mod": (b"new", 0o100644),
+                "del_mod": (b"theirs", 0o100644),
+                "theirs_add": (b"theirs", 0o100755),
+                "both_add": (b"theirs", 0o100644),
+                "mode_content": (b"base", 0o100755),
+            }
+        )
+        trees = [make_tree(files) for files in (base, ours, theirs)]
+
+        def listing(index):
+            return "\n".join("%o %s %i\t%s" % (e.mode, e.hexsha, e.stage, e.path) for e in index._entries_sorted())
+
+        def git_listing(*args):
+            index_path = osp.join(rw_dir, "index")
+            merge = ["-m", "--aggressive"] if len(args) > 1 else []
+            repo.git.read_tree(*merge, *args, index_output=index_path)
+            return listing(IndexFile(repo, index_path))
+
+        for args in ((trees[0],), (trees[0], trees[1]), tuple(trees), (trees[0].hexsha, trees[2].hexsha)):
+            index = IndexFile.from_tree(repo, *args)
+            assert isinstance(index.entries, PackedIndexEntries)
+            assert not osp.exists(index.path)
+            assert listing(index) == git_listing(*args)
+            assert listing(IndexFile.new(repo, *args)) == listing(index)
+        # END for each amount of trees
+        assert len([e for e in index.entries.values() if e.stage]) == 0
+
+        # a single tree comes with its cache-tree, which is written the way git writes it
+        index = IndexFile.from_tree(repo, trees[1])
+        assert index.entries.cache_tree.entry_count == len(index.entries)
+        assert index.write_tree() == trees[1]
+        index.write(osp.join(rw_dir, "written"))
+        assert repo.git.read_tree(trees[1], index_output=osp.join(rw_dir, "index")) == ""
+        with open(osp.join(rw_dir, "written"), "rb") as fp, open(osp.join(rw_dir, "index"), "rb") as git_fp:
+            assert fp.read() == git_fp.read()
+
+        # file/directory conflicts are left to git
+        theirs["dir"] = (b"file", 0o100644)
+        trees[2] = make_tree({k: v for k, v in theirs.items() if not k.startswith("dir/")})
+        index = IndexFile.from_tree(repo, *trees)
+        assert not isinstance(index.entries, PackedIndexEntries)
+        assert listing(index) == git_listing(*trees)
+
+        # works in bare repositories, to which cloning copies all objects
+        bare_repo = repo.clone(osp.join(rw_dir, "bare"), bare=True)
+        index = IndexFile.from_tree(bare_repo, trees[1].hexsha)
+        assert listing(index) == listing(IndexFile.from_tree(repo, trees[1]))
+
     @with_rw_repo("HEAD", bare=True)
     def test_index_bare_add(self, rw_bare_repo):
         # Something is wrong after cloning to a bare repo, reading the
@@ -867,6 +1396,36 @@ class TestIndex(TestBase):
         r.index.add([fp])
         r.index.commit("Added [.exe")
 
+    @with_rw_directory
+    def test_add_workers(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        paths = ["dir%i/file%i" % (i % 7, i) for i in range(100)]
+        for i, path in enumerate(paths):
+            os.makedirs(osp.dirname(osp.join(repo.working_tree_dir, path)), exist_ok=True)
+            with open(osp.join(repo.working_tree_dir, path), "wb") as fp:
+                fp.write(b"content %i\n" % i * i)
+        # END for each path
+        if not is_win:
+            os.symlink("file0", osp.join(repo.working_tree_dir, "dir0", "link"))
+            paths.append("dir0/link")
+        # END add symlink
+
+        results = []
+        for workers in (1, 4, None):
+            calls = []
+            index = IndexFile.new(repo)
+            entries = index.add(paths, fprogress=lambda *args: calls.append(args[:2]), write=False, workers=workers)
+            results.append((entries, calls, index.write_tree().binsha))
+        # END for each amount of workers
+        assert results[0] == results[1] == results[2]
+        assert results[0][1] == [(p, done) for p in paths for done in (False, True)]
+
+        # blobs with null shas are stored as well
+        index = IndexFile.new(repo)
+        null_blobs = [Blob(repo, Blob.NULL_BIN_SHA, 0o100644, p) for p in paths[:20]]
+        entries = index.add(null_blobs, write=False, workers=3)
+        assert [e.binsha for e in entries] == [e.binsha for e in results[0][0][:20]]
+
     def test__to_relative_path_at_root(self):
         root = osp.abspath(os.sep)
 
@@ -4,6 +4,7 @@
 #
 # This module is part of GitPython and is released under
 # the BSD License: https://opensource.org/license/bsd-3-clause/
+import gc
 import glob
 import io
 from io import BytesIO
@@ -13,11 +14,13 @@ import pathlib
 import pickle
 import sys
 import tempfile
+import weakref
 from unittest import mock, skipIf, SkipTest, skip
 
 import pytest
 
 from git import (
+    Actor,
     InvalidGitRepositoryError,
     Repo,
     NoSuchPathError,
@@ -40,6 +43,7 @@ from git.exc import (
     UnsafeOptionError,
     UnsafeProtocolError,
 )
+from git.repo.base import HistoryColumns
 from git.repo.fun import touch
 from test.lib import TestBase, with_rw_repo, fixture
 from git.util import HIDE_WINDOWS_KNOWN_ERRORS, cygpath
@@ -59,6 +63,10 @@ def flatten(lol):
     return list(iter_flatten(lol))
 
 
+def commit_summary_and_pid(commit):
+    return commit.summary, os.getpid()
+
+
 _tc_lock_fpaths = osp.join(osp.dirname(__file__), "../../.git/*.lock")
 
 
@@ -1263,6 +1271,180 @@ class TestRepo(TestBase):
         for i, j in itertools.permutations([c1, "ffffff", ""], r=2):
             self.assertRaises(GitCommandError, repo.is_ancestor, i, j)
 
+    @with_rw_directory
+    def test_name_rev_and_describe_many(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        c0 = repo.index.commit("initial")
+        c1 = repo.index.commit("first")
+        c2 = repo.index.commit("second")
+        side = repo.index.commit("side", parent_commits=[c1], head=False)
+        merge = repo.index.commit("merge", parent_commits=[c2, side])
+        orphan = repo.index.commit("orphan", parent_commits=[], head=False)
+        repo.create_tag("v0", c0)
+        repo.create_tag("v1", c1)
+
+        commits = [merge, c2, c1, c0.hexsha, orphan]
+        names = repo.name_rev_many(commits)
+        assert names[0] == repo.active_branch.name
+        assert names[1] == repo.active_branch.name + "~1"
+        assert names[2] == "tags/v1"
+        assert names[3] == "tags/v0"
+        assert names[4] is None
+        assert names[:3] == [c.name_rev.split()[1] for c in commits[:3]]
+        assert repo.name_rev_many(commits, name_only=True) == names
+        assert repo.name_rev_many(commits, tags=True, name_only=True) == [None, None, "v1", "v0", None]
+        assert repo.name_rev_many([]) == []
+
+        assert repo.describe_many(commits) == [("v1", 2), ("v1", 1), ("v1", 0), ("v0", 0), None]
+        assert repo.describe_many([side, "HEAD~1"]) == [("v1", 1), ("v1", 1)]
+        assert repo.describe_many([]) == []
+
+    @with_rw_directory
+    def test_identity_map(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        os.mkdir(osp.join(rw_dir, "repo", "dir"))
+        for name in ("file", osp.join("dir", "file")):
+            with open(osp.join(rw_dir, "repo", name), "w") as fp:
+                fp.write("same content")
+        repo.index.add(["file", "dir/file"])
+        c0 = repo.index.commit("first")
+        repo.index.commit("second")
+        assert repo.commit("HEAD") is not repo.commit("HEAD")
+
+        repo.identity_map = weakref.WeakValueDictionary()
+        head = repo.commit("HEAD")
+        assert head is repo.commit("HEAD") is repo.head.commit
+        assert head.parents[0] is repo.commit(c0.hexsha) is list(repo.iter_commits())[1]
+        assert head.tree is repo.commit("HEAD").tree
+        assert head.tree is repo.tree(head.tree.hexsha) is repo.rev_parse("HEAD^{tree}")
+        assert repo.tree(head.tree.hexsha).path == ""
+        assert head.tree["file"] is head.tree["file"] is head.tree[1]
+        assert head.tree["dir"] is next(iter(head.tree))
+
+        # blobs are shared per path only, as their path is part of their state
+        blob, nested = head.tree["file"], head.tree["dir/file"]
+        assert blob.binsha == nested.binsha and blob is not nested
+        assert nested.path == "dir/file"
+
+        # modified trees are not handed out by later lookups, but their holders see the changes
+        tree = head.tree
+        num_entries = len(tree)
+        tree.cache.add(blob.binsha, blob.mode, "added")
+        assert repo.commit("HEAD").tree is tree and len(tree) == num_entries + 1
+        assert repo.tree(tree.hexsha) is not tree and len(repo.tree(tree.hexsha)) == num_entries
+
+        # instances are forgotten once they are not used anymore
+        hexsha = head.hexsha
+        del head, blob, nested, tree
+        gc.collect()
+        assert not any(getattr(o, "hexsha", None) == hexsha for o in repo.identity_map.values())
+
+    @with_rw_directory
+    def test_iter_commits_page(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        base = repo.index.commit("base", commit_date="@1000000000 +0000")
+        side = base
+        for i in range(1, 8):
+            repo.index.commit("main %i" % i, commit_date="@%i +0000" % (1000000000 + i * 20))
+            side = repo.index.commit(
+                "side %i" % i, parent_commits=[side], head=False, commit_date="@%i +0000" % (1000000010 + i * 20)
+            )
+        # END for each commit
+        repo.index.commit("merge", parent_commits=[repo.head.commit, side], commit_date="@1000001000 +0000")
+
+        def pages(rev, limit, **kwargs):
+            result = []
+            commits, cursor = repo.iter_commits_page(rev, limit=limit, **kwargs)
+            result.append(commits)
+            while cursor is not None:
+                commits, cursor = repo.iter_commits_page(rev, cursor, limit=limit, **kwargs)
+                result.append(commits)
+            # END while there are more pages
+            return result
+
+        for rev, kwargs in (("HEAD", {}), ("%s..HEAD" % base.hexsha, {}), ("HEAD", {"first_parent": True})):
+            expected = list(repo.iter_commits(rev, **kwargs))
+            for limit in (1, 3, len(expected), 100):
+                result = pages(rev, limit, **kwargs)
+                assert all(len(page) == limit for page in result[:-1])
+                assert sum(result, []) == expected
+            # END for each limit
+        # END for each rev
+
+        commits, cursor = repo.iter_commits_page(limit=4)
+        assert len(commits) == 4 and cursor is not None
+        commits, cursor = repo.iter_commits_page(base, limit=4)
+        assert commits == [base] and cursor is None
+
+    @with_rw_directory
+    def test_history_columns(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        with open(osp.join(rw_dir, "repo", "file"), "w") as fp:
+            fp.write("a\nb\n")
+        repo.index.add(["file"])
+        repo.index.commit("first", author=Actor("A", "a@example.com"), commit_date="@1400000000 +0200")
+        with open(osp.join(rw_dir, "repo", "file"), "w") as fp:
+            fp.write("a\nc\nd\n")
+        repo.index.add(["file"])
+        repo.index.commit("second", author=Actor("B", "b@example.com"), author_date="@1400000100 -0100")
+        commits = list(repo.iter_commits())
+
+        columns = repo.history_columns()
+        assert len(columns) == 2
+        assert set(columns.columns) == set(HistoryColumns.default_fields)
+        assert bytes(columns["binsha"]) == b"".join(c.binsha for c in commits)
+        assert list(columns["parent_count"]) == [1, 0]
+        assert list(columns["authored_date"]) == [c.authored_date for c in commits]
+        assert list(columns["author_tz_offset"]) == [c.author_tz_offset for c in commits]
+        assert list(columns["committed_date"]) == [c.committed_date for c in commits]
+        assert list(columns["committer_tz_offset"]) == [c.committer_tz_offset for c in commits]
+        assert [columns.actors[i] for i in columns["author"]] == [c.author for c in commits]
+        assert [columns.actors[i] for i in columns["committer"]] == [c.committer for c in commits]
+        assert columns["committer"][0] == columns["committer"][1]
+
+        columns = repo.history_columns("HEAD", fields=["insertions", "deletions"])
+        assert set(columns.columns) == {"insertions", "deletions"}
+        assert list(columns["insertions"]) == [c.stats.total["insertions"] for c in commits] == [2, 2]
+        assert list(columns["deletions"]) == [c.stats.total["deletions"] for c in commits] == [1, 0]
+        assert len(repo.history_columns(fields=["author"], max_count=1)) == 1
+        self.assertRaises(ValueError, repo.history_columns, fields=["foo"])
+
+        # merges are compared to their first parent, also by git versions without --diff-merges
+        side = repo.index.commit("side", parent_commits=[commits[1]], head=False)
+        with open(osp.join(rw_dir, "repo", "file"), "w") as fp:
+            fp.write("a\nc\nd\ne\n")
+        repo.index.add(["file"])
+        repo.index.commit("merge", parent_commits=[repo.head.commit, side])
+        expected = [c.stats.total["insertions"] for c in repo.iter_commits()]
+        assert expected == [1, 2, 2, 2]
+        assert list(repo.history_columns(fields=["insertions"])["insertions"]) == expected
+        with mock.patch.object(Git, "version_info", (2, 30, 0, 0)):
+            assert list(repo.history_columns(fields=["insertions"])["insertions"]) == expected
+            assert list(repo.history_columns(fields=["insertions"], paths="file")["insertions"]) == expected
+
+        numpy = pytest.importorskip("numpy")
+        arrays = columns.to_numpy()
+        assert arrays["insertions"].dtype == numpy.int64
+        assert numpy.shares_memory(arrays["insertions"], numpy.asarray(columns["insertions"]))
+
+    @with_rw_directory
+    def test_parallel_map_commits(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        for i in range(10):
+            repo.index.commit("commit %i" % i)
+        expected = ["commit %i" % i for i in reversed(range(10))]
+
+        results = list(repo.parallel_map_commits(None, commit_summary_and_pid, workers=2, chunk_size=3))
+        assert [summary for summary, _pid in results] == expected
+        assert os.getpid() not in {pid for _summary, pid in results}
+
+        results = repo.parallel_map_commits("HEAD~2", commit_summary_and_pid, workers=2, ordered=False)
+        assert sorted(summary for summary, _pid in results) == sorted(expected[2:])
+
+        results = repo.parallel_map_commits("HEAD", commit_summary_and_pid, max_count=4)
+        assert [summary for summary, _pid in results] == expected[:4]
+        assert list(repo.parallel_map_commits("HEAD..HEAD", commit_summary_and_pid)) == []
+
     def test_is_valid_object(self):
         repo = self.rorepo
         commit_sha = "f6aa8d1"
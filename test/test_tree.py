@@ -5,10 +5,12 @@
 # the BSD License: https://opensource.org/license/bsd-3-clause/
 
 from io import BytesIO
-from unittest import skipIf
+import os
+from unittest import mock, skipIf
 
+from git import Git, Repo
 from git.objects import Tree, Blob
-from test.lib import TestBase
+from test.lib import TestBase, with_rw_directory
 from git.util import HIDE_WINDOWS_KNOWN_ERRORS
 
 import os.path as osp
@@ -107,3 +109,185 @@ class TestTree(TestBase):
             assert root[item.path] == item == root / item.path
         # END for each item
         assert found_slash
+
+    @with_rw_directory
+    def test_join_many(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        paths = ["a", "d/b", "d/e/c", "d/e/f", "d/g"]
+        for path in paths:
+            os.makedirs(osp.join(rw_dir, "repo", osp.dirname(path)), exist_ok=True)
+            with open(osp.join(rw_dir, "repo", path), "w") as fp:
+                fp.write(path)
+        # END for each path
+        repo.index.add(paths)
+        tree = repo.index.commit("initial").tree
+
+        items = tree.join_many(reversed(paths + ["d/e", "d"]))
+        assert [item.path for item in items] == list(reversed(paths + ["d/e", "d"]))
+        assert [item.type for item in items[:2]] == ["tree", "tree"]
+        assert [item.binsha for item in items] == [tree.join(item.path).binsha for item in items]
+        assert tree.join_many([]) == []
+        for missing in ("x", "d/x", "d/x/y", "a/b", ""):
+            self.assertRaises(KeyError, tree.join_many, ["a", missing])
+            self.assertRaises(KeyError, tree.join, missing)
+        # END for each missing path
+
+        # the name index follows modifications of the tree
+        subtree = tree / "d"
+        assert subtree.join("b").path == "d/b"
+        mod = subtree.cache
+        del mod["b"]
+        self.assertRaises(KeyError, subtree.join, "b")
+        mod.add(items[-1].binsha, items[-1].mode, "0")
+        assert subtree.join("0").binsha == items[-1].binsha
+        mod.set_done()
+        assert subtree[0].path == "d/0"
+        assert subtree.join("g").path == "d/g"
+
+    @with_rw_directory
+    def test_iter_entries(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        contents = {"a": "1", "d/b": "22", "d/e/c": "333", "d/e/f": "4444", "g": "55555"}
+        for path, data in contents.items():
+            os.makedirs(osp.join(rw_dir, "repo", osp.dirname(path)), exist_ok=True)
+            with open(osp.join(rw_dir, "repo", path), "w") as fp:
+                fp.write(data)
+        # END for each path
+        repo.index.add(list(contents))
+        tree = repo.index.commit("initial").tree
+
+        entries = list(tree.iter_entries())
+        assert [e.path for e in entries] == sorted(b.path for b in tree.traverse() if b.type == "blob")
+        assert [(e.mode, e.binsha) for e in entries] == [(tree[e.path].mode, tree[e.path].binsha) for e in entries]
+        assert {e.size for e in entries} == {None}
+
+        assert [e.size for e in tree.iter_entries(long=True)] == [len(contents[e.path]) for e in entries]
+        assert [(e.path, e.size) for e in tree.iter_entries(recursive=False, long=True)] == [
+            ("a", 1),
+            ("d", None),
+            ("g", 5),
+        ]
+        subtree = tree / "d"
+        assert [e.path for e in subtree.iter_entries(pathspec="e")] == ["d/e/c", "d/e/f"]
+        assert [e.path for e in subtree.iter_entries(pathspec=["b", "e/f"])] == ["d/b", "d/e/f"]
+        assert list(subtree.iter_entries(pathspec="x")) == []
+
+        # git is stopped once the caller stops iterating
+        procs = []
+        init = Git.AutoInterrupt.__init__
+
+        def keep_proc(proc, *args):
+            procs.append(proc)
+            init(proc, *args)
+
+        with mock.patch.object(Git.AutoInterrupt, "__init__", keep_proc):
+            entries_iter = tree.iter_entries()
+            assert next(entries_iter).path == "a"
+            assert procs[0].proc is not None
+            entries_iter.close()
+            assert procs[0].proc is None
+
+        assert tree.directory_sizes() == {"": 15, "d": 9, "d/e": 7}
+        assert subtree.directory_sizes(pathspec="e") == {"d": 7, "d/e": 7}
+
+    @with_rw_directory
+    def test_diff_native(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+
+        def write(path, data="data"):
+            path = osp.join(rw_dir, "repo", path)
+            os.makedirs(osp.dirname(path), exist_ok=True)
+            with open(path, "w") as fp:
+                fp.write(data)
+
+        for i in range(10):
+            write("same/%i/file" % i)
+        for path in ("mod", "dir/mod", "dir/sub/del", "gone/file", "to_dir", "to_link", "to_exec"):
+            write(path)
+        repo.index.add(["same", "mod", "dir", "gone", "to_dir", "to_link", "to_exec"])
+        a = repo.index.commit("a").tree
+
+        write("mod", "changed")
+        write("dir/mod", "changed")
+        write("new/file")
+        os.chmod(osp.join(rw_dir, "repo", "to_exec"), 0o755)
+        repo.index.remove(["dir/sub/del", "gone/file", "to_dir", "to_link"], working_tree=True)
+        write("to_dir/file")
+        os.symlink("mod", osp.join(rw_dir, "repo", "to_link"))
+        repo.index.add(["mod", "dir/mod", "new/file", "to_exec", "to_dir/file", "to_link"])
+        b = repo.index.commit("b").tree
+
+        def key(diff):
+            return (
+                diff.change_type,
+                diff.a_path,
+                diff.b_path,
+                diff.a_blob and diff.a_blob.binsha,
+                diff.b_blob and diff.b_blob.binsha,
+                diff.a_mode,
+                diff.b_mode,
+                diff.new_file,
+                diff.deleted_file,
+            )
+
+        for x, y in ((a, b), (b, a), (a, a)):
+            assert [key(d) for d in x.diff_native(y)] == [key(d) for d in x.diff(y, no_renames=True)]
+        # END for each pair of trees
+        assert {d.change_type for d in a.diff_native(b)} == {"A", "D", "M", "T"}
+        assert [key(d) for d in a.diff_native(b.hexsha)] == [key(d) for d in a.diff_native(b)]
+
+        # unchanged subtrees are not read
+        read = []
+        stream = repo.odb.stream
+        with mock.patch.object(repo.odb, "stream", side_effect=lambda sha: read.append(sha) or stream(sha)):
+            a.diff_native(b)
+        assert (a / "same").binsha not in read
+        assert len(read) < 10
+
+    @with_rw_directory
+    def test_traverse_pathspec(self, rw_dir):
+        repo = Repo.init(osp.join(rw_dir, "repo"))
+        paths = [
+            "README.md",
+            "docs/index.md",
+            "lib/a.py",
+            "lib/sub/test_a.py",
+            "lib/sub/deep/test_b.py",
+            "services/payments/api.py",
+            "services/payments/legacy/old.py",
+            "services/users/api.py",
+        ]
+        for path in paths:
+            os.makedirs(osp.join(rw_dir, "repo", osp.dirname(path)), exist_ok=True)
+            with open(osp.join(rw_dir, "repo", path), "w") as fp:
+                fp.write(path)
+        # END for each path
+        repo.index.add(paths)
+        tree = repo.index.commit("initial").tree
+
+        def blobs(pathspec):
+            return sorted(i.path for i in tree.traverse(pathspec=pathspec) if i.type == "blob")
+
+        assert blobs("services/payments") == ["services/payments/api.py", "services/payments/legacy/old.py"]
+        assert blobs(["services/payments", ":(exclude)services/payments/legacy"]) == ["services/payments/api.py"]
+        assert blobs(["services", ":!services/payments"]) == ["services/users/api.py"]
+        assert blobs("*.md") == ["README.md", "docs/index.md"]
+        assert blobs(":(glob)*.md") == ["README.md"]
+        assert blobs(":(glob)lib/**/test_*.py") == ["lib/sub/deep/test_b.py", "lib/sub/test_a.py"]
+        assert blobs(":(glob)lib/*/test_*.py") == ["lib/sub/test_a.py"]
+        assert blobs("lib/*/test_*.py") == ["lib/sub/deep/test_b.py", "lib/sub/test_a.py"]
+        assert blobs(":(literal)*.md") == []
+        assert blobs(":^*.py") == ["README.md", "docs/index.md"]
+        assert blobs([]) == blobs(None) == sorted(paths)
+        assert [i.path for i in tree.traverse(pathspec="services/payments/legacy")] == [
+            "services/payments/legacy",
+            "services/payments/legacy/old.py",
+        ]
+        self.assertRaises(ValueError, tree.traverse, pathspec=":(icase)readme.md")
+
+        # trees which can't contain matches are not read
+        read = []
+        stream = repo.odb.stream
+        with mock.patch.object(repo.odb, "stream", side_effect=lambda sha: read.append(sha) or stream(sha)):
+            assert blobs("services/payments/api.py") == ["services/payments/api.py"]
+        assert sorted(read) == sorted([(tree / "services").binsha, (tree / "services/payments").binsha])